@@ -1,11 +1,13 @@
 import redis
-from flask import Flask, jsonify, render_template, request, redirect, send_from_directory
+from flask import Flask, Response, jsonify, render_template, request, redirect, send_from_directory
+import glob
 import os
+import threading
 from pathlib import Path
+from typing import Callable, Optional
 from dotenv import load_dotenv
-import threading
 
-from vidmelt import pipeline, history, knowledge
+from vidmelt import artifacts, embedqueue, jobqueue, metrics, openai_client, pipeline, history, knowledge, transcriber
 from vidmelt.events import build_event_bus, RedisEventBus
 from vidmelt import chat as chat_module
 
@@ -16,12 +18,26 @@ print(f"DEBUG: OPENAI_API_KEY loaded: {bool(os.getenv('OPENAI_API_KEY'))}")
 app = Flask(__name__)
 app.config["REDIS_URL"] = "redis://localhost:6379/0"
 EVENT_BUS = build_event_bus(app)
-KB = knowledge.KnowledgeBase()
+KB = knowledge.open_knowledge_base()
+JOB_QUEUE = jobqueue.JobQueue()
+
+
+def _announce_indexed(video_names, report: knowledge.EmbedReport) -> None:
+    with app.app_context():
+        EVENT_BUS.publish(
+            {"message": f"Search index updated for {', '.join(video_names)} ({report.chunks} chunks). 🔎", "icon": "🔎"},
+            "update",
+        )
+
+
+EMBEDDER = embedqueue.EmbeddingQueue(KB, on_indexed=_announce_indexed)
 
 # Directories (shared with pipeline module)
 UPLOAD_FOLDER = pipeline.UPLOAD_FOLDER
 SUMMARY_DIR = pipeline.SUMMARY_DIR
 TRANSCRIPT_DIR = pipeline.TRANSCRIPT_DIR
+# Entries in the "related videos" panels.
+RELATED_PANEL = 5
 
 @app.route('/')
 def index():
@@ -31,7 +47,22 @@ def index():
 @app.route('/jobs')
 def jobs():
     jobs = list(history.GLOBAL_STORE.list_recent(50))
-    return render_template('jobs.html', jobs=jobs)
+    # One indexed read per job from the precomputed graph, never a vector scan.
+    related = {job.id: KB.related_videos(Path(job.video_path).stem, limit=RELATED_PANEL) for job in jobs}
+    return render_template('jobs.html', jobs=jobs, related=related)
+
+
+@app.route('/summary/<video_name>')
+def view_summary(video_name):
+    summary_path = SUMMARY_DIR / f"{video_name}.md"
+    if not summary_path.is_file():
+        return jsonify({"error": "unknown summary"}), 404
+    return render_template(
+        'summary.html',
+        video_name=video_name,
+        summary=summary_path.read_text(encoding="utf-8"),
+        related=KB.related_videos(video_name, limit=RELATED_PANEL),
+    )
 
 
 @app.route('/chat', methods=['POST'])
@@ -60,27 +91,206 @@ def upload_file():
     if file.filename == '':
         return redirect(request.url)
     if file:
+        # Refuse early so a full queue does not cost us the upload's disk space.
+        if not JOB_QUEUE.has_capacity():
+            return _queue_full_response()
         video_path = UPLOAD_FOLDER / file.filename
-        file.save(video_path)
-        EVENT_BUS.publish({"message": f"File uploaded: {file.filename} - Let the magic begin! ✨", "icon": "⬆️"}, "update")
-        
+        content_digest = artifacts.save_upload(file.stream, video_path)
+
         transcription_model = request.form.get('transcription_model', 'whisper-base')
         print(f"DEBUG: Selected transcription model from form: {transcription_model}")
 
-        # Start processing in a new thread to avoid blocking the Flask app
-        threading.Thread(target=process_video_web, args=(video_path, transcription_model,)).start()
-        return "Upload successful, processing started."
+        try:
+            queue_id = JOB_QUEUE.enqueue(video_path, transcription_model, content_digest)
+        except jobqueue.QueueFullError:
+            # Another upload took the last slot while this one was being saved.
+            video_path.unlink(missing_ok=True)
+            return _queue_full_response()
+        position = JOB_QUEUE.position(queue_id)
+        EVENT_BUS.publish({"message": f"File uploaded: {file.filename} - Let the magic begin! ✨", "icon": "⬆️"}, "update")
+        return jsonify({"queue_id": queue_id, "position": position, **_depth_payload()}), 202
+
+
+def _queue_full_response():
+    depth = JOB_QUEUE.depth()
+    message = f"The processing queue is full ({depth.pending} of {depth.capacity} jobs). Please try again later."
+    return jsonify({"error": message, **_depth_payload(depth)}), 503
+
+
+def _depth_payload(depth: Optional[jobqueue.QueueDepth] = None) -> dict:
+    depth = depth or JOB_QUEUE.depth()
+    return {"queued": depth.queued, "running": depth.running, "capacity": depth.capacity, "workers": WORKERS.workers}
+
+
+@app.route('/queue')
+def queue_status():
+    return jsonify(_depth_payload())
+
+
+@app.route('/queue/<int:queue_id>')
+def queue_job_status(queue_id: int):
+    job = JOB_QUEUE.get(queue_id)
+    if job is None:
+        return jsonify({"error": "unknown queue id"}), 404
+    return jsonify(
+        {
+            "queue_id": job.id,
+            "video": Path(job.video_path).name,
+            "status": job.status,
+            "position": JOB_QUEUE.position(job.id),
+            "attempts": job.attempts,
+            "error": job.error,
+            **_depth_payload(),
+        }
+    )
+
+
+@app.route('/index/status')
+def index_status():
+    shadow = KB.shadow_status()
+    return jsonify({**EMBEDDER.freshness().as_dict(), "reembedding": shadow.as_dict() if shadow else None})
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    depth = JOB_QUEUE.depth()
+    freshness = EMBEDDER.freshness()
+    api = openai_client.shared_client().stats()
+    caches = KB.cache_stats()
+    body = "".join(
+        [
+            metrics.GLOBAL_REGISTRY.render(),
+            metrics.format_metric(
+                "vidmelt_queue_jobs",
+                "gauge",
+                "Unfinished uploads in the job queue.",
+                [([("state", "queued")], depth.queued), ([("state", "running")], depth.running)],
+            ),
+            metrics.format_metric("vidmelt_queue_capacity", "gauge", "Pending uploads accepted before 503.", [([], depth.capacity)]),
+            metrics.format_metric(
+                "vidmelt_index_documents",
+                "gauge",
+                "Knowledge-base documents by embedding state.",
+                [
+                    ([("state", "total")], freshness.documents),
+                    ([("state", "indexed")], freshness.indexed),
+                    ([("state", "pending")], freshness.pending),
+                    ([("state", "failed")], freshness.failed),
+                ],
+            ),
+            metrics.format_metric(
+                "vidmelt_search_cache_lookups_total",
+                "counter",
+                "Query-embedding and search-result cache lookups.",
+                [([("cache", name), ("result", "hit")], stats.hits) for name, stats in caches.items()]
+                + [([("cache", name), ("result", "miss")], stats.misses) for name, stats in caches.items()],
+            ),
+            metrics.format_metric(
+                "vidmelt_search_cache_dropped_total",
+                "counter",
+                "Cache entries dropped for space, age or an index change.",
+                [([("cache", name), ("reason", "evicted")], stats.evictions) for name, stats in caches.items()]
+                + [([("cache", name), ("reason", "expired")], stats.expirations) for name, stats in caches.items()]
+                + [([("cache", name), ("reason", "invalidated")], stats.invalidations) for name, stats in caches.items()],
+            ),
+            metrics.format_metric(
+                "vidmelt_search_cache_entries",
+                "gauge",
+                "Entries held by each search cache.",
+                [([("cache", name)], stats.size) for name, stats in caches.items()],
+            ),
+            metrics.format_metric("vidmelt_openai_requests_total", "counter", "OpenAI API requests.", [([], api.requests)]),
+            metrics.format_metric("vidmelt_openai_retries_total", "counter", "Retried OpenAI API requests.", [([], api.retries)]),
+            metrics.format_metric("vidmelt_openai_failures_total", "counter", "Failed OpenAI API requests.", [([], api.failures)]),
+            metrics.format_metric(
+                "vidmelt_openai_throttled_seconds_total",
+                "counter",
+                "Time spent waiting for the client-side rate limiter.",
+                [([], api.throttled_seconds)],
+            ),
+            metrics.format_metric(
+                "vidmelt_openai_tokens_total",
+                "counter",
+                "Tokens reported by the OpenAI API.",
+                [([("kind", "prompt")], api.prompt_tokens), ([("kind", "completion")], api.completion_tokens)],
+            ),
+        ]
+    )
+    return Response(body, mimetype="text/plain; version=0.0.4")
 
-def process_video_web(video_path: Path, transcription_model: str):
+
+def process_video_web(
+    video_path: Path,
+    transcription_model: str,
+    content_digest: Optional[str] = None,
+    *,
+    job_id: Optional[int] = None,
+    on_recorded: Optional[Callable[[int], None]] = None,
+) -> bool:
     with app.app_context():
         print(f"DEBUG: Processing video: {video_path.name} with transcription model: {transcription_model}")
-        pipeline.process_video(
+        return pipeline.process_video(
             video_path,
             transcription_model,
             publish=EVENT_BUS.publish,
             knowledge_base=KB,
+            content_digest=content_digest,
+            embedder=EMBEDDER,
+            job_id=job_id,
+            on_recorded=on_recorded,
         )
 
+
+def process_queued_job(job: jobqueue.QueuedJob) -> bool:
+    # A job re-leased after its worker died continues its first history row.
+    return process_video_web(
+        Path(job.video_path),
+        job.model,
+        job.content_digest,
+        job_id=job.history_id,
+        on_recorded=lambda history_id: JOB_QUEUE.attach_history(job.id, history_id),
+    )
+
+
+WORKERS = jobqueue.WorkerPool(JOB_QUEUE, process_queued_job)
+# Set to False to serve requests without draining the queue (tests, read-only replicas).
+app.config.setdefault("START_WORKERS", True)
+_BACKGROUND_LOCK = threading.Lock()
+_background_started = False
+
+
+def start_background_workers() -> None:
+    """Start the queue workers, the embedding queue and pending index upkeep, once per process.
+
+    Runs on the first request, so uploads are processed under any server
+    (``python app.py``, ``flask run``, a WSGI server).  The debug
+    reloader's watcher process serves no requests and so starts nothing.
+    """
+
+    global _background_started
+    with _BACKGROUND_LOCK:
+        if _background_started:
+            return
+        _background_started = True
+        EMBEDDER.start()
+        EMBEDDER.submit_many(KB.unembedded_documents())
+        if KB.shadow_status() is not None:
+            print("INFO: Resuming re-embedding into the shadow index")
+            threading.Thread(target=KB.reembed, name="vidmelt-reembed", daemon=True).start()
+        if not KB.related_neighbours():
+            # Built once; afterwards every embed updates just the affected neighbourhood.
+            print("INFO: Building the related-videos graph")
+            threading.Thread(target=KB.build_related_graph, name="vidmelt-related", daemon=True).start()
+        print(f"INFO: Starting {WORKERS.workers} queue worker(s)")
+        WORKERS.start()
+
+
+@app.before_request
+def _ensure_background_workers():
+    if app.config["START_WORKERS"]:
+        start_background_workers()
+
+
 @app.route('/summaries/<filename>')
 def download_summary(filename):
     return send_from_directory(SUMMARY_DIR, filename, as_attachment=True)
@@ -90,13 +300,28 @@ def download_summary(filename):
 def download_transcript(filename):
     return send_from_directory(TRANSCRIPT_DIR, filename, as_attachment=True)
 
+
+@app.route('/videos/<video_name>')
+def stream_video(video_name):
+    # Served inline with range support, so chat sources can link to ``#t=<seconds>``.
+    for path in sorted(UPLOAD_FOLDER.glob(f"{glob.escape(video_name)}.*")):
+        return send_from_directory(UPLOAD_FOLDER, path.name)
+    return jsonify({"error": "unknown video"}), 404
+
 if __name__ == '__main__':
     # Check for OpenAI API key
     if not os.getenv("OPENAI_API_KEY"):
         print("Error: OPENAI_API_KEY not found in .env file.")
         print("Please create a .env file and add your OpenAI API key.")
     else:
-        KB.sync_from_directories(pipeline.TRANSCRIPT_DIR, pipeline.SUMMARY_DIR)
+        sync = KB.sync_from_directories(pipeline.TRANSCRIPT_DIR, pipeline.SUMMARY_DIR)
+        print(
+            f"INFO: Knowledge base sync: {sync.added} added, {sync.updated} updated, "
+            f"{sync.removed} removed, {sync.unchanged} unchanged"
+        )
+        for model_name in filter(None, os.getenv("VIDMELT_WHISPER_PRELOAD", "").split(",")):
+            print(f"INFO: Preloading Whisper model '{model_name.strip()}'")
+            transcriber.GLOBAL_POOL.get(model_name.strip())
         if isinstance(EVENT_BUS, RedisEventBus):
             try:
                 r = redis.from_url(app.config["REDIS_URL"])
@@ -108,4 +333,8 @@ if __name__ == '__main__':
         else:
             print("INFO: Running with in-memory event bus; Redis check skipped.")
 
+        # Drain jobs left from a previous run without waiting for a request;
+        # with the debug reloader, only the serving child process does this.
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            start_background_workers()
         app.run(debug=True)
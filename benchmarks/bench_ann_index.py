@@ -0,0 +1,70 @@
+"""Recall@k and latency of the IVF index against exact search.
+
+Usage::
+
+    python benchmarks/bench_ann_index.py --chunks 200000 --dim 384 --nprobe 1 4 8 16 32
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from vidmelt import ann  # noqa: E402
+
+
+def synthetic_embeddings(chunks: int, dim: int, topics: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around ``topics`` centres, like chunks of videos on shared subjects."""
+
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(topics, dim))
+    vectors = centres[rng.integers(0, topics, size=chunks)] + 0.6 * rng.normal(size=(chunks, dim))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    vectors = synthetic_embeddings(args.chunks, args.dim, args.topics)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)] + 0.1 * rng.normal(size=(args.queries, args.dim))
+
+    started = time.perf_counter()
+    truth = [set(np.argpartition(-(vectors @ query), args.k)[: args.k].tolist()) for query in queries]
+    exact_ms = 1000 * (time.perf_counter() - started) / args.queries
+    print(f"{args.chunks} chunks x {args.dim} dims, {args.queries} queries, k={args.k}")
+    print(f"exact           : {exact_ms:8.2f} ms/query  recall@{args.k} 1.000")
+
+    started = time.perf_counter()
+    index = ann.IVFIndex.train(vectors, nlist=args.nlist)
+    index.add(np.arange(len(vectors)), vectors, "all")
+    print(f"IVF build       : {time.perf_counter() - started:8.2f} s ({index.nlist} lists)")
+
+    for nprobe in args.nprobe:
+        started = time.perf_counter()
+        found = [{row for row, _score in index.search(query, args.k, nprobe=nprobe)} for query in queries]
+        elapsed = 1000 * (time.perf_counter() - started) / args.queries
+        recall = np.mean([len(a & b) / args.k for a, b in zip(truth, found)])
+        print(f"IVF nprobe={nprobe:<4d}: {elapsed:8.2f} ms/query  recall@{args.k} {recall:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,54 @@
+"""Compare single-run and chunked parallel Whisper transcription wall time.
+
+Usage::
+
+    python benchmarks/bench_chunked_transcription.py audio_files/talk.wav --model base --workers 2 4
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from vidmelt import transcriber  # noqa: E402
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("audio", type=Path, help="16 kHz mono WAV produced by the ffmpeg stage")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--chunk-seconds", type=float, default=transcriber.DEFAULT_CHUNK_SECONDS)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    audio = transcriber.load_wav(args.audio)
+    duration = len(audio) / transcriber.SAMPLE_RATE
+    print(f"Audio: {args.audio} ({duration:.1f}s), model={args.model}")
+
+    transcriber.GLOBAL_POOL.get(args.model)  # exclude weight loading from the baseline
+    started = time.perf_counter()
+    transcriber.GLOBAL_POOL.transcribe(audio, args.model)
+    baseline = time.perf_counter() - started
+    print(f"single run      : {baseline:8.2f}s  (RTF {baseline / duration:.3f})")
+
+    for workers in args.workers:
+        # Warm the worker processes so model loading is not counted.
+        transcriber.transcribe_chunked(audio[: transcriber.SAMPLE_RATE], args.model, workers=workers)
+        started = time.perf_counter()
+        transcriber.transcribe_chunked(audio, args.model, workers=workers, chunk_seconds=args.chunk_seconds)
+        elapsed = time.perf_counter() - started
+        print(
+            f"chunked x{workers:<2d}     : {elapsed:8.2f}s  (RTF {elapsed / duration:.3f}, "
+            f"speedup {baseline / elapsed:.2f}x)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+"""Load time and encoding throughput of each embedding backend.
+
+Every registered backend (SentenceTransformer, ONNX Runtime, feature hashing)
+is loaded and used to encode the same synthetic transcript chunks; backends
+whose dependencies are missing are reported and skipped.  Peak RSS growth is
+measured per backend, so run one backend at a time for exact memory numbers.
+
+Usage::
+
+    python benchmarks/bench_embed_backends.py --chunks 5000 --batch-size 256
+    python benchmarks/bench_embed_backends.py --backend hashing --model hash-2048
+"""
+from __future__ import annotations
+
+import argparse
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from vidmelt import embedders  # noqa: E402
+
+WORDS = [f"term{n}" for n in range(5000)] + ["python", "flask", "pasta", "guitar", "gradient", "descent"]
+
+
+def synthetic_chunks(count: int, words_per_chunk: int, seed: int = 0) -> List[str]:
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, size=words_per_chunk)) + "." for _ in range(count)]
+
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--words-per-chunk", type=int, default=60)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--backend", action="append", choices=sorted(embedders.BACKENDS), help="Repeatable; default all")
+    parser.add_argument("--model", help="Model for a single --backend (default: the backend's default)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    chunks = synthetic_chunks(args.chunks, args.words_per_chunk)
+    print(f"{args.chunks} chunks of {args.words_per_chunk} words, batch size {args.batch_size}")
+    for backend in args.backend or list(embedders.BACKENDS):
+        model_name = args.model if args.model and args.backend and len(args.backend) == 1 else embedders.default_model(backend)
+        rss_before = peak_rss_mib()
+        started = time.perf_counter()
+        try:
+            model = embedders.load(backend, model_name)
+        except ImportError as exc:
+            print(f"{backend:<22}: skipped ({exc})")
+            continue
+        loaded = time.perf_counter() - started
+        model.encode(chunks[: min(len(chunks), args.batch_size)], batch_size=args.batch_size)  # warm up
+        started = time.perf_counter()
+        vectors = np.asarray(model.encode(chunks, batch_size=args.batch_size, normalize_embeddings=True))
+        elapsed = time.perf_counter() - started
+        print(
+            f"{backend:<22}: load {loaded:6.2f} s  {len(chunks) / elapsed:9.0f} chunks/s  "
+            f"dim {vectors.shape[1]:5d}  peak RSS +{peak_rss_mib() - rss_before:6.0f} MiB  ({model_name})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
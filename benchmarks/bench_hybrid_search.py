@@ -0,0 +1,103 @@
+"""Compare full-text, semantic and hybrid (rank-fused) search latency.
+
+The hybrid path runs the FTS5 query and the vector top-k concurrently, so its
+latency should stay close to the slower of the two rather than their sum.
+``--encode-ms`` simulates the cost of encoding the query with a real model.
+
+Usage::
+
+    python benchmarks/bench_hybrid_search.py --videos 2000 --chunks-per-video 20 --queries 50
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from vidmelt import knowledge  # noqa: E402
+
+WORDS = [f"term{n}" for n in range(5000)]
+
+
+class SlowRandomModel:
+    def __init__(self, dim: int, encode_seconds: float, seed: int = 0):
+        self.dim = dim
+        self.encode_seconds = encode_seconds
+        self.rng = np.random.default_rng(seed)
+
+    def encode(self, items, **_):
+        if len(items) == 1:
+            time.sleep(self.encode_seconds)
+        vectors = self.rng.normal(size=(len(items), self.dim)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def populate(kb: knowledge.KnowledgeBase, videos: int, chunks_per_video: int, words_per_chunk: int) -> None:
+    rng = np.random.default_rng(1)
+    with kb._connect() as conn:
+        for index in range(videos):
+            name = f"video-{index:06d}"
+            chunks = [
+                " ".join(rng.choice(WORDS, size=words_per_chunk)) + "." for _ in range(chunks_per_video)
+            ]
+            conn.execute(
+                "INSERT INTO documents (video_name, transcript_path, transcript) VALUES (?, ?, ?)",
+                (name, f"transcripts/{name}.txt", " ".join(chunks)),
+            )
+        conn.commit()
+
+
+def timed(label: str, queries: int, run: Callable[[int], object]) -> None:
+    started = time.perf_counter()
+    for n in range(queries):
+        run(n)
+    elapsed = (time.perf_counter() - started) / queries
+    print(f"{label:<22}: {1000 * elapsed:9.2f} ms/query")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--chunks-per-video", type=int, default=20)
+    parser.add_argument("--words-per-chunk", type=int, default=60)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--encode-ms", type=float, default=5.0, help="Simulated query encoding time")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    model = SlowRandomModel(args.dim, args.encode_ms / 1000)
+    knowledge._load_embeddings_model = lambda model_name=knowledge.DEFAULT_EMBED_MODEL: model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kb = knowledge.KnowledgeBase(Path(tmp) / "kb.sqlite3")
+        populate(kb, args.videos, args.chunks_per_video, args.words_per_chunk)
+        report = kb.build_embeddings()
+        print(f"{args.videos} videos, {report.chunks} chunks x {args.dim} dims")
+        list(kb.semantic_search("warm up", limit=args.limit))
+
+        def query(n: int) -> str:
+            return f"{WORDS[(7 * n) % len(WORDS)]} {WORDS[(13 * n) % len(WORDS)]}"
+
+        timed("full-text (bm25)", args.queries, lambda n: list(kb.search(query(n), limit=args.limit)))
+        timed("semantic", args.queries, lambda n: list(kb.semantic_search(query(n), limit=args.limit)))
+        timed(
+            "sequential fts+vector",
+            args.queries,
+            lambda n: (list(kb.search(query(n), limit=args.limit)), list(kb.semantic_search(query(n), limit=args.limit))),
+        )
+        timed("hybrid (concurrent)", args.queries, lambda n: kb.hybrid_search(query(n), limit=args.limit))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
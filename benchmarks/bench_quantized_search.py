@@ -0,0 +1,93 @@
+"""Memory saved and recall@k lost by scoring on float16/int8 vectors.
+
+Each mode scans a quantized copy of N synthetic chunk embeddings and rescores
+the best ``--rescore`` * k candidates against the float32 rows; recall is
+measured against exact float32 search, with and without rescoring.
+
+Usage::
+
+    python benchmarks/bench_quantized_search.py --chunks 200000 --dim 384 --rescore 4
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from vidmelt import knowledge  # noqa: E402
+from vidmelt.vector_store import QUANTIZATIONS, QuantizedVectors, VectorFile  # noqa: E402
+
+
+def synthetic_embeddings(chunks: int, dim: int, topics: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(topics, dim))
+    vectors = centres[rng.integers(0, topics, size=chunks)] + 0.6 * rng.normal(size=(chunks, dim))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall(truth: list, found: list, k: int) -> float:
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(truth, found)]))
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--rescore", type=int, default=knowledge.RESCORE_FACTOR, help="Candidates per hit to rescore")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    vectors = synthetic_embeddings(args.chunks, args.dim, args.topics)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)] + 0.1 * rng.normal(size=(args.queries, args.dim))
+    knowledge.RESCORE_FACTOR = args.rescore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorFile(Path(tmp) / "vectors.f32", args.dim)
+        store.append(vectors)
+        float32_bytes = store.rows * store.row_bytes
+        print(f"{args.chunks} chunks x {args.dim} dims, {args.queries} queries, k={args.k}, rescore x{args.rescore}")
+
+        truth = None
+        for mode in QUANTIZATIONS:
+            quantized = None
+            if mode != "float32":
+                quantized = QuantizedVectors(Path(tmp) / f"vectors.{mode}", args.dim, mode)
+                quantized.catch_up(store)
+            matrix = knowledge._EmbeddingMatrix(store, generation=0, quantized=quantized)
+            matrix.assign("all", range(len(vectors)))
+
+            started = time.perf_counter()
+            found = [[slot for slot, _score in matrix.top_k(query, args.k)] for query in queries]
+            elapsed = 1000 * (time.perf_counter() - started) / args.queries
+            if truth is None:
+                truth = found
+            scanned = quantized.nbytes if quantized is not None else float32_bytes
+            line = (
+                f"{mode:<8}: {scanned / 2**20:8.1f} MiB scanned ({scanned / float32_bytes:4.0%})  "
+                f"{elapsed:7.2f} ms/query  recall@{args.k} {recall(truth, found, args.k):.3f}"
+            )
+            if quantized is not None:
+                raw = [
+                    np.argsort(-quantized.scores(query / np.linalg.norm(query), len(vectors)))[: args.k].tolist()
+                    for query in queries
+                ]
+                line += f" (no rescoring {recall(truth, raw, args.k):.3f})"
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
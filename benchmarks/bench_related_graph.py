@@ -0,0 +1,99 @@
+"""Build time, incremental update time and lookup latency of the related-videos graph.
+
+A throwaway knowledge base is filled with synthetic videos whose chunk
+vectors cluster around shared topics.  The full graph build, the
+incremental update after one more video is embedded, and a panel lookup are
+timed, next to the on-demand alternative of one ``semantic_search`` per page
+view.
+
+Usage::
+
+    python benchmarks/bench_related_graph.py --videos 2000 --chunks-per-video 20 --dim 384
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from vidmelt import knowledge  # noqa: E402
+
+
+class TopicModel:
+    """Deterministic vectors: each line's topic centre plus noise seeded by the line's text."""
+
+    def __init__(self, dim: int, topics: int):
+        self.centres = np.random.default_rng(0).normal(size=(topics, dim)).astype(np.float32)
+
+    def encode(self, items, **_):
+        rows = []
+        for text in items:
+            topic = int(text.split()[1]) % len(self.centres)
+            noise = np.random.default_rng(zlib.crc32(text.encode())).normal(size=self.centres.shape[1])
+            rows.append(self.centres[topic] + 0.8 * noise)
+        return np.asarray(rows, dtype=np.float32)
+
+
+def write_video(directory: Path, index: int, chunks: int, topics: int) -> Path:
+    path = directory / f"video-{index:06d}.txt"
+    topic = index % topics
+    # One chunk per line: each line alone fills the chunk budget.
+    lines = [f"topic {topic} part {part} " + " ".join(["filler"] * 150) for part in range(chunks)]
+    path.write_text("\n".join(lines))
+    return path
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--chunks-per-video", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=100)
+    parser.add_argument("--neighbours", type=int, default=10)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    model = TopicModel(args.dim, args.topics)
+    knowledge._load_embeddings_model = lambda model_name=knowledge.DEFAULT_EMBED_MODEL: model
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for index in range(args.videos):
+            write_video(root, index, args.chunks_per_video, args.topics)
+        kb = knowledge.KnowledgeBase(root / "kb.sqlite3")
+        kb.index_directory(root)
+        report, seconds = timed(kb.build_embeddings)
+        print(f"{args.videos} videos, {report.chunks} chunks of dim {args.dim} embedded in {seconds:.1f}s")
+
+        graph, seconds = timed(kb.build_related_graph, neighbours=args.neighbours)
+        print(f"full build:          {seconds * 1000:9.1f} ms  ({graph.edges} edges)")
+
+        path = write_video(root, args.videos, args.chunks_per_video, args.topics)
+        kb.upsert_document(path.stem, path)
+        _result, seconds = timed(kb.update_embeddings_for, path.stem)
+        print(f"embed + update 1:    {seconds * 1000:9.1f} ms  (encoding included)")
+
+        names = [f"video-{index:06d}" for index in range(0, args.videos, max(1, args.videos // 200))]
+        _result, seconds = timed(lambda: [kb.related_videos(name, limit=5) for name in names])
+        print(f"graph lookup:        {seconds / len(names) * 1000:9.3f} ms per panel")
+        _result, seconds = timed(lambda: [list(kb.semantic_search(f"topic {name[-3:]}", limit=6)) for name in names])
+        print(f"semantic_search:     {seconds / len(names) * 1000:9.3f} ms per panel (on-demand scan)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
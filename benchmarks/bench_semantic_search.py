@@ -0,0 +1,106 @@
+"""Time semantic_search over a synthetic knowledge base of N embedded chunks.
+
+Usage::
+
+    python benchmarks/bench_semantic_search.py --chunks 100000 --dim 384 --queries 50
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from vidmelt import knowledge  # noqa: E402
+
+
+class RandomModel:
+    def __init__(self, dim: int, seed: int = 0):
+        self.dim = dim
+        self.rng = np.random.default_rng(seed)
+
+    def encode(self, items, **_):
+        vectors = self.rng.normal(size=(len(items), self.dim)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def populate(kb: knowledge.KnowledgeBase, chunks: int, dim: int, per_video: int) -> None:
+    rng = np.random.default_rng(1)
+    with kb._connect() as conn:
+        for start in range(0, chunks, per_video):
+            name = f"video-{start // per_video:06d}"
+            conn.execute(
+                "INSERT INTO documents (video_name, transcript_path, transcript) VALUES (?, ?, ?)",
+                (name, f"transcripts/{name}.txt", "synthetic"),
+            )
+            vectors = rng.normal(size=(min(per_video, chunks - start), dim)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            conn.executemany(
+                "INSERT INTO embeddings (video_name, chunk_index, chunk_text, embedding, norm) VALUES (?, ?, ?, ?, 1.0)",
+                [(name, idx, f"chunk {idx}", knowledge._to_blob(vector)) for idx, vector in enumerate(vectors)],
+            )
+        knowledge._bump_embeddings_version(conn)
+        conn.commit()
+
+
+def row_by_row(kb: knowledge.KnowledgeBase, query_vec: np.ndarray, limit: int) -> list:
+    """The original implementation: fetch every BLOB row, score and sort in Python."""
+
+    with kb._connect() as conn:
+        rows = conn.execute(
+            "SELECT e.video_name, e.chunk_text, d.transcript_path, d.summary_path, e.embedding "
+            "FROM embeddings e JOIN documents d ON d.video_name = e.video_name"
+        ).fetchall()
+    hits = sorted((1.0 - float(np.dot(query_vec, knowledge._from_blob(row["embedding"]))), row["video_name"]) for row in rows)
+    return hits[:limit]
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--per-video", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    model = RandomModel(args.dim)
+    knowledge._load_embeddings_model = lambda model_name=knowledge.DEFAULT_EMBED_MODEL: model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kb = knowledge.KnowledgeBase(Path(tmp) / "kb.sqlite3")
+        populate(kb, args.chunks, args.dim, args.per_video)
+        print(f"{args.chunks} chunks x {args.dim} dims")
+
+        query_vec = model.encode(["q"])[0]
+        started = time.perf_counter()
+        row_by_row(kb, query_vec, args.limit)
+        print(f"row-by-row scan   : {1000 * (time.perf_counter() - started):9.1f} ms/query")
+
+        started = time.perf_counter()
+        kb._migrate_blob_embeddings()
+        print(f"BLOB -> memmap    : {1000 * (time.perf_counter() - started):9.1f} ms (one-off migration)")
+
+        reader = knowledge.KnowledgeBase(kb.db_path)
+        started = time.perf_counter()
+        reader._embedding_matrix()
+        print(f"matrix cold load  : {1000 * (time.perf_counter() - started):9.1f} ms (maps the vector file)")
+
+        started = time.perf_counter()
+        for n in range(args.queries):
+            list(reader.semantic_search(f"query {n}", limit=args.limit))
+        elapsed = (time.perf_counter() - started) / args.queries
+        print(f"resident matrix   : {1000 * elapsed:9.2f} ms/query")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+"""Sync, semantic and hybrid search latency of one knowledge-base file against N hash shards.
+
+The same synthetic library is synced into a single ``KnowledgeBase`` and a
+``ShardedKnowledgeBase``.  Each timed query is distinct, so neither result
+cache answers it, and both sides read the same cached query embedding.
+
+Usage::
+
+    python benchmarks/bench_sharded_search.py --videos 4000 --chunks-per-video 25 --dim 384 --shards 4
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from vidmelt import knowledge, shards  # noqa: E402
+
+WORDS = ("python", "flask", "pasta", "sauce", "guitar", "chords", "piano", "camera", "garden", "bread")
+
+
+class HashModel:
+    """Deterministic vectors seeded by the text, cheap enough not to dominate the timings."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def encode(self, items, **_):
+        return np.asarray(
+            [np.random.default_rng(zlib.crc32(text.encode())).normal(size=self.dim) for text in items],
+            dtype=np.float32,
+        )
+
+
+def write_library(directory: Path, videos: int, chunks: int) -> None:
+    rng = np.random.default_rng(0)
+    for index in range(videos):
+        # One chunk per line: each line alone fills the chunk budget.
+        lines = [" ".join(rng.choice(WORDS, size=150)) for _ in range(chunks)]
+        (directory / f"video-{index:06d}.txt").write_text("\n".join(lines))
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def per_query(kb, method: str, queries: Sequence[str], limit: int) -> float:
+    search = getattr(kb, method)
+    started = time.perf_counter()
+    for query in queries:
+        list(search(query, limit=limit))
+    return (time.perf_counter() - started) / len(queries)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=4000)
+    parser.add_argument("--chunks-per-video", type=int, default=25)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    model = HashModel(args.dim)
+    knowledge._load_embeddings_model = lambda model_name=knowledge.DEFAULT_EMBED_MODEL: model
+    rng = np.random.default_rng(1)
+    queries = [" ".join(rng.choice(WORDS, size=3)) + f" {n}" for n in range(args.queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        transcripts = root / "transcripts"
+        transcripts.mkdir()
+        write_library(transcripts, args.videos, args.chunks_per_video)
+        single = knowledge.KnowledgeBase(root / "single.sqlite3")
+        sharded = knowledge.ShardedKnowledgeBase(root / "kb.sqlite3", shards.HashRouter(args.shards))
+        sharded.query_embeddings = single.query_embeddings
+        for shard in sharded.shards.values():
+            shard.query_embeddings = single.query_embeddings
+
+        _report, single_sync = timed(single.sync_from_directories, transcripts)
+        _report, sharded_sync = timed(sharded.sync_from_directories, transcripts)
+        for query in queries:
+            single._encode_query(query, single.resolve_embedding_space())
+        list(single.semantic_search("warm up", limit=args.limit))
+        list(sharded.semantic_search("warm up", limit=args.limit))
+
+        print(f"{args.videos} videos x {args.chunks_per_video} chunks of dim {args.dim}; {args.shards} shards")
+        print(f"{'':18}{'1 file':>12}{f'{args.shards} shards':>12}")
+        print(f"{'sync + embed':18}{single_sync:11.1f}s{sharded_sync:11.1f}s")
+        for method in ("search", "semantic_search", "hybrid_search"):
+            one = per_query(single, method, queries, args.limit)
+            many = per_query(sharded, method, [f"{query} " for query in queries], args.limit)
+            print(f"{method:18}{one * 1000:10.2f}ms{many * 1000:10.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,62 +1,219 @@
 
 import os
-import openai
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import List, Optional
+
+from vidmelt import openai_client, summary_cache
 
 # Directories
 TRANSCRIPT_DIR = Path("transcripts")
 SUMMARY_DIR = Path("summaries")
 
+# Bump PROMPT_VERSION whenever the prompt below changes so cached summaries are regenerated.
+SUMMARY_MODEL = "gpt-4o"
+PROMPT_VERSION = "v2"
+
+
+def summary_variant() -> str:
+    """Identify the prompt/model combination that produced a summary."""
+    return f"{PROMPT_VERSION}:{SUMMARY_MODEL}"
+
 
 class SummarizationError(RuntimeError):
     """Raised when summarization fails."""
 
-def summarize_transcript(transcript_path: Path, video_title: str):
+
+SYSTEM_PROMPT = (
+    "You are an expert summarization agent. "
+    "Your goal is to create a clear, concise, and professional summary of a video transcript."
+)
+
+# Transcripts up to ~4000 words go out in a single call; longer ones are
+# summarized chunk by chunk and the partial summaries reduced into one.
+SINGLE_CALL_TOKENS = 5400
+CHUNK_TOKENS = 3000
+SUMMARY_CONCURRENCY = int(os.getenv("VIDMELT_SUMMARY_CONCURRENCY", "4"))
+
+
+def _estimate_tokens(text: str) -> int:
+    # Roughly 0.75 words per token for English prose.
+    return (len(text.split()) * 4 + 2) // 3
+
+
+def _split_transcript(text: str, budget: Optional[int] = None) -> List[str]:
+    """Split on line breaks (Whisper segments) into chunks of at most ``budget`` tokens."""
+
+    max_words = max(1, (budget or CHUNK_TOKENS) * 3 // 4)
+    chunks: List[str] = []
+    current: List[str] = []
+    count = 0
+    for line in text.splitlines():
+        words = line.split()
+        while words:
+            room = max_words - count
+            if room <= 0:
+                chunks.append(" ".join(current))
+                current, count = [], 0
+                room = max_words
+            current.extend(words[:room])
+            count += len(words[:room])
+            words = words[room:]
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _final_prompt(video_title: str, body: str, *, partial: bool) -> str:
+    source = (
+        "Here are summaries of consecutive parts of the transcript, in order"
+        if partial
+        else "Here is the transcript"
+    )
+    return (
+        f"Please generate a summary for the video titled '{video_title}'.\n\n"
+        "The summary should include:\n"
+        "1. A short, engaging title.\n"
+        "2. A 2-3 sentence overview of the video's main topic.\n"
+        "3. A bulleted list of the 3-5 most important key takeaways.\n\n"
+        f"{source}:\n\n{body}"
+    )
+
+
+def _chunk_prompt(video_title: str, index: int, total: int, chunk: str) -> str:
+    return (
+        f"This is part {index} of {total} of the transcript of the video titled '{video_title}'.\n"
+        "Write concise notes covering every topic, claim and example in this part, "
+        "as a short bulleted list. Do not add an introduction or conclusion.\n\n"
+        f"Transcript part:\n\n{chunk}"
+    )
+
+
+@dataclass
+class SummaryResult:
+    summary_path: Path
+    cached: bool
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+
+
+class _Usage:
+    """Token usage accumulated across the (possibly concurrent) calls of one summary."""
+
+    def __init__(self) -> None:
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, usage) -> None:
+        if usage is None:
+            return
+        with self._lock:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+
+def _complete(client, prompt: str, usage: Optional[_Usage] = None) -> str:
+    response = client.chat.completions.create(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+    )
+    if usage is not None:
+        usage.add(getattr(response, "usage", None))
+    return response.choices[0].message.content
+
+
+def _map_reduce(client, transcript_text: str, video_title: str, concurrency: int, usage: _Usage) -> str:
+    text = transcript_text
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        # Reduce hierarchically until the partial summaries fit in one call.
+        while True:
+            chunks = _split_transcript(text)
+            total = len(chunks)
+            partials = list(
+                executor.map(
+                    lambda item: _complete(client, _chunk_prompt(video_title, item[0], total, item[1]), usage),
+                    enumerate(chunks, 1),
+                )
+            )
+            previous_tokens = _estimate_tokens(text)
+            text = "\n\n".join(f"Part {idx}:\n{partial}" for idx, partial in enumerate(partials, 1))
+            tokens = _estimate_tokens(text)
+            if tokens <= SINGLE_CALL_TOKENS or total == 1 or tokens >= previous_tokens:
+                return _complete(client, _final_prompt(video_title, text, partial=True), usage)
+
+
+def summarize_transcript(
+    transcript_path: Path,
+    video_title: str,
+    *,
+    concurrency: Optional[int] = None,
+    cache: Optional[summary_cache.SummaryCache] = None,
+) -> SummaryResult:
     """
     Summarizes a transcript using OpenAI GPT-3.5/4.
+
+    Long transcripts are split into token-budgeted chunks that are summarized
+    concurrently (at most ``concurrency`` requests in flight) and then reduced
+    into the final Markdown.  Results are cached by transcript content, prompt
+    version and model, so unchanged transcripts are never sent twice.
     """
     try:
         with open(transcript_path, "r") as f:
             transcript_text = f.read()
 
-        # Truncate to 12,000 tokens (approx. 4000 words)
-        if len(transcript_text.split()) > 4000:
-            transcript_text = " ".join(transcript_text.split()[:4000])
-
-        client = openai.OpenAI()
-
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert summarization agent. "
-                        "Your goal is to create a clear, concise, and professional summary of a video transcript."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"Please generate a summary for the video titled '{video_title}'.\n\n"
-                        "The summary should include:\n"
-                        "1. A short, engaging title.\n"
-                        "2. A 2-3 sentence overview of the video's main topic.\n"
-                        "3. A bulleted list of the 3-5 most important key takeaways.\n\n"
-                        f"Here is the transcript:\n\n{transcript_text}"
-                    )
-                }
-            ]
-        )
+        cache = cache or summary_cache.GLOBAL_CACHE
+        text_hash = summary_cache.transcript_hash(transcript_text)
+        summary_path = SUMMARY_DIR / f"{video_title}.md"
+
+        cached = cache.get(text_hash, PROMPT_VERSION, SUMMARY_MODEL)
+        if cached is not None:
+            with open(summary_path, "w") as f:
+                f.write(cached.summary)
+            print(f"Summary for {video_title} reused from cache.")
+            return SummaryResult(
+                summary_path,
+                cached=True,
+                prompt_tokens=cached.prompt_tokens,
+                completion_tokens=cached.completion_tokens,
+                latency=cached.latency,
+            )
 
-        summary = response.choices[0].message.content
+        client = openai_client.shared_client()
+        usage = _Usage()
+        started = time.perf_counter()
+
+        if _estimate_tokens(transcript_text) <= SINGLE_CALL_TOKENS:
+            summary = _complete(client, _final_prompt(video_title, transcript_text, partial=False), usage)
+        else:
+            summary = _map_reduce(client, transcript_text, video_title, concurrency or SUMMARY_CONCURRENCY, usage)
+        latency = time.perf_counter() - started
 
         # 4. File Output
-        summary_path = SUMMARY_DIR / f"{video_title}.md"
         with open(summary_path, "w") as f:
             f.write(summary)
 
+        cache.put(
+            text_hash,
+            PROMPT_VERSION,
+            SUMMARY_MODEL,
+            summary_cache.CachedSummary(summary, usage.prompt_tokens, usage.completion_tokens, latency),
+        )
         print(f"Summary for {video_title} created successfully.")
+        return SummaryResult(
+            summary_path,
+            cached=False,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            latency=latency,
+        )
 
     except Exception as e:
         raise SummarizationError(f"failed to summarize {video_title}: {e}") from e
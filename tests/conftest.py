@@ -1,8 +1,130 @@
+import os
+import sqlite3
 import sys
+import tempfile
 from pathlib import Path
 
+import numpy as np
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+# Modules open their default databases on import; keep them off the ones in the checkout.
+_DB_DIR = Path(tempfile.mkdtemp(prefix="vidmelt-tests-"))
+os.environ.setdefault("VIDMELT_HISTORY_DB", str(_DB_DIR / "vidmelt_history.sqlite3"))
+os.environ.setdefault("VIDMELT_KB_DB", str(_DB_DIR / "vidmelt_kb.sqlite3"))
+
+from vidmelt import knowledge  # noqa: E402
+
 collect_ignore_glob = ["vidmelt"]
+
+
+@pytest.fixture(autouse=True)
+def no_background_workers(monkeypatch):
+    """Keep test requests from starting the app's real queue and embedding workers."""
+
+    app = sys.modules.get("app")
+    if app is not None:
+        monkeypatch.setitem(app.app.config, "START_WORKERS", False)
+
+
+# The knowledge-base schema of the first release, before any migration.
+BASELINE_SCHEMA = """
+CREATE TABLE documents (
+    video_name TEXT PRIMARY KEY,
+    transcript_path TEXT NOT NULL,
+    summary_path TEXT,
+    transcript TEXT NOT NULL,
+    summary TEXT
+);
+CREATE VIRTUAL TABLE documents_fts USING fts5(
+    video_name, transcript, summary, content='documents', content_rowid='rowid'
+);
+CREATE TABLE embeddings (
+    video_name TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    chunk_text TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    norm REAL NOT NULL,
+    PRIMARY KEY(video_name, chunk_index)
+);
+CREATE TRIGGER documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, video_name, transcript, summary)
+    VALUES (new.rowid, new.video_name, new.transcript, new.summary);
+END;
+"""
+
+
+@pytest.fixture
+def baseline_db():
+    """Write a first-release knowledge base: ``{video: (transcript path, summary path, [(chunk, vector)])}``."""
+
+    def create(db_path, videos):
+        conn = sqlite3.connect(db_path)
+        conn.executescript(BASELINE_SCHEMA)
+        for video_name, (transcript_path, summary_path, chunks) in videos.items():
+            conn.execute(
+                "INSERT INTO documents (video_name, transcript_path, summary_path, transcript, summary) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    video_name,
+                    str(transcript_path),
+                    str(summary_path) if summary_path else None,
+                    Path(transcript_path).read_text(),
+                    Path(summary_path).read_text() if summary_path else None,
+                ),
+            )
+            for index, (text, vector) in enumerate(chunks):
+                vector = np.asarray(vector, dtype=np.float32)
+                conn.execute(
+                    "INSERT INTO embeddings (video_name, chunk_index, chunk_text, embedding, norm) VALUES (?, ?, ?, ?, ?)",
+                    (video_name, index, text, vector.tobytes(), float(np.linalg.norm(vector))),
+                )
+        conn.commit()
+        conn.close()
+        return db_path
+
+    return create
+
+
+class KeywordModel:
+    """Bag-of-keywords embedder, one dimension per ``vocab`` term, so rankings are predictable."""
+
+    def __init__(self, vocab):
+        self.vocab = tuple(vocab)
+        self.calls = 0
+        self.batches = []
+
+    def encode(self, items, **_):
+        self.calls += 1
+        self.batches.append(list(items))
+        rows = [[text.lower().count(term) + 0.01 for term in self.vocab] for text in items]
+        return np.asarray(rows, dtype=np.float32)
+
+
+@pytest.fixture
+def keyword_model(monkeypatch):
+    """Install a :class:`KeywordModel` over the given vocabulary as the sentence-transformers model."""
+
+    def install(vocab):
+        model = KeywordModel(vocab)
+        monkeypatch.setattr(knowledge, "_load_embeddings_model", lambda model_name=knowledge.DEFAULT_EMBED_MODEL: model)
+        return model
+
+    return install
+
+
+@pytest.fixture
+def topic_transcripts():
+    """Six short transcripts in three topics: code, food and music."""
+
+    return {
+        "flask-intro": "Python and Flask. Flask routes.",
+        "flask-deploy": "Deploying Flask apps written in Python.",
+        "python-tips": "Python tips and more Python.",
+        "pasta": "Pasta with tomato sauce.",
+        "sauces": "Three sauces for pasta.",
+        "guitar": "Guitar chords for beginners.",
+    }
@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from vidmelt import ann, knowledge
+
+
+def _clustered(rng, clusters=16, per_cluster=50, dim=16):
+    centers = rng.normal(size=(clusters, dim))
+    points = np.repeat(centers, per_cluster, axis=0) + 0.1 * rng.normal(size=(clusters * per_cluster, dim))
+    return points.astype(np.float32)
+
+
+def test_ivf_recall_against_exact_search():
+    rng = np.random.default_rng(0)
+    vectors = _clustered(rng)
+    index = ann.IVFIndex.train(vectors, nlist=16)
+    index.add(np.arange(len(vectors)), vectors, "all")
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    recalls = []
+    for query in vectors[rng.choice(len(vectors), 20, replace=False)] + 0.05 * rng.normal(size=(20, 16)):
+        exact = set(np.argsort(-(unit @ (query / np.linalg.norm(query))))[:10].tolist())
+        found = {row_id for row_id, _score in index.search(query, 10, nprobe=3)}
+        recalls.append(len(exact & found) / 10)
+    assert np.mean(recalls) >= 0.9
+
+    everything = index.search(vectors[0], len(vectors), nprobe=index.nlist)
+    assert len(everything) == len(vectors)
+    assert [score for _id, score in everything] == sorted((score for _id, score in everything), reverse=True)
+
+
+def test_ivf_groups_save_and_load(tmp_path):
+    rng = np.random.default_rng(1)
+    index = ann.IVFIndex(rng.normal(size=(4, 8)), version=3)
+    index.add([1, 2, 3], rng.normal(size=(3, 8)), "a")
+    index.add([4, 5], rng.normal(size=(2, 8)), "b")
+    assert index.remove_group("a") == 3
+    index.add([6], rng.normal(size=(1, 8)), "a")
+
+    path = tmp_path / "kb.ivf.npz"
+    index.save(path)
+    loaded = ann.IVFIndex.load(path)
+
+    assert loaded.version == 3
+    assert len(loaded) == 3
+    assert sorted(loaded.groups) == ["a", "b"]
+    query = rng.normal(size=8)
+    assert loaded.search(query, 3, nprobe=4) == index.search(query, 3, nprobe=4)
+
+
+def test_knowledge_base_ivf_search_stays_in_sync(tmp_path, monkeypatch):
+    vocab = ("python", "pasta", "guitar")
+
+    def encode(items, **_):
+        return np.asarray(
+            [[text.lower().split().count(term) + 0.01 for term in vocab] for text in items], dtype=np.float32
+        )
+
+    monkeypatch.setattr(
+        knowledge, "_load_embeddings_model", lambda model_name=knowledge.DEFAULT_EMBED_MODEL: SimpleNamespace(encode=encode)
+    )
+    transcripts = tmp_path / "transcripts"
+    transcripts.mkdir()
+    (transcripts / "code.txt").write_text("python python")
+    (transcripts / "food.txt").write_text("pasta pasta")
+    db_path = tmp_path / "kb.sqlite3"
+    kb = knowledge.KnowledgeBase(db_path)
+    kb.index_directory(transcripts)
+    kb.build_embeddings()
+
+    index = kb.build_ann_index(nlist=2)
+    assert kb.ann_path == tmp_path / "kb.ivf.npz" and kb.ann_path.exists()
+    assert len(index) == 2
+    assert [hit.video_name for hit in kb.semantic_search("pasta", limit=1, index="ivf", nprobe=2)] == ["food"]
+
+    # Incremental update in this process.
+    (transcripts / "music.txt").write_text("guitar")
+    kb.upsert_document("music", transcripts / "music.txt")
+    kb.update_embeddings_for("music")
+    assert len(kb._ann) == 3
+    assert [hit.video_name for hit in kb.semantic_search("guitar", limit=1, index="ivf", nprobe=2)] == ["music"]
+
+    # Another process rewrites a video; a fresh instance catches up from the change log.
+    (transcripts / "code.txt").write_text("guitar guitar")
+    kb.upsert_document("code", transcripts / "code.txt")
+    kb.update_embeddings_for("code")
+    fresh = knowledge.KnowledgeBase(db_path)
+    hits = list(fresh.semantic_search("guitar", limit=2, index="ivf", nprobe=2))
+    assert {hit.video_name for hit in hits} == {"code", "music"}
+
+    # The file is rewritten once enough changes have piled up, not after each one.
+    saved = ann.IVFIndex.load(fresh.ann_path).version
+    assert saved < fresh._ann.version
+    monkeypatch.setattr(knowledge, "ANN_SAVE_CHANGES", fresh._ann.version - saved)
+    list(fresh.semantic_search("python", limit=1, index="ivf", nprobe=2))
+    assert ann.IVFIndex.load(fresh.ann_path).version == fresh._ann.version
+
+
+def test_semantic_search_rejects_unknown_index(tmp_path):
+    kb = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    with pytest.raises(ValueError, match="hnsw"):
+        list(kb.semantic_search("q", index="hnsw"))
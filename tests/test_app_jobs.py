@@ -3,7 +3,7 @@ from types import SimpleNamespace
 import pytest
 
 import app
-from vidmelt import history
+from vidmelt import history, knowledge
 
 
 @pytest.fixture
@@ -34,3 +34,50 @@ def test_jobs_page_renders(client):
     body = response.get_data(as_text=True)
     assert "videos/demo.mp4" in body
     assert "Download" in body
+
+
+class RelatedKB:
+    def related_videos(self, video_name, *, limit=None):
+        return [knowledge.RelatedVideo("other", 0.91, "transcripts/other.txt", "summaries/other.md")][:limit]
+
+
+def test_jobs_page_lists_related_videos(client, monkeypatch):
+    monkeypatch.setattr(app, "KB", RelatedKB())
+    body = client.get("/jobs").get_data(as_text=True)
+    assert '<a href="/summary/demo">View</a>' in body
+    assert '<a href="/summary/other" title="similarity 0.91">other</a>' in body
+
+
+def test_summary_page_shows_related_panel(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, "KB", RelatedKB())
+    monkeypatch.setattr(app, "SUMMARY_DIR", tmp_path)
+    (tmp_path / "demo.md").write_text("# Demo\nAll about demos.")
+    body = client.get("/summary/demo").get_data(as_text=True)
+    assert "All about demos." in body
+    assert '<a href="/summary/other">other</a>' in body
+    assert client.get("/summary/missing").status_code == 404
+
+
+def test_first_request_starts_background_workers_once(client, monkeypatch):
+    started = []
+
+    class FakeKB(RelatedKB):
+        def unembedded_documents(self):
+            return ["pending"]
+
+        def shadow_status(self):
+            return None
+
+        def related_neighbours(self):
+            return {"demo": ["other"]}
+
+    monkeypatch.setattr(app, "KB", FakeKB())
+    monkeypatch.setattr(app, "EMBEDDER", SimpleNamespace(
+        start=lambda: started.append("embedder"), submit_many=lambda names: started.extend(names)))
+    monkeypatch.setattr(app, "WORKERS", SimpleNamespace(workers=1, start=lambda: started.append("workers")))
+    monkeypatch.setattr(app, "_background_started", False)
+    monkeypatch.setitem(app.app.config, "START_WORKERS", True)
+
+    client.get("/jobs")
+    client.get("/jobs")
+    assert started == ["embedder", "pending", "workers"]
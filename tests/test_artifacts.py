@@ -0,0 +1,73 @@
+import hashlib
+import io
+
+from vidmelt import artifacts
+
+
+def test_resolve_identifies_duplicate_content(tmp_path):
+    store = artifacts.ArtifactStore(tmp_path / "artifacts.sqlite3")
+    first = tmp_path / "first.mp4"
+    copy = tmp_path / "renamed.mp4"
+    other = tmp_path / "other.mp4"
+    first.write_bytes(b"same video bytes")
+    copy.write_bytes(b"same video bytes")
+    other.write_bytes(b"different bytes!")
+
+    assert store.resolve(first) == store.resolve(copy)
+    assert store.resolve(first) != store.resolve(other)
+
+
+def test_resolve_upgrades_and_splits_on_full_hash(tmp_path):
+    store = artifacts.ArtifactStore(tmp_path / "artifacts.sqlite3")
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"x" * 1000)
+
+    key = store.resolve(video)
+    assert store.resolve(video, full_hash="aaa") == key
+    assert store.resolve(video, full_hash="aaa") == key
+    # Same sampled hash but different full content must not share artifacts.
+    assert store.resolve(video, full_hash="bbb") == "sha256:bbb"
+
+
+def test_save_upload_hashes_while_streaming(tmp_path):
+    destination = tmp_path / "upload.mp4"
+    payload = b"chunk" * 1000
+
+    digest = artifacts.save_upload(io.BytesIO(payload), destination, chunk_size=64)
+
+    assert destination.read_bytes() == payload
+    assert digest == hashlib.sha256(payload).hexdigest()
+
+
+def test_artifact_paths_have_a_single_owner(tmp_path):
+    store = artifacts.ArtifactStore(tmp_path / "artifacts.sqlite3")
+    transcript = tmp_path / "talk.txt"
+    transcript.write_text("first video")
+    store.record("key-a", "transcript", transcript, "whisper-base")
+
+    assert store.lookup("key-a", "transcript", "whisper-base") == transcript
+    assert store.is_reusable(transcript, "key-a")
+    assert not store.is_reusable(transcript, "key-b")
+
+    # A different video with the same stem overwrites the file and takes ownership.
+    transcript.write_text("second video")
+    store.record("key-b", "transcript", transcript, "whisper-base")
+
+    assert store.lookup("key-a", "transcript", "whisper-base") is None
+    assert store.owner(transcript) == "key-b"
+
+
+def test_materialize_copies_cached_artifact(tmp_path):
+    store = artifacts.ArtifactStore(tmp_path / "artifacts.sqlite3")
+    source = tmp_path / "original.md"
+    source.write_text("summary")
+    store.record("key-a", "summary", source, "v1:gpt-4o")
+    destination = tmp_path / "duplicate.md"
+
+    assert store.materialize("key-a", "summary", destination, "v1:gpt-4o")
+    assert destination.read_text() == "summary"
+    assert not store.materialize("key-a", "summary", tmp_path / "other.md", "v2:gpt-4o")
+
+    source.unlink()
+    destination.unlink()
+    assert store.lookup("key-a", "summary", "v1:gpt-4o") is None
@@ -0,0 +1,51 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from vidmelt import audio, transcriber
+
+
+def _fake_ffmpeg(monkeypatch, samples, *, exit_code=0):
+    script = (
+        "import sys\n"
+        f"sys.stdout.buffer.write({samples.astype(np.int16).tobytes()!r})\n"
+        "sys.stderr.write('ffmpeg progress\\n')\n"
+        f"sys.exit({exit_code})\n"
+    )
+    monkeypatch.setattr(audio, "ffmpeg_command", lambda video_path: [sys.executable, "-c", script])
+
+
+def test_extract_pcm_streams_without_wav(tmp_path, monkeypatch):
+    pcm = np.array([0, 16384, -16384, 8192] * 10, dtype=np.int16)
+    _fake_ffmpeg(monkeypatch, pcm)
+
+    extracted = audio.extract_pcm(tmp_path / "clip.mp4", chunk_seconds=3 / audio.SAMPLE_RATE)
+
+    assert extracted.samples.dtype == np.float32
+    assert np.allclose(extracted.samples, pcm / 32768.0)
+    assert "ffmpeg progress" in extracted.log
+    assert not list(tmp_path.glob("*.wav"))
+
+
+def test_extract_pcm_writes_optional_cache(tmp_path, monkeypatch):
+    pcm = np.arange(-50, 50, dtype=np.int16) * 300
+    _fake_ffmpeg(monkeypatch, pcm)
+    cache_path = tmp_path / "clip.wav"
+
+    extracted = audio.extract_pcm(tmp_path / "clip.mp4", cache_path=cache_path)
+
+    assert np.allclose(transcriber.load_wav(cache_path), extracted.samples)
+
+
+def test_extract_pcm_raises_on_ffmpeg_failure(tmp_path, monkeypatch):
+    _fake_ffmpeg(monkeypatch, np.zeros(4, dtype=np.int16), exit_code=3)
+    cache_path = tmp_path / "broken.wav"
+
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        audio.extract_pcm(tmp_path / "broken.mp4", cache_path=cache_path)
+
+    assert excinfo.value.returncode == 3
+    assert "ffmpeg progress" in excinfo.value.stderr
+    assert not cache_path.exists()
@@ -24,7 +24,8 @@ def test_batch_cli_dry_run(tmp_path, monkeypatch, capsys):
         def sync_from_directories(self, *args, **kwargs):
             pass
 
-    monkeypatch.setattr(batch.knowledge, "KnowledgeBase", lambda: DummyKB())
+    monkeypatch.setattr(batch.knowledge, "open_knowledge_base", lambda: DummyKB())
+    monkeypatch.setattr(batch.artifacts, "GLOBAL_STORE", batch.artifacts.ArtifactStore(tmp_path / "artifacts.sqlite3"))
 
     summaries = tmp_path / "summaries"
     logs = tmp_path / "logs"
@@ -36,10 +37,10 @@ def test_batch_cli_dry_run(tmp_path, monkeypatch, capsys):
     monkeypatch.setattr(batch.pipeline, "LOG_DIR", logs)
 
     processed = []
-    def fake_process(video, model, publish=None, job_id=None):
+    def fake_prepare(video, model, publish=None, knowledge_base=None, job_id=None, **kwargs):
         processed.append(video)
 
-    monkeypatch.setattr(batch.pipeline, "process_video", fake_process)
+    monkeypatch.setattr(batch.pipeline, "prepare_job", fake_prepare)
 
     args = SimpleNamespace(input_dir=videos, model="whisper-base", dry_run=True, resume=False)
     exit_code = batch.batch_process(args)
@@ -72,7 +73,8 @@ def test_batch_cli_skips_completed(tmp_path, monkeypatch):
         def sync_from_directories(self, *args, **kwargs):
             pass
 
-    monkeypatch.setattr(batch.knowledge, "KnowledgeBase", lambda: DummyKB())
+    monkeypatch.setattr(batch.knowledge, "open_knowledge_base", lambda: DummyKB())
+    monkeypatch.setattr(batch.artifacts, "GLOBAL_STORE", batch.artifacts.ArtifactStore(tmp_path / "artifacts.sqlite3"))
 
     logs = tmp_path / "logs"
     logs.mkdir()
@@ -83,10 +85,10 @@ def test_batch_cli_skips_completed(tmp_path, monkeypatch):
 
     calls = []
 
-    def fake_process(video_path, model, publish=None, knowledge_base=None, job_id=None):
+    def fake_prepare(video_path, model, publish=None, knowledge_base=None, job_id=None, **kwargs):
         calls.append((video_path, model))
 
-    monkeypatch.setattr(batch.pipeline, "process_video", fake_process)
+    monkeypatch.setattr(batch.pipeline, "prepare_job", fake_prepare)
 
     args = SimpleNamespace(input_dir=videos, model="whisper-base", dry_run=False, resume=False)
     exit_code = batch.batch_process(args)
@@ -110,7 +112,8 @@ def test_batch_cli_resume(monkeypatch, tmp_path):
         def sync_from_directories(self, *args, **kwargs):
             pass
 
-    monkeypatch.setattr(batch.knowledge, "KnowledgeBase", lambda: DummyKB())
+    monkeypatch.setattr(batch.knowledge, "open_knowledge_base", lambda: DummyKB())
+    monkeypatch.setattr(batch.artifacts, "GLOBAL_STORE", batch.artifacts.ArtifactStore(tmp_path / "artifacts.sqlite3"))
 
     class DummyStore:
         def retryable_jobs(self):
@@ -132,14 +135,64 @@ def test_batch_cli_resume(monkeypatch, tmp_path):
 
     calls = []
 
-    def fake_process(video, model, publish=None, knowledge_base=None, job_id=None):
+    def fake_prepare(video, model, publish=None, knowledge_base=None, job_id=None, **kwargs):
         calls.append((video, model, job_id))
 
     monkeypatch.setattr(batch.pipeline, "SUMMARY_DIR", tmp_path / "summaries")
-    monkeypatch.setattr(batch.pipeline, "process_video", fake_process)
+    monkeypatch.setattr(batch.pipeline, "prepare_job", fake_prepare)
 
     args = SimpleNamespace(input_dir=videos_dir, model="whisper-base", dry_run=False, resume=True)
     exit_code = batch.batch_process(args)
 
     assert exit_code == 0
     assert calls == [(Path(videos_dir / "retry.mp4"), "whisper-medium", 7)]
+
+
+def test_batch_cli_runs_stages_with_configured_concurrency(tmp_path, monkeypatch, capsys):
+    videos = tmp_path / "videos"
+    videos.mkdir()
+    for name in ("a", "b", "c"):
+        (videos / f"{name}.mp4").write_bytes(name.encode())
+
+    import vidmelt.batch as batch
+
+    class DummyKB:
+        def sync_from_directories(self, *args, **kwargs):
+            pass
+
+    monkeypatch.setattr(batch.knowledge, "open_knowledge_base", lambda: DummyKB())
+    monkeypatch.setattr(batch.artifacts, "GLOBAL_STORE", batch.artifacts.ArtifactStore(tmp_path / "artifacts.sqlite3"))
+    monkeypatch.setattr(batch.pipeline, "SUMMARY_DIR", tmp_path / "summaries")
+    monkeypatch.setattr(
+        batch.pipeline,
+        "prepare_job",
+        lambda video, model, **kwargs: SimpleNamespace(video_path=video, stages=[]),
+    )
+
+    def record(name):
+        def stage(job):
+            job.stages.append(name)
+            return not (name == "summarize" and job.video_path.stem == "b")
+        return stage
+
+    monkeypatch.setattr(
+        batch.pipeline,
+        "STAGES",
+        tuple((name, record(name)) for name in ("extract", "transcribe", "summarize", "index")),
+    )
+    monkeypatch.setattr(batch.pipeline, "run_stage", lambda job, stage: stage(job))
+
+    args = SimpleNamespace(
+        input_dir=videos,
+        model="whisper-base",
+        dry_run=False,
+        resume=False,
+        extract_workers=2,
+        transcribe_workers=1,
+        summarize_concurrency=3,
+    )
+    assert batch.batch_process(args) == 0
+
+    output = capsys.readouterr().out
+    assert "Finished 2 of 3 video(s)" in output
+    assert f"Failed {videos / 'b.mp4'} during summarize" in output
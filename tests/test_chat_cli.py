@@ -33,7 +33,7 @@ def test_chat_cli(monkeypatch, tmp_path, capsys):
                 )
             ]
 
-    monkeypatch.setattr(chat.knowledge, "KnowledgeBase", lambda db_path: DummyKB(db_path))
+    monkeypatch.setattr(chat.knowledge, "open_knowledge_base", lambda db_path: DummyKB(db_path))
 
     class DummyModel(SimpleNamespace):
         def responses(self):
@@ -55,3 +55,53 @@ def test_chat_cli(monkeypatch, tmp_path, capsys):
     assert exit_code == 0
     output = capsys.readouterr().out
     assert "[demo]" in output
+
+
+def test_embed_cli_reports_throughput(monkeypatch, tmp_path, capsys):
+    calls = {}
+
+    class DummyKB:
+        def __init__(self, db_path):
+            pass
+
+        def build_embeddings(self, model_name, backend, batch_size, progress):
+            calls["batch_size"] = batch_size
+            report = chat.knowledge.EmbedReport(documents=2, total_documents=2, chunks=10, batches=1, seconds=2.0)
+            progress(report)
+            return report
+
+        def embedding_space(self):
+            return chat.knowledge.EmbeddingSpace("hashing", "hash-1024", 1024)
+
+    monkeypatch.setattr(chat.knowledge, "open_knowledge_base", lambda db_path: DummyKB(db_path))
+
+    assert chat.main(["embed", "--db", str(tmp_path / "kb.sqlite3"), "--batch-size", "64"]) == 0
+    output = capsys.readouterr().out
+    assert calls["batch_size"] == 64
+    assert "batch 1: 2/2 documents, 10 chunks" in output
+    assert "(5.0 chunks/s)" in output
+    assert "hash-1024 (hashing, chunker v1, 1024 dims)" in output
+
+
+def test_chat_cli_hybrid_search_prints_both_scores(monkeypatch, tmp_path, capsys):
+    class DummyKB:
+        def __init__(self, db_path):
+            pass
+
+        def hybrid_search(self, query, limit=5):
+            return [
+                chat.knowledge.SemanticHit(
+                    video_name="demo",
+                    transcript_path="transcripts/demo.txt",
+                    summary_path=None,
+                    snippet="[Python] and Flask.",
+                    score=0.2,
+                    bm25=-1.5,
+                    fused=0.0325,
+                )
+            ]
+
+    monkeypatch.setattr(chat.knowledge, "open_knowledge_base", lambda db_path: DummyKB(db_path))
+
+    assert chat.main(["search", "Python", "--mode", "hybrid", "--db", str(tmp_path / "kb.sqlite3")]) == 0
+    assert "(score=0.200, bm25=-1.500, fused=0.0325)" in capsys.readouterr().out
@@ -0,0 +1,91 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from vidmelt import embedqueue, knowledge, pipeline
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, items, **_):
+        self.calls.append(len(items))
+        return np.ones((len(items), 3), dtype=np.float32)
+
+
+def _kb(tmp_path, monkeypatch, names):
+    model = CountingModel()
+    monkeypatch.setattr(knowledge, "_load_embeddings_model", lambda model_name=knowledge.DEFAULT_EMBED_MODEL: model)
+    transcripts = tmp_path / "transcripts"
+    transcripts.mkdir()
+    kb = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    for name in names:
+        path = transcripts / f"{name}.txt"
+        path.write_text(f"{name} transcript.")
+        kb.upsert_document(name, path)
+    return kb, model
+
+
+def test_documents_from_several_jobs_share_one_encode_call(tmp_path, monkeypatch):
+    kb, model = _kb(tmp_path, monkeypatch, ["a", "b", "c"])
+    indexed = []
+    queue = embedqueue.EmbeddingQueue(kb, batch_delay=5, on_indexed=lambda names, report: indexed.append(names))
+
+    queue.submit("a")
+    queue.submit("b")
+    queue.submit("a")
+    freshness = queue.freshness()
+    assert (freshness.documents, freshness.indexed, freshness.pending, freshness.fresh) == (3, 0, 2, False)
+
+    queue.start()
+    queue.submit("c")
+    queue.stop(timeout=5)
+
+    assert model.calls == [3]
+    assert indexed == [["a", "b", "c"]]
+    assert (queue.embedded, queue.batches) == (3, 1)
+    freshness = queue.freshness()
+    assert (freshness.indexed, freshness.pending, freshness.fresh) == (3, 0, True)
+    assert kb.unembedded_documents() == []
+
+
+def test_worker_flushes_after_delay_and_records_failures(tmp_path, monkeypatch):
+    kb, model = _kb(tmp_path, monkeypatch, ["a", "b"])
+    queue = embedqueue.EmbeddingQueue(kb, batch_delay=0.01)
+    queue.start()
+    try:
+        queue.submit("a")
+        assert queue.wait_idle(timeout=5)
+        assert kb.unembedded_documents() == ["b"]
+
+        monkeypatch.setattr(kb, "embed_documents", lambda names, **_: 1 / 0)
+        queue.submit("b")
+        assert queue.wait_idle(timeout=5)
+    finally:
+        queue.stop(timeout=5)
+
+    freshness = queue.freshness()
+    assert (freshness.indexed, freshness.pending, freshness.failed) == (1, 0, 1)
+    assert "division by zero" in freshness.last_error
+
+
+def test_index_stage_queues_embedding_instead_of_running_it(tmp_path):
+    calls = []
+    job = SimpleNamespace(
+        video_name="clip",
+        transcript_path=Path("transcripts/clip.txt"),
+        summary_path=Path("summaries/clip.md"),
+        job_id=7,
+        knowledge_base=SimpleNamespace(
+            upsert_document=lambda *args: calls.append("upsert"),
+            update_embeddings_for=lambda name: calls.append("embed"),
+        ),
+        embedder=SimpleNamespace(submit=lambda name: calls.append(f"queued {name}")),
+        job_store=SimpleNamespace(record_success=lambda job_id, path: calls.append("success")),
+        emit=lambda event_type, message, icon=None: calls.append(event_type),
+    )
+
+    assert pipeline.index_stage(job)
+    assert calls == ["upsert", "queued clip", "success", "complete"]
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from vidmelt import embedders, knowledge
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    model = embedders.HashingEmbedder("hash-256")
+    vectors = model.encode(["Python and Flask APIs", "python and flask apis", "Pasta with tomato sauce", ""])
+    assert vectors.shape == (4, 256)
+    assert vectors.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(vectors[:3], axis=1), 1.0, rtol=1e-5)
+    assert not vectors[3].any()
+    np.testing.assert_allclose(vectors[0], vectors[1])
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+    np.testing.assert_array_equal(embedders.HashingEmbedder("hash-256").encode(["Python and Flask APIs"])[0], vectors[0])
+
+
+def test_registry_rejects_unknown_backends_and_models():
+    with pytest.raises(ValueError):
+        embedders.load("word2vec", "any")
+    with pytest.raises(ValueError):
+        embedders.HashingEmbedder("hash-big")
+    assert embedders.load(embedders.HASHING, "hash-64") is embedders.load(embedders.HASHING, "hash-64")
+
+
+def test_knowledge_base_records_and_reuses_the_embedding_space(tmp_path, monkeypatch):
+    def no_sentence_transformers(model_name=knowledge.DEFAULT_EMBED_MODEL):
+        raise AssertionError("sentence-transformers should not be loaded")
+
+    monkeypatch.setattr(knowledge, "_load_embeddings_model", no_sentence_transformers)
+    transcripts = tmp_path / "transcripts"
+    transcripts.mkdir()
+    (transcripts / "code.txt").write_text("Python and Flask build web APIs.")
+    (transcripts / "food.txt").write_text("Fresh pasta with tomato sauce.")
+    kb = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    kb.index_directory(transcripts)
+    assert kb.embedding_space() is None
+
+    kb.build_embeddings(backend="hashing", model_name="hash-128")
+    assert kb.embedding_space() == knowledge.EmbeddingSpace("hashing", "hash-128", 128, knowledge.CHUNKER_VERSION)
+
+    reopened = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    assert [hit.video_name for hit in reopened.semantic_search("tomato pasta", limit=1)] == ["food"]
+    reopened.update_embeddings_for("code")
+    with pytest.raises(ValueError, match="embed --rebuild"):
+        reopened.build_embeddings(backend="hashing", model_name="hash-64")
+
+    assert reopened.clear_embeddings() == 2
+    reopened.build_embeddings(backend="hashing", model_name="hash-64")
+    assert reopened.embedding_space().dim == 64
+    assert [hit.video_name for hit in reopened.semantic_search("flask", limit=1)] == ["code"]
+
+
+def test_embeddings_from_before_spaces_were_tracked_keep_their_model(tmp_path, monkeypatch, keyword_model, baseline_db):
+    (tmp_path / "code.txt").write_text("Python and Flask.")
+    chunks = [("Python and Flask.", [1, 0, 0])]
+    db_path = baseline_db(tmp_path / "kb.sqlite3", {"code": (tmp_path / "code.txt", None, chunks)})
+    monkeypatch.setattr(embedders, "DEFAULT_BACKEND", embedders.HASHING)
+
+    kb = knowledge.KnowledgeBase(db_path)
+    assert kb.embedding_space() == knowledge.EmbeddingSpace(
+        embedders.SENTENCE_TRANSFORMERS, knowledge.DEFAULT_EMBED_MODEL, 3, 1
+    )
+    with pytest.raises(ValueError, match="holds vectors from"):
+        list(kb.semantic_search("flask", backend=embedders.HASHING))
+
+    keyword_model(("python", "flask", "pasta"))
+    assert next(kb.semantic_search("flask")).video_name == "code"
@@ -50,3 +50,17 @@ def test_job_store_retry(tmp_path):
 
     retry_jobs = list(store.retryable_jobs())
     assert retry_jobs and retry_jobs[0].id == job_id
+
+
+def test_job_store_records_summary_cache_hits(tmp_path):
+    store = history.JobStore(tmp_path / "jobs.sqlite3")
+
+    cached_job = store.record_start(Path("videos/a.mp4"), "whisper-base")
+    store.record_summary_cache_hit(cached_job, 1200, 4.5)
+    store.record_start(Path("videos/b.mp4"), "whisper-base")
+
+    jobs = {job.id: job for job in store.list_recent()}
+    assert jobs[cached_job].summary_cached
+    assert jobs[cached_job].saved_tokens == 1200
+    savings = store.cache_savings()
+    assert (savings.hits, savings.saved_tokens, savings.saved_seconds) == (1, 1200, 4.5)
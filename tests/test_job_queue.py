@@ -0,0 +1,173 @@
+import io
+import threading
+
+import pytest
+
+import app
+from vidmelt import history, jobqueue, pipeline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_queue_leases_in_fifo_order_and_reports_positions(tmp_path):
+    queue = jobqueue.JobQueue(tmp_path / "queue.sqlite3")
+    first = queue.enqueue("videos/a.mp4", "whisper-base")
+    second = queue.enqueue("videos/b.mp4", "whisper-api", "digest")
+
+    assert queue.position(first) == 1
+    assert queue.position(second) == 2
+
+    job = queue.lease("worker-1")
+    assert job.id == first and job.status == "leased" and job.attempts == 1
+    assert queue.position(first) == 0
+    assert queue.position(second) == 1
+    assert queue.depth().queued == 1 and queue.depth().running == 1
+
+    queue.complete(first, "worker-1", ok=True)
+    assert queue.position(first) is None
+    assert queue.get(first).status == "done"
+    assert queue.lease("worker-2").content_digest == "digest"
+    assert queue.lease("worker-3") is None
+
+
+def test_queue_admission_control(tmp_path):
+    queue = jobqueue.JobQueue(tmp_path / "queue.sqlite3", max_pending=2)
+    queue.enqueue("videos/a.mp4", "whisper-base")
+    queue.enqueue("videos/b.mp4", "whisper-base")
+
+    assert not queue.has_capacity()
+    with pytest.raises(jobqueue.QueueFullError):
+        queue.enqueue("videos/c.mp4", "whisper-base")
+
+    job = queue.lease("worker")
+    queue.complete(job.id, "worker", ok=False, error="boom")
+    assert queue.has_capacity()
+    assert queue.get(job.id).error == "boom"
+
+
+def test_expired_lease_is_reclaimed_until_attempts_run_out(tmp_path):
+    clock = FakeClock()
+    queue = jobqueue.JobQueue(tmp_path / "queue.sqlite3", max_attempts=2, clock=clock)
+    job_id = queue.enqueue("videos/a.mp4", "whisper-base")
+
+    assert queue.lease("dead-worker", lease_seconds=10).id == job_id
+    clock.now += 5
+    assert queue.lease("other") is None
+    assert queue.renew(job_id, "dead-worker", lease_seconds=10)
+    clock.now += 11
+
+    reclaimed = queue.lease("other", lease_seconds=10)
+    assert reclaimed.id == job_id and reclaimed.attempts == 2
+    assert not queue.renew(job_id, "dead-worker")
+    queue.complete(job_id, "dead-worker", ok=True)  # stale owner cannot finish it
+    assert queue.get(job_id).status == "leased"
+
+    clock.now += 11
+    assert queue.lease("third") is None
+    assert queue.get(job_id).status == "failed"
+
+
+def test_reclaimed_job_retries_its_first_history_row(tmp_path, monkeypatch):
+    clock = FakeClock()
+    queue = jobqueue.JobQueue(tmp_path / "queue.sqlite3", clock=clock)
+    store = history.JobStore(tmp_path / "queue.sqlite3")
+    monkeypatch.setattr(app, "JOB_QUEUE", queue)
+    monkeypatch.setattr(pipeline.shutil, "which", lambda name: f"/usr/bin/{name}")
+
+    def prepare_only(video_path, model, publish=None, **options):
+        # Stands in for the stages: the worker "dies" right after the job starts.
+        return pipeline.prepare_job(video_path, model, publish, job_store=store, **options) is None
+
+    monkeypatch.setattr(app.pipeline, "process_video", prepare_only)
+    queue_id = queue.enqueue(tmp_path / "a.mp4", "whisper-base")
+
+    app.process_queued_job(queue.lease("dead-worker", lease_seconds=10))
+    history_id = queue.get(queue_id).history_id
+    clock.now += 11
+    app.process_queued_job(queue.lease("other", lease_seconds=10))
+
+    jobs = list(store.list_recent())
+    assert [(job.id, job.status, job.attempt_count) for job in jobs] == [(history_id, "processing", 2)]
+
+
+def test_worker_pool_bounds_concurrency(tmp_path):
+    queue = jobqueue.JobQueue(tmp_path / "queue.sqlite3")
+    for index in range(5):
+        queue.enqueue(f"videos/{index}.mp4", "whisper-base")
+
+    lock = threading.Lock()
+    running = []
+    peak = []
+    done = threading.Event()
+
+    def handler(job):
+        with lock:
+            running.append(job.id)
+            peak.append(len(running))
+        threading.Event().wait(0.05)
+        with lock:
+            running.remove(job.id)
+            if job.video_path.endswith("3.mp4"):
+                raise RuntimeError("boom")
+        if queue.depth().pending <= 1:
+            done.set()
+        return True
+
+    pool = jobqueue.WorkerPool(queue, handler, workers=2, poll_interval=0.01)
+    pool.start()
+    done.wait(5)
+    pool.stop(timeout=5)
+
+    assert max(peak) <= 2
+    statuses = {queue.get(index).video_path: queue.get(index).status for index in range(1, 6)}
+    assert statuses["videos/3.mp4"] == "failed"
+    assert sum(status == "done" for status in statuses.values()) == 4
+
+
+@pytest.fixture
+def queue_client(monkeypatch, tmp_path):
+    queue = jobqueue.JobQueue(tmp_path / "queue.sqlite3", max_pending=1)
+    monkeypatch.setattr(app, "JOB_QUEUE", queue)
+    monkeypatch.setattr(app, "UPLOAD_FOLDER", tmp_path)
+    monkeypatch.setattr(app.artifacts, "save_upload", lambda stream, dest: "digest")
+    return app.app.test_client(), queue
+
+
+def test_upload_enqueues_and_rejects_when_full(queue_client):
+    client, queue = queue_client
+
+    response = client.post("/upload", data={"video": (io.BytesIO(b"data"), "demo.mp4")})
+    assert response.status_code == 202
+    payload = response.get_json()
+    assert payload["position"] == 1 and payload["queued"] == 1
+    assert queue.get(payload["queue_id"]).content_digest == "digest"
+
+    status = client.get(f"/queue/{payload['queue_id']}").get_json()
+    assert status["status"] == "queued" and status["video"] == "demo.mp4"
+
+    full = client.post("/upload", data={"video": (io.BytesIO(b"data"), "other.mp4")})
+    assert full.status_code == 503
+    assert "full" in full.get_json()["error"]
+
+    assert client.get("/queue").get_json()["capacity"] == 1
+    assert client.get("/queue/999").status_code == 404
+
+
+def test_upload_losing_the_last_slot_is_not_kept(queue_client, monkeypatch, tmp_path):
+    client, queue = queue_client
+
+    def save_upload(stream, dest):
+        dest.write_bytes(stream.read())
+        queue.enqueue("videos/racer.mp4", "whisper-base")  # a concurrent upload takes the slot meanwhile
+        return "digest"
+
+    monkeypatch.setattr(app.artifacts, "save_upload", save_upload)
+    response = client.post("/upload", data={"video": (io.BytesIO(b"data"), "demo.mp4")})
+    assert response.status_code == 503
+    assert not (tmp_path / "demo.mp4").exists()
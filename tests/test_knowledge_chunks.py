@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from vidmelt import knowledge, transcriber
+
+VOCAB = ("python", "flask", "pasta", "sauce", "guitar", "chords", "summary")
+
+
+@pytest.fixture
+def model(keyword_model):
+    return keyword_model(VOCAB)
+
+
+def test_chunks_respect_the_token_budget_and_overlap():
+    segments = [(f"Segment {n} says something.", float(n), float(n + 1)) for n in range(10)]
+    chunks = list(knowledge._chunk_segments(segments, max_tokens=12, overlap=5))
+
+    assert all(knowledge._count_tokens(chunk.text) <= 12 for chunk in chunks)
+    assert chunks[0].text == "Segment 0 says something. Segment 1 says something."
+    # Each chunk opens with the last segment of the previous one and spans its segments' times.
+    assert chunks[1].text.startswith("Segment 1 says something.")
+    assert (chunks[1].start, chunks[1].end) == (1.0, 3.0)
+    assert chunks[-1].text.endswith("Segment 9 says something.")
+
+    long_segment = [("One two three. Four five six seven eight nine ten.", 10.0, 20.0)]
+    pieces = list(knowledge._chunk_segments(long_segment, max_tokens=4, overlap=0))
+    # Times are interpolated by token position within the segment.
+    assert pieces[0].text == "One two three."
+    assert (pieces[0].start, pieces[0].end) == (10.0, pytest.approx(10.0 + 10.0 * 4 / 12))
+    assert pieces[1].text == "Four five six seven"
+    assert pieces[-1].end == 20.0
+
+
+def test_whole_transcript_is_embedded_with_timestamps(tmp_path, model):
+    transcripts = tmp_path / "transcripts"
+    summaries = tmp_path / "summaries"
+    transcripts.mkdir()
+    summaries.mkdir()
+    result = transcriber.TranscriptionResult(
+        text="",
+        segments=[
+            {"start": 0.0, "end": 4.0, "text": " Welcome to the show."},
+            {"start": 4.0, "end": 9.5, "text": " Today we tune a guitar and learn chords."},
+            {"start": 95.0, "end": 99.0, "text": " Then Python and Flask."},
+        ],
+    )
+    transcriber.write_transcript(result, transcripts / "show.txt")
+    (summaries / "show.md").write_text("A summary of the show.")
+    kb = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    kb.upsert_document("show", transcripts / "show.txt", summaries / "show.md")
+    kb.update_embeddings_for("show")
+
+    assert [text for batch in model.batches for text in batch][0] == "A summary of the show."
+    summary_hit = next(kb.semantic_search("summary", limit=1))
+    assert summary_hit.start is None
+    hit = next(kb.semantic_search("guitar chords", limit=1))
+    assert "tune a guitar" in hit.snippet
+    assert hit.start == 0.0 and hit.end >= 9.5
+    assert knowledge.format_hit_source(hit) == "show @ 0:00"
+
+    # Segments that no longer match the transcript text are ignored rather than misattributed.
+    (transcripts / "show.txt").write_text("Rewritten by hand.\n")
+    kb.upsert_document("show", transcripts / "show.txt")
+    with kb._connect() as conn:
+        assert conn.execute("SELECT segments FROM documents").fetchone()[0] is None
+    assert json.loads(transcriber.segments_path(transcripts / "show.txt").read_text())[2]["start"] == 95.0
+
+
+def test_long_transcripts_stream_across_batches(tmp_path, model):
+    transcripts = tmp_path / "transcripts"
+    transcripts.mkdir()
+    lines = [f"Line {n} about {'python' if n % 2 else 'pasta'} and more words to fill it." for n in range(60)]
+    (transcripts / "long.txt").write_text("\n".join(lines))
+    (transcripts / "short.txt").write_text("Guitar chords.")
+    kb = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    kb.index_directory(transcripts)
+    assert next(kb.semantic_search("guitar", limit=1)).score == 1.0  # nothing embedded yet
+
+    report = kb.embed_documents(batch_size=2)
+    assert max(len(batch) for batch in model.batches) == 2
+    assert report.batches > 2 and report.documents == 2
+    with kb._connect() as conn:
+        indexes = [row[0] for row in conn.execute("SELECT chunk_index FROM embeddings WHERE video_name = 'long'")]
+    assert sorted(indexes) == list(range(report.chunks - 1))
+    # The resident matrix was patched batch by batch and matches a fresh load.
+    patched = kb._embedding_matrix()
+    fresh = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")._embedding_matrix()
+    assert patched.count == fresh.count == report.chunks
+    assert {name: sorted(slots) for name, slots in patched.rows_by_video.items()} == {
+        name: sorted(slots) for name, slots in fresh.rows_by_video.items()
+    }
+    assert next(kb.semantic_search("guitar", limit=1)).video_name == "short"
+
+    kb.embed_documents(["long"], batch_size=2)
+    assert kb._embedding_matrix().count == report.chunks
+
+
+def test_upgraded_knowledge_base_keeps_chunker_1_until_reembedded(tmp_path, model, baseline_db):
+    transcripts = tmp_path / "transcripts"
+    summaries = tmp_path / "summaries"
+    transcripts.mkdir()
+    summaries.mkdir()
+    (transcripts / "code.txt").write_text("Python and Flask routes.")
+    (summaries / "code.md").write_text("Python summary.")
+    vector = model.encode(["Python summary."])[0]
+    db_path = baseline_db(
+        tmp_path / "kb.sqlite3",
+        {"code": (transcripts / "code.txt", summaries / "code.md", [("Python summary.", vector)])},
+    )
+    (transcripts / "food.txt").write_text("Pasta with tomato sauce.")
+
+    kb = knowledge.KnowledgeBase(db_path)
+    report = kb.sync_from_directories(transcripts, summaries)
+    assert (report.added, report.updated) == (1, 0)
+    # The legacy summary-only chunks are still labelled as what cut them.
+    assert kb.embedding_space().chunker == 1
+
+    status = kb.reembed(pause=0)
+    assert status.swapped and kb.embedding_space().chunker == knowledge.CHUNKER_VERSION
+    with kb._connect() as conn:
+        texts = [row[0] for row in conn.execute("SELECT chunk_text FROM embeddings WHERE video_name = 'code'")]
+    assert texts == ["Python summary.", "Python and Flask routes."]
@@ -2,7 +2,10 @@ from pathlib import Path
 from types import SimpleNamespace
 
 import numpy as np
+import pytest
+
 from vidmelt import knowledge
+from vidmelt.vector_store import QuantizedVectors, VectorFile
 
 
 def test_embedding_pipeline(tmp_path, monkeypatch):
@@ -35,3 +38,241 @@ def test_embedding_pipeline(tmp_path, monkeypatch):
     assert hits
     assert hits[0].video_name == "clip"
     assert hits[0].score <= hits[-1].score
+
+
+VOCAB = ("python", "flask", "pasta", "sauce", "guitar", "chords")
+
+
+def _kb_with_videos(tmp_path, keyword_model, videos):
+    keyword_model(VOCAB)
+    transcripts = tmp_path / "transcripts"
+    transcripts.mkdir(exist_ok=True)
+    for name, text in videos.items():
+        (transcripts / f"{name}.txt").write_text(text)
+    kb = knowledge.KnowledgeBase(db_path=tmp_path / "kb.sqlite3")
+    kb.index_directory(transcripts)
+    kb.build_embeddings()
+    return kb, transcripts
+
+
+def test_semantic_search_ranks_with_resident_matrix(tmp_path, keyword_model):
+    kb, _ = _kb_with_videos(
+        tmp_path,
+        keyword_model,
+        {
+            "code": "Python and Flask. Flask routes in Python.",
+            "food": "Pasta with tomato sauce. More pasta.",
+            "music": "Guitar chords for beginners.",
+        },
+    )
+
+    hits = list(kb.semantic_search("pasta sauce", limit=2))
+    assert [hit.video_name for hit in hits][0] == "food"
+    assert len(hits) == 2
+    assert hits[0].score <= hits[1].score
+    assert hits[0].transcript_path.endswith("food.txt")
+
+    matrix = kb._matrix
+    list(kb.semantic_search("guitar", limit=1))
+    assert kb._matrix is matrix, "unchanged embeddings must not be reloaded"
+
+
+def test_update_embeddings_patches_matrix_incrementally(tmp_path, keyword_model):
+    kb, transcripts = _kb_with_videos(
+        tmp_path,
+        keyword_model,
+        {"code": "Python and Flask.", "music": "Guitar chords."},
+    )
+    assert list(kb.semantic_search("guitar", limit=1))[0].video_name == "music"
+    matrix = kb._matrix
+
+    (transcripts / "code.txt").write_text("Guitar chords and guitar solos.")
+    kb.upsert_document("code", transcripts / "code.txt")
+    kb.update_embeddings_for("code")
+
+    assert kb._matrix is matrix
+    assert matrix.count == 2
+    assert list(kb.semantic_search("python", limit=1))[0].video_name == "music"
+    assert {hit.video_name for hit in kb.semantic_search("guitar", limit=5)} == {"code", "music"}
+
+
+def test_matrix_reloads_after_another_writer(tmp_path, keyword_model):
+    kb, transcripts = _kb_with_videos(tmp_path, keyword_model, {"code": "Python and Flask."})
+    assert list(kb.semantic_search("python", limit=1))[0].video_name == "code"
+
+    other = knowledge.KnowledgeBase(db_path=tmp_path / "kb.sqlite3")
+    (transcripts / "food.txt").write_text("Pasta and sauce.")
+    other.upsert_document("food", transcripts / "food.txt")
+    other.update_embeddings_for("food")
+
+    assert list(kb.semantic_search("pasta", limit=1))[0].video_name == "food"
+
+
+def test_embedding_matrix_top_k_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(0)
+    store = VectorFile(tmp_path / "vectors.f32", 8)
+    matrix = knowledge._EmbeddingMatrix(store, generation=0)
+    for index in range(20):
+        vectors = rng.normal(size=(5, 8))
+        matrix.assign(f"video-{index}", store.append(vectors / np.linalg.norm(vectors, axis=1, keepdims=True)))
+    for index in range(0, 20, 3):
+        matrix.remove(f"video-{index}")
+    matrix.assign("video-1", store.append(np.eye(8, dtype=np.float32)[:1]))
+
+    query = rng.normal(size=8)
+    alive = np.flatnonzero(matrix.alive)
+    expected = alive[np.argsort(-(store.view()[alive] @ (query / np.linalg.norm(query))))[:7]]
+
+    assert [row for row, _score in matrix.top_k(query, 7)] == list(expected)
+    assert matrix.count == len(alive) == 5 * 12 + 1
+    assert len(matrix.vectors) == 101
+
+
+def test_vector_file_is_shared_and_compacted(tmp_path, monkeypatch, keyword_model):
+    monkeypatch.setattr(knowledge, "COMPACT_MIN_ROWS", 4)
+    kb, transcripts = _kb_with_videos(
+        tmp_path,
+        keyword_model,
+        {"code": "Python. Flask.", "food": "Pasta. Sauce.", "music": "Guitar. Chords."},
+    )
+    assert kb.vector_path(0).stat().st_size == 3 * len(VOCAB) * 4
+    with kb._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM embeddings WHERE length(embedding) > 0").fetchone()[0] == 0
+
+    reader = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    assert list(reader.semantic_search("guitar", limit=1))[0].video_name == "music"
+    assert isinstance(reader._matrix.vectors, np.memmap)
+
+    # Three re-embeddings leave 3 dead rows of 6 -> kept; the fourth tips dead rows over half.
+    for _ in range(3):
+        kb.update_embeddings_for("music")
+    assert kb.vector_path(0).stat().st_size == 6 * len(VOCAB) * 4
+    kb.update_embeddings_for("music")
+    assert not kb.vector_path(0).exists()
+    assert kb.vector_path(1).stat().st_size == 3 * len(VOCAB) * 4
+
+    assert list(reader.semantic_search("guitar", limit=1))[0].video_name == "music"
+    assert reader._matrix.generation == 1
+    assert list(kb.semantic_search("pasta", limit=1))[0].video_name == "food"
+
+
+def test_blob_embeddings_are_migrated_to_the_vector_file(tmp_path):
+    db_path = tmp_path / "kb.sqlite3"
+    kb = knowledge.KnowledgeBase(db_path)
+    with kb._connect() as conn:
+        conn.execute(
+            "INSERT INTO documents (video_name, transcript_path, transcript) VALUES ('old', 'old.txt', 'text')"
+        )
+        conn.execute(
+            "INSERT INTO embeddings (video_name, chunk_index, chunk_text, embedding, norm) VALUES (?, 0, 'old chunk', ?, 2.0)",
+            ("old", knowledge._to_blob(np.array([2.0, 0.0], dtype=np.float32))),
+        )
+        conn.commit()
+
+    migrated = knowledge.KnowledgeBase(db_path)
+    assert np.allclose(np.fromfile(migrated.vector_path(0), dtype=np.float32), [1.0, 0.0])
+    matrix = migrated._embedding_matrix()
+    assert matrix.count == 1
+    assert [hit.snippet for hit in migrated._semantic_hits("slot", matrix.top_k(np.array([1.0, 0.0]), 1))] == ["old chunk"]
+
+
+def test_build_embeddings_batches_chunks_across_documents(tmp_path, keyword_model):
+    videos = {f"video-{n}": "python flask" if n % 2 else "pasta sauce" for n in range(7)}
+    kb, _ = _kb_with_videos(tmp_path, keyword_model, {})
+    model = knowledge._load_embeddings_model()
+    transcripts = tmp_path / "transcripts"
+    for name, text in videos.items():
+        (transcripts / f"{name}.txt").write_text(text)
+    kb.index_directory(transcripts)
+    kb._embedding_matrix()
+
+    seen = []
+    report = kb.build_embeddings(batch_size=3, progress=lambda r: seen.append((r.documents, r.chunks)))
+
+    assert model.calls == 3
+    assert (report.documents, report.total_documents, report.chunks, report.batches) == (7, 7, 7, 3)
+    assert seen == [(3, 3), (6, 6), (7, 7)]
+    assert report.chunks_per_second > 0
+    with kb._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 7
+        assert knowledge._embeddings_version(conn) == kb._matrix_version
+    assert kb._embedding_matrix().count == 7
+    assert [hit.video_name for hit in kb.semantic_search("pasta", limit=1)] == ["video-0"]
+
+
+def test_hybrid_search_fuses_exact_terms_with_vectors(tmp_path, keyword_model):
+    kb, transcripts = _kb_with_videos(
+        tmp_path,
+        keyword_model,
+        {
+            "code": "Python and Flask. Python again.",
+            "food": "Pasta with sauce. The Zanzibar recipe.",
+            "music": "Guitar chords.",
+        },
+    )
+    # Indexed but not embedded yet: reachable only through the full-text side.
+    (transcripts / "spices.txt").write_text("Zanzibar cloves and Zanzibar pepper.")
+    kb.upsert_document("spices", transcripts / "spices.txt")
+
+    hits = kb.hybrid_search("zanzibar", limit=3)
+    assert {hit.video_name for hit in hits[:2]} == {"food", "spices"}
+    assert all(hit.bm25 is not None for hit in hits[:2])
+    assert [hit.fused for hit in hits] == sorted((hit.fused for hit in hits), reverse=True)
+    spices = next(hit for hit in hits if hit.video_name == "spices")
+    assert spices.score == 1.0 and "[Zanzibar]" in spices.snippet
+
+    hits = kb.hybrid_search("python flask", limit=1)
+    assert hits[0].video_name == "code" and hits[0].bm25 is not None and hits[0].score < 1.0
+
+
+def test_quantized_vectors_round_trip(tmp_path):
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(50, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    store = VectorFile(tmp_path / "vectors.f32", 16)
+    store.append(vectors)
+    query = vectors[7]
+
+    for kind, tolerance in (("float16", 1e-3), ("int8", 2e-2)):
+        quantized = QuantizedVectors(tmp_path / f"vectors.{kind}", 16, kind)
+        assert quantized.catch_up(store) == 50
+        assert quantized.catch_up(store) == 0
+        assert np.allclose(quantized.scores(query, 50, block_rows=7), vectors @ query, atol=tolerance)
+    assert quantized.nbytes == 50 * (16 + 4)
+
+    # A torn int8 append (codes written, scales not) is realigned before catching up.
+    quantized.codes.append(np.zeros((3, 16), dtype=np.int8))
+    store.append(vectors[:2])
+    assert quantized.catch_up(store) == 2
+    assert quantized.codes.rows == quantized.scales.rows == 52
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_quantized_search_rescores_in_full_precision(tmp_path, monkeypatch, keyword_model, quantization):
+    monkeypatch.setattr(knowledge, "COMPACT_MIN_ROWS", 4)
+    kb, transcripts = _kb_with_videos(
+        tmp_path,
+        keyword_model,
+        {"code": "Python. Flask.", "food": "Pasta. Sauce.", "music": "Guitar. Chords."},
+    )
+    exact = [(hit.video_name, hit.score) for hit in kb.semantic_search("pasta sauce", limit=3)]
+
+    report = kb.quantize_vectors(quantization)
+    assert (report.rows, report.float32_bytes) == (3, 3 * len(VOCAB) * 4)
+    assert kb.quantization() == quantization
+    assert kb.quantized_path(0, quantization).exists()
+    hits = [(hit.video_name, hit.score) for hit in kb.semantic_search("pasta sauce", limit=3)]
+    assert [name for name, _ in hits] == [name for name, _ in exact]
+    assert np.allclose([score for _, score in hits], [score for _, score in exact], atol=1e-6)
+    assert kb._matrix.quantized is not None
+
+    # New rows and compaction keep the quantized copy in step with the float32 file.
+    for _ in range(4):
+        kb.update_embeddings_for("music")
+    assert not kb.quantized_path(0, quantization).exists()
+    assert kb._quantized_file(kb._connect()).rows == 3
+    assert list(kb.semantic_search("guitar", limit=1))[0].video_name == "music"
+
+    kb.quantize_vectors("float32")
+    assert not kb.quantized_path(1, quantization).exists()
+    assert kb._embedding_matrix().quantized is None
@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+import pytest
+
+from vidmelt import knowledge
+
+VOCAB = ("python", "flask", "pasta", "sauce", "guitar", "chords")
+
+
+@pytest.fixture
+def kb(tmp_path, keyword_model):
+    model = keyword_model(VOCAB)
+    transcripts = tmp_path / "transcripts"
+    transcripts.mkdir()
+    for name, text in {
+        "code": "Python and Flask. Flask routes in Python.",
+        "food": "Pasta with tomato sauce. More pasta.",
+        "music": "Guitar chords for beginners.",
+    }.items():
+        (transcripts / f"{name}.txt").write_text(text)
+    kb = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    kb.index_directory(transcripts)
+    kb.build_embeddings()
+    kb.model = model
+    return kb
+
+
+def _top(kb, query):
+    return [hit.video_name for hit in kb.semantic_search(query, limit=1)]
+
+
+def test_shadow_index_is_built_in_batches_and_swapped_in(kb):
+    live = kb.embedding_space()
+    old_vectors = kb.vector_path(0)
+    assert old_vectors.exists()
+
+    status = kb.start_reembedding(backend="hashing", model_name="hash-64")
+    assert (status.documents, status.embedded) == (3, 0)
+    status = kb.reembed_batch(max_documents=2)
+    assert status.pending == 1
+
+    # Mid-build, searches still read the complete live version.
+    assert kb.embedding_space() == live
+    assert _top(kb, "guitar") == ["music"]
+    assert kb.swap_shadow() is False
+
+    kb.reembed_batch(max_documents=2)
+    assert kb.swap_shadow() is True
+    assert kb.shadow_status() is None
+    assert kb.embedding_space() == knowledge.EmbeddingSpace("hashing", "hash-64", 64, knowledge.CHUNKER_VERSION)
+    calls = kb.model.calls
+    assert _top(kb, "tomato pasta") == ["food"]
+    assert kb.model.calls == calls  # queries are now encoded by the hashing backend
+
+    assert not old_vectors.exists()
+    with kb._connect() as conn:
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'embeddings_retired'").fetchone() is None
+        assert conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 3
+
+
+def test_documents_changed_during_the_build_are_embedded_again(kb, tmp_path):
+    kb.start_reembedding(backend="hashing", model_name="hash-64")
+    kb.reembed_batch(max_documents=10)
+    transcript = tmp_path / "transcripts" / "music.txt"
+    transcript.write_text("Jazz piano voicings.")
+    kb.upsert_document("music", transcript)
+    assert kb.shadow_status().pending == 1
+    assert kb.swap_shadow() is False
+
+    status = kb.reembed(pause=0)
+    assert status.swapped
+    assert _top(kb, "jazz piano") == ["music"]
+    with kb._connect() as conn:
+        assert conn.execute("SELECT chunk_text FROM embeddings WHERE video_name = 'music'").fetchone()[0] == (
+            "Jazz piano voicings."
+        )
+
+
+def test_a_batch_keeps_the_documents_that_did_not_change_while_it_encoded(kb, tmp_path, monkeypatch):
+    kb.start_reembedding(backend="hashing", model_name="hash-64")
+    transcripts = tmp_path / "transcripts"
+    load = knowledge._load_embedder
+
+    def racing_embedder(space):
+        def encode(texts, **options):
+            # An unrelated upload and an edit to one document of the batch land mid-encode.
+            monkeypatch.setattr(knowledge, "_load_embedder", load)
+            (transcripts / "news.txt").write_text("Election night.")
+            kb.upsert_document("news", transcripts / "news.txt")
+            (transcripts / "food.txt").write_text("Pasta carbonara.")
+            kb.upsert_document("food", transcripts / "food.txt")
+            return load(space).encode(texts, **options)
+
+        return SimpleNamespace(encode=encode)
+
+    monkeypatch.setattr(knowledge, "_load_embedder", racing_embedder)
+    status = kb.reembed_batch(max_documents=3)
+    assert (status.documents, status.embedded) == (4, 2)
+    with kb._connect() as conn:
+        assert [row[0] for row in conn.execute("SELECT video_name FROM shadow_documents ORDER BY 1")] == ["code", "music"]
+
+    assert kb.reembed(pause=0).swapped
+    with kb._connect() as conn:
+        assert conn.execute("SELECT chunk_text FROM embeddings WHERE video_name = 'food'").fetchone()[0] == (
+            "Pasta carbonara."
+        )
+
+
+def test_search_racing_a_swap_reads_one_version(kb):
+    kb.start_reembedding(backend="hashing", model_name="hash-64")
+    kb.reembed_batch(max_documents=10)
+    scored = kb._vector_candidates
+
+    def swap_after_scoring(*args, **kwargs):
+        candidates = scored(*args, **kwargs)
+        if kb.shadow_status() is not None:
+            kb.swap_shadow()
+        return candidates
+
+    kb._vector_candidates = swap_after_scoring
+    raced = list(kb.semantic_search("tomato pasta", limit=3))
+    kb._vector_candidates = scored
+    kb.search_results.clear()
+    assert raced == list(kb.semantic_search("tomato pasta", limit=3))
+    assert kb.embedding_space().backend == "hashing"
+
+
+def test_reembedding_to_the_live_space_is_refused(kb):
+    with pytest.raises(ValueError, match="already holds"):
+        kb.start_reembedding()
+    kb.start_reembedding(backend="hashing", model_name="hash-64")
+    kb.discard_shadow()
+    assert kb.shadow_status() is None
+    assert kb.collect_garbage() == 0
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from vidmelt import knowledge, related
+
+VOCAB = ("python", "flask", "pasta", "sauce", "guitar", "chords", "piano")
+
+
+@pytest.fixture
+def kb(tmp_path, keyword_model, topic_transcripts):
+    keyword_model(VOCAB)
+    transcripts = tmp_path / "transcripts"
+    transcripts.mkdir()
+    for name, text in topic_transcripts.items():
+        (transcripts / f"{name}.txt").write_text(text)
+    kb = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    kb.index_directory(transcripts)
+    kb.build_embeddings()
+    return kb
+
+
+def _graph(kb):
+    # Scores only: neighbours with tied scores may come in either order.
+    with kb._connect() as conn:
+        names = [row[0] for row in conn.execute("SELECT video_name FROM documents ORDER BY video_name")]
+    return {name: [round(video.score, 5) for video in kb.related_videos(name)] for name in names}
+
+
+def test_blocked_top_neighbours_match_a_full_product():
+    rng = np.random.default_rng(0)
+    centroids = rng.normal(size=(50, 8)).astype(np.float32)
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+    scores = centroids @ centroids.T
+    np.fill_diagonal(scores, -np.inf)
+
+    found = list(related.top_neighbours(centroids, 5, block_bytes=4 * 50 * 3))  # three rows per block
+    assert [row for row, _neighbours, _scores in found] == list(range(50))
+    for row, neighbours, similarities in found:
+        assert row not in neighbours
+        np.testing.assert_array_equal(neighbours, np.argsort(-scores[row], kind="stable")[:5])
+        np.testing.assert_allclose(similarities, scores[row, neighbours], rtol=1e-6)
+
+
+def test_graph_is_built_once_and_read_per_video(kb):
+    assert kb.related_neighbours() == 0
+    assert kb.related_videos("flask-intro") == []
+
+    report = kb.build_related_graph(neighbours=2)
+    assert (report.videos, report.edges) == (6, 12)
+    assert kb.related_neighbours() == 2
+    nearest = kb.related_videos("flask-intro")
+    assert [video.video_name for video in nearest] == ["flask-deploy", "python-tips"]
+    assert nearest[0].score >= nearest[1].score
+    assert nearest[0].transcript_path.endswith("flask-deploy.txt")
+    assert [video.video_name for video in kb.related_videos("pasta", limit=1)] == ["sauces"]
+
+
+def test_new_and_removed_videos_update_only_their_neighbourhood(kb, tmp_path):
+    kb.build_related_graph(neighbours=2)
+    transcript = tmp_path / "transcripts" / "piano.txt"
+    transcript.write_text("Piano chords and guitar chords.")
+    kb.upsert_document("piano", transcript)
+
+    written = []
+    store_neighbours = knowledge._store_neighbours
+
+    def spy(conn, names, centroids, rows, neighbours):
+        written.extend(names[row] for row in rows)
+        return store_neighbours(conn, names, centroids, rows, neighbours)
+
+    knowledge._store_neighbours = spy
+    try:
+        kb.update_embeddings_for("piano")
+    finally:
+        knowledge._store_neighbours = store_neighbours
+    assert [video.video_name for video in kb.related_videos("guitar")][0] == "piano"
+    assert "piano" in written and "flask-intro" not in written
+    incremental = _graph(kb)
+    kb.build_related_graph(neighbours=2)
+    assert incremental == _graph(kb)
+
+    kb.remove_document("guitar")
+    assert "guitar" not in [video.video_name for video in kb.related_videos("piano")]
+    incremental = _graph(kb)
+    kb.build_related_graph(neighbours=2)
+    assert incremental == _graph(kb)
@@ -0,0 +1,116 @@
+import pytest
+
+from vidmelt import knowledge, shards
+
+VOCAB = ("python", "flask", "pasta", "sauce", "guitar", "chords")
+
+
+@pytest.fixture
+def transcripts(tmp_path, keyword_model, topic_transcripts):
+    keyword_model(VOCAB)
+    directory = tmp_path / "transcripts"
+    directory.mkdir()
+    for name, text in topic_transcripts.items():
+        (directory / f"{name}.txt").write_text(text)
+    return directory
+
+
+def _hits(hits):
+    return [(hit.video_name, round(hit.score, 5)) for hit in hits]
+
+
+def test_routers_place_videos_deterministically(topic_transcripts):
+    router = shards.HashRouter(3)
+    assert router.keys == ["0", "1", "2"]
+    assert {router(name) for name in topic_transcripts} <= set(router.keys)
+    assert router("pasta") == shards.HashRouter(3)("pasta")
+    with pytest.raises(ValueError, match="beyond the configured 3"):
+        router.check(["0", "3"])
+
+    collections = shards.CollectionRouter({"flask-*": "code", "python-*": "code", "*sauce*": "food"})
+    assert collections.keys == ["code", "food", "default"]
+    assert [collections(name) for name in ("flask-intro", "sauces", "guitar")] == ["code", "food", "default"]
+    with pytest.raises(ValueError, match="collection name"):
+        shards.CollectionRouter({"*": "no spaces"})
+
+
+def test_sharded_search_merges_to_the_single_file_ranking(tmp_path, transcripts, topic_transcripts):
+    single = knowledge.KnowledgeBase(tmp_path / "single.sqlite3")
+    single.sync_from_directories(transcripts)
+    sharded = knowledge.ShardedKnowledgeBase(tmp_path / "kb.sqlite3", shards.HashRouter(3))
+    reports = []
+    report = sharded.sync_from_directories(transcripts)
+
+    assert report.added == len(topic_transcripts)
+    assert shards.existing_shards(tmp_path / "kb.sqlite3") == ["0", "1", "2"]
+    assert sum(1 for shard in sharded.shards.values() if shard.embedding_coverage()[0]) > 1
+    assert sharded.embedding_coverage() == (len(topic_transcripts),) * 2
+    for query in ("flask python", "pasta sauce", "guitar chords"):
+        assert _hits(sharded.semantic_search(query, limit=4)) == _hits(single.semantic_search(query, limit=4))
+    assert sharded.hybrid_search("pasta sauce", limit=1)[0].video_name in {"pasta", "sauces"}
+    assert {hit.video_name for hit in sharded.search("python", limit=5)} == {"flask-intro", "flask-deploy", "python-tips"}
+
+    report = sharded.embed_documents(progress=reports.append)
+    assert (report.documents, report.total_documents) == (len(topic_transcripts),) * 2
+    assert reports[-1].documents <= report.documents
+    sharded.remove_document("guitar")
+    assert "guitar" not in [hit.video_name for hit in sharded.semantic_search("guitar chords", limit=6)]
+
+
+def test_collection_shards_rebuild_and_move_independently(tmp_path, transcripts):
+    db_path = tmp_path / "kb.sqlite3"
+    router = shards.CollectionRouter({"flask-*": "code", "python-*": "code", "pasta": "food", "sauces": "food"})
+    kb = knowledge.ShardedKnowledgeBase(db_path, router)
+    kb.sync_from_directories(transcripts)
+    kb.build_related_graph(neighbours=1)
+    assert kb.shards["code"].embedding_coverage() == (3, 3)
+    assert [video.video_name for video in kb.related_videos("pasta")] == ["sauces"]
+
+    with kb.shards["food"]._connect() as conn:
+        food_version = conn.execute("SELECT value FROM kb_meta WHERE key = 'embeddings_version'").fetchone()[0]
+    report = kb.rebuild_shard("code", transcripts)
+    assert report.added == 3
+    with kb.shards["food"]._connect() as conn:
+        assert conn.execute("SELECT value FROM kb_meta WHERE key = 'embeddings_version'").fetchone()[0] == food_version
+    assert next(kb.semantic_search("flask", limit=1)).video_name.startswith("flask-")
+
+    # Moving "python-tips" to its own collection takes it out of "code" on the next sync.
+    moved = knowledge.ShardedKnowledgeBase(db_path, shards.CollectionRouter({**router.patterns, "python-*": "tips"}))
+    report = moved.sync_from_directories(transcripts)
+    assert (report.added, report.removed) == (1, 1)
+    assert moved.shards["code"].embedding_coverage() == (2, 2)
+    assert moved.shards["tips"].embedding_coverage() == (1, 1)
+    assert [hit.video_name for hit in moved.semantic_search("python tips", limit=6)].count("python-tips") == 1
+
+
+def test_sharded_reembed_reports_progress_and_swaps_every_shard(tmp_path, transcripts, topic_transcripts):
+    kb = knowledge.ShardedKnowledgeBase(tmp_path / "kb.sqlite3", shards.HashRouter(2), workers=2)
+    kb.sync_from_directories(transcripts)
+    progress = []
+
+    status = kb.reembed(backend="hashing", model_name="hash-64", max_documents=1, pause=0, progress=progress.append)
+
+    assert status.swapped and status.documents == len(topic_transcripts)
+    assert progress and all(update is not None for update in progress)
+    assert kb.shadow_status() is None
+    assert {shard.embedding_space().backend for shard in kb.shards.values()} == {"hashing"}
+    assert next(kb.semantic_search("guitar chords", limit=1)).video_name == "guitar"
+
+
+def test_sharded_ann_index_and_quantization_cover_every_shard(tmp_path, transcripts, topic_transcripts):
+    kb = knowledge.ShardedKnowledgeBase(tmp_path / "kb.sqlite3", shards.HashRouter(2))
+    kb.sync_from_directories(transcripts)
+    exact = [hit.video_name for hit in kb.semantic_search("pasta sauce", limit=2)]
+
+    indexes = kb.build_ann_index(nlist=1)
+    assert set(indexes) == {key for key, shard in kb.shards.items() if shard.embedding_coverage()[1]}
+    assert all(kb.shards[key].ann_path.exists() for key in indexes)
+    assert [hit.video_name for hit in kb.semantic_search("pasta sauce", limit=2, index="ivf", nprobe=1)] == exact
+
+    report = kb.quantize_vectors("int8")
+    assert report.rows == sum(len(index) for index in indexes.values())
+    assert report.quantized_bytes < report.float32_bytes
+    assert kb.quantization() == "int8"
+    assert all(shard._embedding_matrix().quantized is not None for shard in kb.shards.values())
+    assert [hit.video_name for hit in kb.semantic_search("pasta sauce", limit=2)] == exact
+    assert not (tmp_path / "kb.sqlite3").exists()
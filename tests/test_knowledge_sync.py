@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+
+from vidmelt import knowledge
+
+
+class CountingModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, items, **_):
+        self.encoded.extend(items)
+        return np.asarray([[len(text), 1.0] for text in items], dtype=np.float32)
+
+
+def _setup(tmp_path, monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(knowledge, "_load_embeddings_model", lambda model_name=knowledge.DEFAULT_EMBED_MODEL: model)
+    transcripts = tmp_path / "transcripts"
+    summaries = tmp_path / "summaries"
+    transcripts.mkdir()
+    summaries.mkdir()
+    (transcripts / "a.txt").write_text("Alpha transcript.")
+    (transcripts / "b.txt").write_text("Beta transcript.")
+    (summaries / "a.md").write_text("Alpha summary.")
+    kb = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    return kb, model, transcripts, summaries
+
+
+def test_sync_only_touches_changed_files(tmp_path, monkeypatch):
+    kb, model, transcripts, summaries = _setup(tmp_path, monkeypatch)
+
+    report = kb.sync_from_directories(transcripts, summaries)
+    assert (report.added, report.updated, report.removed, report.unchanged) == (2, 0, 0, 0)
+    assert sorted(model.encoded) == ["Alpha summary.", "Alpha transcript.", "Beta transcript."]
+
+    model.encoded.clear()
+    report = kb.sync_from_directories(transcripts, summaries)
+    assert not report.changed and report.unchanged == 2
+    assert model.encoded == []
+
+    # Touching a file without changing it costs a hash, not a re-embed.
+    stat = (transcripts / "b.txt").stat()
+    os.utime(transcripts / "b.txt", (stat.st_atime, stat.st_mtime + 10))
+    assert not kb.sync_from_directories(transcripts, summaries).changed
+    assert model.encoded == []
+
+    (summaries / "b.md").write_text("Beta summary, new.")
+    (transcripts / "c.txt").write_text("Gamma transcript.")
+    (transcripts / "a.txt").unlink()
+    report = kb.sync_from_directories(transcripts, summaries)
+    assert (report.added, report.updated, report.removed, report.unchanged) == (1, 1, 1, 0)
+    assert sorted(model.encoded) == ["Beta summary, new.", "Beta transcript.", "Gamma transcript."]
+
+    with kb._connect() as conn:
+        names = [row[0] for row in conn.execute("SELECT video_name FROM documents ORDER BY video_name")]
+        embedded = {row[0] for row in conn.execute("SELECT DISTINCT video_name FROM embeddings")}
+        tracked = {row[0] for row in conn.execute("SELECT video_name FROM file_state")}
+    assert names == ["b", "c"]
+    assert embedded == tracked == {"b", "c"}
+    assert [hit.video_name for hit in kb.search("Alpha")] == []
+
+
+def test_sync_drops_deleted_summary_and_adopts_existing_index(tmp_path, monkeypatch):
+    kb, model, transcripts, summaries = _setup(tmp_path, monkeypatch)
+    kb.upsert_document("a", transcripts / "a.txt", summaries / "a.md")
+    kb.update_embeddings_for("a")
+    model.encoded.clear()
+
+    # "a" was indexed by the pipeline already; only "b" needs work.
+    report = kb.sync_from_directories(transcripts, summaries)
+    assert (report.added, report.unchanged) == (1, 1)
+    assert model.encoded == ["Beta transcript."]
+
+    (summaries / "a.md").unlink()
+    report = kb.sync_from_directories(transcripts, summaries)
+    assert report.updated == 1
+    with kb._connect() as conn:
+        assert conn.execute("SELECT summary FROM documents WHERE video_name = 'a'").fetchone()[0] is None
+
+
+def test_legacy_index_is_adopted_without_reembedding(tmp_path, monkeypatch):
+    kb, model, transcripts, summaries = _setup(tmp_path, monkeypatch)
+    kb.index_directory(transcripts, summaries)
+    kb.build_embeddings()
+    with kb._connect() as conn:
+        conn.execute("DELETE FROM file_state")
+        conn.commit()
+    model.encoded.clear()
+
+    report = kb.sync_from_directories(transcripts, summaries)
+    assert not report.changed
+    assert model.encoded == []
@@ -0,0 +1,56 @@
+import app
+from vidmelt import history, metrics
+
+
+def test_measure_records_wall_cpu_and_rss():
+    with metrics.measure("transcribe", "whisper-base", rss_interval=0.01) as sample:
+        sum(range(200000))
+        sample.ok = True
+
+    assert sample.wall_seconds > 0
+    assert sample.cpu_seconds >= 0
+    assert sample.peak_rss_bytes > 0
+    sample.audio_seconds = sample.wall_seconds * 4
+    assert sample.real_time_factor == 0.25
+
+
+def test_registry_renders_counters_and_histograms():
+    registry = metrics.MetricsRegistry()
+    registry.observe(history.StageMetrics("transcribe", "whisper-base", True, 3.0, 2.5, 1024, 640, 12.0))
+    registry.observe(history.StageMetrics("transcribe", "whisper-base", False, 0.2, 0.1, 2048, 10))
+
+    text = registry.render()
+    assert 'vidmelt_stage_runs_total{stage="transcribe",model="whisper-base",status="ok"} 1' in text
+    assert 'vidmelt_stage_runs_total{stage="transcribe",model="whisper-base",status="failed"} 1' in text
+    assert 'vidmelt_stage_wall_seconds_bucket{stage="transcribe",model="whisper-base",le="5.0"} 2' in text
+    assert 'vidmelt_stage_wall_seconds_count{stage="transcribe",model="whisper-base"} 2' in text
+    assert 'vidmelt_stage_real_time_factor_bucket{stage="transcribe",model="whisper-base",le="0.25"} 1' in text
+    assert 'vidmelt_stage_audio_seconds_total{stage="transcribe",model="whisper-base"} 12.0' in text
+    assert 'vidmelt_stage_peak_rss_bytes{stage="transcribe"} 2048' in text
+
+
+def test_job_store_keeps_stage_metrics(tmp_path):
+    store = history.JobStore(tmp_path / "jobs.sqlite3")
+    job_id = store.record_start("videos/a.mp4", "whisper-base")
+    store.record_stage_metrics(job_id, history.StageMetrics("extract", "whisper-base", True, 1.0, 0.5, 100, 10, 20.0))
+    store.record_stage_metrics(job_id, history.StageMetrics("transcribe", "whisper-base", True, 5.0, 4.0, 200, 20, 20.0))
+    other = store.record_start("videos/b.mp4", "whisper-base")
+    store.record_stage_metrics(other, history.StageMetrics("transcribe", "whisper-base", True, 15.0, 9.0, 300, 20, 30.0))
+
+    assert [m.stage for m in store.stage_metrics(job_id)] == ["extract", "transcribe"]
+    assert store.stage_metrics(job_id)[1].audio_seconds == 20.0
+
+    summary = {row.stage: row for row in store.stage_summary()}
+    assert summary["transcribe"].runs == 2
+    assert summary["transcribe"].real_time_factor == 20.0 / 50.0
+    assert summary["transcribe"].max_peak_rss_bytes == 300
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    response = app.app.test_client().get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert "# TYPE vidmelt_stage_runs_total counter" in body
+    assert "vidmelt_queue_capacity" in body
+    assert "vidmelt_openai_requests_total" in body
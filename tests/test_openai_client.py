@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from vidmelt import openai_client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _rate_limit_error():
+    response = SimpleNamespace(status_code=429, headers={}, request=None)
+    return openai.RateLimitError("slow down", response=response, body=None)
+
+
+def test_token_bucket_waits_for_refill():
+    clock = FakeClock()
+    bucket = openai_client.TokenBucket(60, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire(60) == 0.0
+    waited = bucket.acquire(30)
+
+    assert waited == pytest.approx(30.0)
+    assert clock.now == pytest.approx(30.0)
+
+
+def test_client_retries_rate_limits_with_backoff():
+    attempts = []
+
+    def create(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) < 3:
+            raise _rate_limit_error()
+        return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5), text="ok")
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    sleeps = []
+    client = openai_client.RateLimitedClient(lambda: fake, sleep=sleeps.append, jitter=lambda: 1.0)
+
+    response = client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "hi"}])
+
+    assert response.text == "ok"
+    assert len(attempts) == 3
+    assert sleeps == [1.0, 2.0]
+    stats = client.stats()
+    assert (stats.requests, stats.retries, stats.failures) == (3, 2, 0)
+    assert (stats.prompt_tokens, stats.completion_tokens) == (10, 5)
+
+
+def test_client_gives_up_after_max_retries():
+    def create(**kwargs):
+        raise _rate_limit_error()
+
+    fake = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+    client = openai_client.RateLimitedClient(lambda: fake, max_retries=1, sleep=lambda _: None)
+
+    with pytest.raises(openai.RateLimitError):
+        client.audio.transcriptions.create(model="whisper-1", file=("a.wav", b""))
+
+    assert client.stats().failures == 1
+
+
+def test_client_does_not_retry_client_errors():
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        raise ValueError("bad request")
+
+    fake = SimpleNamespace(responses=SimpleNamespace(create=create))
+    client = openai_client.RateLimitedClient(lambda: fake, sleep=lambda _: None)
+
+    with pytest.raises(ValueError):
+        client.responses.create(model="gpt-4o-mini", input="hello")
+
+    assert len(calls) == 1
+
+
+def test_estimate_tokens_counts_prompt_and_allowance():
+    kwargs = {"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 50}
+
+    assert openai_client.estimate_tokens(kwargs) == 150
+    assert openai_client.estimate_tokens({"model": "whisper-1"}) == 0
@@ -1,7 +1,7 @@
-import sys
 from pathlib import Path
 from types import SimpleNamespace
 
+import numpy as np
 import pytest
 
 import app as app_module
@@ -34,7 +34,7 @@ def temp_dirs(tmp_path, monkeypatch):
     monkeypatch.setattr(summarize_module, "SUMMARY_DIR", summaries)
 
     events = []
-    store_events = SimpleNamespace(started=[], succeeded=[], failed=[], retries=[])
+    store_events = SimpleNamespace(started=[], succeeded=[], failed=[], retries=[], cache_hits=[], stages=[])
 
     class DummyBus:
         def publish(self, payload, event_type):
@@ -60,9 +60,18 @@ def temp_dirs(tmp_path, monkeypatch):
         def record_failure(self, job_id, error):
             store_events.failed.append((job_id, error))
 
+        def record_summary_cache_hit(self, job_id, saved_tokens, saved_seconds):
+            store_events.cache_hits.append((job_id, saved_tokens, saved_seconds))
+
+        def record_stage_metrics(self, job_id, metrics):
+            store_events.stages.append((job_id, metrics))
+
     dummy_store = DummyStore()
     monkeypatch.setattr(pipeline_module.history, "GLOBAL_STORE", dummy_store)
 
+    artifact_store = pipeline_module.artifacts.ArtifactStore(tmp_path / "artifacts.sqlite3")
+    monkeypatch.setattr(pipeline_module.artifacts, "GLOBAL_STORE", artifact_store)
+
     class DummyKB:
         def __init__(self):
             self.upserts = []
@@ -74,7 +83,7 @@ def temp_dirs(tmp_path, monkeypatch):
             self.upserts.append(("embed", video_name))
 
     dummy_kb = DummyKB()
-    monkeypatch.setattr(pipeline_module.knowledge, "KnowledgeBase", lambda: dummy_kb)
+    monkeypatch.setattr(pipeline_module.knowledge, "open_knowledge_base", lambda: dummy_kb)
     monkeypatch.setattr(app_module, "KB", dummy_kb)
 
     return SimpleNamespace(
@@ -87,6 +96,7 @@ def temp_dirs(tmp_path, monkeypatch):
         store=dummy_store,
         store_events=store_events,
         kb=dummy_kb,
+        artifacts=artifact_store,
     )
 
 
@@ -141,18 +151,20 @@ def test_process_video_reports_summarization_errors(monkeypatch, temp_dirs):
     events = temp_dirs.events
     store_events = temp_dirs.store_events
 
-    def fake_run(cmd, **kwargs):
-        if "ffmpeg" in cmd[0]:
-            audio_path.write_bytes(b"audio")
-        elif "whisper" in cmd:
-            transcript_path.write_text("transcript")
-        return SimpleNamespace(stdout="", stderr="", returncode=0)
-
     def failing_summarize(path, title):
         raise summarize_module.SummarizationError("boom")
 
     monkeypatch.setattr(pipeline_module.shutil, "which", lambda name: "/usr/bin/ffmpeg")
-    monkeypatch.setattr(pipeline_module.subprocess, "run", fake_run)
+    monkeypatch.setattr(
+        pipeline_module.audio,
+        "extract_pcm",
+        lambda video, cache_path=None: pipeline_module.audio.PcmAudio(np.full(16000, 0.1, dtype=np.float32)),
+    )
+    monkeypatch.setattr(
+        pipeline_module.transcriber.GLOBAL_POOL,
+        "transcribe",
+        lambda audio, model_name, **_: pipeline_module.transcriber.TranscriptionResult(text="transcript"),
+    )
     monkeypatch.setattr(pipeline_module, "summarize_transcript", failing_summarize)
 
     app_module.process_video_web(video_path, "whisper-base")
@@ -170,17 +182,25 @@ def test_process_video_logs_outputs(monkeypatch, temp_dirs):
     audio_path = temp_dirs.audio / "logdemo.wav"
     transcript_path = temp_dirs.transcripts / "logdemo.txt"
 
-    def fake_run(cmd, **kwargs):
-        if cmd[0] == "ffmpeg":
-            audio_path.write_bytes(b"audio")
-            return SimpleNamespace(stdout="ffmpeg out", stderr="ffmpeg err")
-        elif cmd[0] == sys.executable and "whisper" in cmd:
-            transcript_path.write_text("transcript")
-            return SimpleNamespace(stdout="whisper out", stderr="whisper err")
-        raise AssertionError("Unexpected command")
+    samples = np.full(32000, 0.1, dtype=np.float32)
+
+    def fake_extract(video, cache_path=None):
+        assert video == video_path
+        assert cache_path is None, "WAV cache is opt-in"
+        return pipeline_module.audio.PcmAudio(samples, log="ffmpeg err")
+
+    transcribed = []
+
+    def fake_transcribe(audio, model_name, **kwargs):
+        transcribed.append((audio, model_name))
+        return pipeline_module.transcriber.TranscriptionResult(
+            text=" whisper out",
+            segments=[{"start": 0.0, "end": 1.5, "text": " whisper out"}],
+        )
 
     monkeypatch.setattr(pipeline_module.shutil, "which", lambda name: "/usr/bin/ffmpeg")
-    monkeypatch.setattr(pipeline_module.subprocess, "run", fake_run)
+    monkeypatch.setattr(pipeline_module.audio, "extract_pcm", fake_extract)
+    monkeypatch.setattr(pipeline_module.transcriber.GLOBAL_POOL, "transcribe", fake_transcribe)
     monkeypatch.setattr(pipeline_module, "summarize_transcript", lambda path, title: temp_dirs.summaries.joinpath(f"{title}.md").write_text("summary"))
 
     store_events = temp_dirs.store_events
@@ -191,11 +211,44 @@ def test_process_video_logs_outputs(monkeypatch, temp_dirs):
     log_files = sorted(temp_dirs.logs.glob("logdemo-*.log"))
     assert len(log_files) == 2
     contents = "\n".join(path.read_text() for path in log_files)
-    assert "ffmpeg out" in contents
-    assert "whisper out" in contents
+    assert "ffmpeg err" in contents
+    assert "[00:00.000 --> 00:01.500] whisper out" in contents
+    assert transcript_path.read_text() == "whisper out\n"
+    assert len(transcribed) == 1 and transcribed[0][0] is samples
+    assert not audio_path.exists()
     assert store_events.succeeded
     assert any(item[0] == "embed" for item in temp_dirs.kb.upserts)
 
+    stages = {metrics.stage: metrics for _job_id, metrics in store_events.stages}
+    assert list(stages) == ["extract", "transcribe", "summarize", "index"]
+    assert all(metrics.ok and metrics.wall_seconds >= 0 and metrics.peak_rss_bytes > 0 for metrics in stages.values())
+    assert stages["extract"].input_bytes == len(b"video")
+    assert stages["transcribe"].input_bytes == samples.nbytes
+    assert stages["transcribe"].audio_seconds == 2.0
+    assert stages["transcribe"].model == "whisper-base"
+    assert stages["summarize"].audio_seconds is None
+
+
+def test_chunk_worker_cpu_counts_towards_the_transcribe_stage(monkeypatch, temp_dirs):
+    video_path = temp_dirs.videos / "chunked.mp4"
+    video_path.write_bytes(b"video")
+    samples = np.full(32000, 0.1, dtype=np.float32)
+
+    def fake_chunked(audio, model_name, **kwargs):
+        assert kwargs["workers"] == 2
+        return pipeline_module.transcriber.TranscriptionResult(text=" chunked", cpu_seconds=12.5)
+
+    monkeypatch.setattr(pipeline_module.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(pipeline_module.audio, "extract_pcm", lambda video, cache_path=None: pipeline_module.audio.PcmAudio(samples))
+    monkeypatch.setattr(pipeline_module.transcriber, "transcribe_chunked", fake_chunked)
+    monkeypatch.setattr(pipeline_module, "summarize_transcript", lambda path, title: temp_dirs.summaries.joinpath(f"{title}.md").write_text("summary"))
+
+    assert pipeline_module.process_video(video_path, "whisper-base", chunk_workers=2)
+
+    stages = {metrics.stage: metrics for _job_id, metrics in temp_dirs.store_events.stages}
+    assert stages["transcribe"].cpu_seconds >= 12.5
+    assert stages["summarize"].cpu_seconds < 12.5
+
 
 def test_process_video_retry(monkeypatch, temp_dirs):
     video_path = temp_dirs.videos / "retry.mp4"
@@ -223,3 +276,91 @@ def test_process_video_retry(monkeypatch, temp_dirs):
 
     assert result is True
     assert store_events.retries == [42]
+
+
+def test_process_video_reuses_artifacts_for_duplicate_content(monkeypatch, temp_dirs):
+    original = temp_dirs.videos / "original.mp4"
+    original.write_bytes(b"identical video")
+    renamed = temp_dirs.videos / "renamed.mp4"
+    renamed.write_bytes(b"identical video")
+
+    calls = []
+
+    def fake_transcribe(audio, model_name, **kwargs):
+        calls.append("transcribe")
+        return pipeline_module.transcriber.TranscriptionResult(text="words")
+
+    def fake_summarize(path, title):
+        calls.append("summarize")
+        temp_dirs.summaries.joinpath(f"{title}.md").write_text(f"summary of {path.read_text().strip()}")
+
+    monkeypatch.setattr(pipeline_module.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(
+        pipeline_module.audio,
+        "extract_pcm",
+        lambda video, cache_path=None: pipeline_module.audio.PcmAudio(np.full(16000, 0.1, dtype=np.float32)),
+    )
+    monkeypatch.setattr(pipeline_module.transcriber.GLOBAL_POOL, "transcribe", fake_transcribe)
+    monkeypatch.setattr(pipeline_module, "summarize_transcript", fake_summarize)
+
+    assert pipeline_module.process_video(original, "whisper-base")
+    assert pipeline_module.process_video(renamed, "whisper-base")
+
+    assert calls == ["transcribe", "summarize"]
+    assert (temp_dirs.transcripts / "renamed.txt").read_text() == "words\n"
+    assert (temp_dirs.summaries / "renamed.md").read_text() == "summary of words"
+
+
+def test_process_video_ignores_transcript_from_same_named_video(monkeypatch, temp_dirs):
+    first_dir = temp_dirs.videos / "a"
+    second_dir = temp_dirs.videos / "b"
+    first_dir.mkdir()
+    second_dir.mkdir()
+    first = first_dir / "talk.mp4"
+    first.write_bytes(b"first video")
+    second = second_dir / "talk.mp4"
+    second.write_bytes(b"second video")
+
+    texts = iter(["first words", "second words"])
+    monkeypatch.setattr(pipeline_module.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(
+        pipeline_module.audio,
+        "extract_pcm",
+        lambda video, cache_path=None: pipeline_module.audio.PcmAudio(np.full(16000, 0.1, dtype=np.float32)),
+    )
+    monkeypatch.setattr(
+        pipeline_module.transcriber.GLOBAL_POOL,
+        "transcribe",
+        lambda audio, model_name, **_: pipeline_module.transcriber.TranscriptionResult(text=next(texts)),
+    )
+    monkeypatch.setattr(
+        pipeline_module,
+        "summarize_transcript",
+        lambda path, title: temp_dirs.summaries.joinpath(f"{title}.md").write_text(path.read_text()),
+    )
+
+    assert pipeline_module.process_video(first, "whisper-base")
+    assert pipeline_module.process_video(second, "whisper-base")
+
+    assert (temp_dirs.transcripts / "talk.txt").read_text() == "second words\n"
+    assert (temp_dirs.summaries / "talk.md").read_text() == "second words\n"
+
+
+def test_process_video_records_summary_cache_hits(monkeypatch, temp_dirs):
+    video_path = temp_dirs.videos / "cached.mp4"
+    video_path.write_bytes(b"video")
+    transcript_path = temp_dirs.transcripts / "cached.txt"
+    transcript_path.write_text("already transcribed")
+
+    def cached_summarize(path, title):
+        summary_path = temp_dirs.summaries / f"{title}.md"
+        summary_path.write_text("summary")
+        return summarize_module.SummaryResult(summary_path, cached=True, prompt_tokens=900, completion_tokens=100, latency=3.0)
+
+    monkeypatch.setattr(pipeline_module.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(pipeline_module, "summarize_transcript", cached_summarize)
+
+    assert pipeline_module.process_video(video_path, "whisper-base", publish=app_module.EVENT_BUS.publish)
+
+    assert temp_dirs.store_events.cache_hits == [(1, 1000, 3.0)]
+    assert any("reused from cache" in message for _type, message in temp_dirs.events)
@@ -0,0 +1,84 @@
+from vidmelt import knowledge
+from vidmelt.query_cache import LRUCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _queries(model):
+    """Texts encoded on their own: search queries (and single-chunk documents)."""
+
+    return [batch[0] for batch in model.batches if len(batch) == 1]
+
+
+def test_lru_cache_evicts_expires_and_invalidates():
+    clock = FakeClock()
+    cache = LRUCache(2, ttl=10, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    clock.now = 11
+    assert cache.get("a") is None
+
+    cache.validate(1)
+    cache.put("d", 4)
+    cache.validate(1)
+    assert cache.get("d") == 4
+    cache.validate(2)
+    assert cache.get("d") is None
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (3, 3)
+    assert (stats.evictions, stats.expirations, stats.invalidations) == (1, 1, 2)
+    assert stats.size == 0
+    assert stats.hit_rate == 0.5
+
+
+def test_disabled_cache_always_misses():
+    cache = LRUCache(0, ttl=10)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_normalize_query_folds_case_and_whitespace():
+    assert normalize_query("  How do I\tuse  PYTHON? ") == normalize_query("how do i use python?")
+
+
+def test_repeated_queries_skip_encoding_and_retrieval_until_the_index_changes(tmp_path, keyword_model):
+    model = keyword_model(("python", "pasta", "guitar"))
+    transcripts = tmp_path / "transcripts"
+    transcripts.mkdir()
+    (transcripts / "code.txt").write_text("Python tips. More python.")
+    (transcripts / "food.txt").write_text("Pasta night.")
+    kb = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    kb.index_directory(transcripts)
+    kb.build_embeddings()
+
+    first = list(kb.semantic_search("Python", limit=1))
+    again = list(kb.semantic_search("  python ", limit=1))
+    assert [hit.video_name for hit in again] == [hit.video_name for hit in first] == ["code"]
+    assert _queries(model) == ["Python"]
+    assert kb.cache_stats()["result"].hits == 1
+
+    kb.hybrid_search("python", limit=1)
+    kb.hybrid_search("python", limit=1)
+    assert _queries(model) == ["Python"]  # the embedding is shared with semantic search
+    assert kb.cache_stats()["embedding"].hits == 1
+
+    assert [hit.video_name for hit in kb.semantic_search("guitar", limit=1)] != ["guitar"]
+    (transcripts / "guitar.txt").write_text("Guitar chords.")
+    kb.upsert_document("guitar", transcripts / "guitar.txt")
+    kb.update_embeddings_for("guitar")
+    assert [hit.video_name for hit in kb.semantic_search("guitar", limit=1)] == ["guitar"]
+    assert _queries(model).count("guitar") == 1  # encoded once, then served from the cache
+    assert kb.cache_stats()["result"].invalidations == 1
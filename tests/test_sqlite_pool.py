@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from vidmelt import knowledge
+from vidmelt.sqlite_pool import ConnectionPool
+
+
+def test_connections_are_per_thread_and_tuned(tmp_path):
+    pool = ConnectionPool(tmp_path / "db.sqlite3", cache_kib=2048, mmap_bytes=1 << 20)
+    conn = pool.connection()
+    assert pool.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2048
+    assert conn.execute("PRAGMA mmap_size").fetchone()[0] == 1 << 20
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+    pool.close()
+    assert pool.connection() is not conn
+
+
+def test_readers_see_committed_data_while_a_write_is_open(tmp_path):
+    pool = ConnectionPool(tmp_path / "db.sqlite3")
+    with pool.write() as conn:
+        conn.execute("CREATE TABLE items (value INTEGER)")
+        conn.execute("INSERT INTO items VALUES (1)")
+
+    seen = []
+    with pool.write() as conn:
+        conn.execute("INSERT INTO items VALUES (2)")
+        with pool.write() as nested:
+            assert nested is conn
+            nested.execute("INSERT INTO items VALUES (3)")
+        reader = threading.Thread(
+            target=lambda: seen.append(pool.connection().execute("SELECT COUNT(*) FROM items").fetchone()[0])
+        )
+        reader.start()
+        reader.join(timeout=5)
+    assert seen == [1]
+    assert pool.connection().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 3
+
+    with pytest.raises(RuntimeError):
+        with pool.write() as conn:
+            conn.execute("INSERT INTO items VALUES (4)")
+            raise RuntimeError("boom")
+    assert pool.connection().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 3
+
+
+def test_concurrent_indexing_and_search_do_not_lock(tmp_path):
+    kb = knowledge.KnowledgeBase(tmp_path / "kb.sqlite3")
+    transcripts = tmp_path / "transcripts"
+    transcripts.mkdir()
+    errors = []
+
+    def index(worker):
+        try:
+            for n in range(20):
+                path = transcripts / f"video-{worker}-{n}.txt"
+                path.write_text(f"python lesson {worker} {n}")
+                kb.upsert_document(path.stem, path)
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    def search():
+        try:
+            for _ in range(50):
+                list(kb.search("python", limit=5))
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=index, args=(worker,)) for worker in range(3)]
+    threads += [threading.Thread(target=search) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert kb.embedding_coverage() == (60, 0)
@@ -0,0 +1,82 @@
+import threading
+
+from vidmelt import staging
+
+
+def test_items_flow_through_stages_in_order():
+    seen = []
+
+    def double(item):
+        item["value"] *= 2
+        return True
+
+    def drop_odd_inputs(item):
+        return item["input"] % 2 == 0
+
+    def collect(item):
+        seen.append(item["input"])
+        return True
+
+    executor = staging.StagedExecutor(
+        [
+            staging.Stage("double", double, workers=2),
+            staging.Stage("filter", drop_odd_inputs),
+            staging.Stage("collect", collect),
+        ]
+    )
+    outcomes = executor.run({"input": n, "value": n} for n in range(6))
+
+    assert [outcome.item["input"] for outcome in outcomes] == list(range(6))
+    assert [outcome.failed_stage for outcome in outcomes] == [None, "filter"] * 3
+    assert sorted(seen) == [0, 2, 4]
+    assert all(outcome.item["value"] == outcome.item["input"] * 2 for outcome in outcomes)
+
+
+def test_stage_exceptions_are_reported_not_raised():
+    def explode(item):
+        raise RuntimeError(f"bad {item}")
+
+    outcomes = staging.StagedExecutor([staging.Stage("boom", explode)]).run([1])
+
+    assert outcomes[0].failed_stage == "boom"
+    assert str(outcomes[0].error) == "bad 1"
+
+
+def test_stages_overlap_with_their_own_worker_counts():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def slow(item):
+        barrier.wait()  # only passes when three items are in this stage at once
+        return True
+
+    outcomes = staging.StagedExecutor(
+        [staging.Stage("fast", lambda item: True), staging.Stage("slow", slow, workers=3)]
+    ).run(range(3))
+
+    assert all(outcome.ok for outcome in outcomes)
+
+
+def test_bounded_queues_limit_read_ahead():
+    release = threading.Event()
+    pulled = []
+
+    def items():
+        for n in range(20):
+            pulled.append(n)
+            yield n
+
+    def blocked(item):
+        release.wait(timeout=5)
+        return True
+
+    executor = staging.StagedExecutor([staging.Stage("blocked", blocked)], queue_size=2)
+    runner = threading.Thread(target=executor.run, args=(items(),))
+    runner.start()
+    threading.Event().wait(0.2)
+    in_flight = len(pulled)
+    release.set()
+    runner.join(timeout=5)
+
+    # one item in the worker, two queued, one waiting on put()
+    assert in_flight <= 4
+    assert len(pulled) == 20
@@ -0,0 +1,115 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import summarize
+
+
+class FakeClient:
+    def __init__(self):
+        self.prompts = []
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages):
+        prompt = messages[-1]["content"]
+        with self.lock:
+            self.prompts.append(prompt)
+        if prompt.startswith("This is part"):
+            part = prompt.split()[3]
+            text = f"- notes for part {part}"
+        else:
+            text = "# Final summary"
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+            usage=SimpleNamespace(prompt_tokens=len(prompt.split()), completion_tokens=3),
+        )
+
+
+@pytest.fixture
+def fake_client(monkeypatch, tmp_path):
+    client = FakeClient()
+    monkeypatch.setattr(summarize.openai_client, "shared_client", lambda: client)
+    monkeypatch.setattr(summarize, "SUMMARY_DIR", tmp_path)
+    monkeypatch.setattr(
+        summarize.summary_cache,
+        "GLOBAL_CACHE",
+        summarize.summary_cache.SummaryCache(tmp_path / "cache.sqlite3"),
+    )
+    return client
+
+
+def test_short_transcript_uses_single_call(tmp_path, fake_client):
+    transcript = tmp_path / "short.txt"
+    transcript.write_text("A short talk about Python.\nIt is brief.\n")
+
+    summarize.summarize_transcript(transcript, "short")
+
+    assert len(fake_client.prompts) == 1
+    assert "Here is the transcript" in fake_client.prompts[0]
+    assert "It is brief." in fake_client.prompts[0]
+    assert (tmp_path / "short.md").read_text() == "# Final summary"
+
+
+def test_long_transcript_is_map_reduced_without_truncation(tmp_path, fake_client, monkeypatch):
+    monkeypatch.setattr(summarize, "SINGLE_CALL_TOKENS", 100)
+    monkeypatch.setattr(summarize, "CHUNK_TOKENS", 40)
+    lines = [f"sentence {n} " + "word " * 9 for n in range(30)]
+    transcript = tmp_path / "long.txt"
+    transcript.write_text("\n".join(lines) + "\nthe very last words\n")
+
+    summarize.summarize_transcript(transcript, "long", concurrency=3)
+
+    chunk_prompts = [prompt for prompt in fake_client.prompts if prompt.startswith("This is part")]
+    final_prompts = [prompt for prompt in fake_client.prompts if "consecutive parts" in prompt]
+    assert len(chunk_prompts) > 1
+    assert any("the very last words" in prompt for prompt in chunk_prompts)
+    assert len(final_prompts) == 1
+    assert final_prompts[0].index("Part 1:") < final_prompts[0].index("Part 2:")
+    assert (tmp_path / "long.md").read_text() == "# Final summary"
+
+
+def test_split_transcript_respects_budget():
+    text = "\n".join("one two three four five six seven eight" for _ in range(5))
+
+    chunks = summarize._split_transcript(text, budget=16)
+
+    assert all(len(chunk.split()) <= 12 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_summarization_errors_are_wrapped(tmp_path, monkeypatch):
+    def broken():
+        raise RuntimeError("no network")
+
+    monkeypatch.setattr(summarize.openai_client, "shared_client", broken)
+    monkeypatch.setattr(
+        summarize.summary_cache,
+        "GLOBAL_CACHE",
+        summarize.summary_cache.SummaryCache(tmp_path / "cache.sqlite3"),
+    )
+    transcript = tmp_path / "t.txt"
+    transcript.write_text("hello")
+
+    with pytest.raises(summarize.SummarizationError, match="no network"):
+        summarize.summarize_transcript(transcript, "t")
+
+
+def test_unchanged_transcript_is_served_from_cache(tmp_path, fake_client, monkeypatch):
+    transcript = tmp_path / "talk.txt"
+    transcript.write_text("Caching saves money.\n")
+
+    first = summarize.summarize_transcript(transcript, "talk")
+    second = summarize.summarize_transcript(transcript, "copy")
+
+    assert not first.cached and second.cached
+    assert len(fake_client.prompts) == 1
+    assert second.completion_tokens == 3 and second.prompt_tokens == first.prompt_tokens
+    assert (tmp_path / "copy.md").read_text() == "# Final summary"
+
+    # A new prompt version invalidates the entry.
+    monkeypatch.setattr(summarize, "PROMPT_VERSION", "next")
+    third = summarize.summarize_transcript(transcript, "talk")
+    assert not third.cached
+    assert len(fake_client.prompts) == 2
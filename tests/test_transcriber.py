@@ -0,0 +1,156 @@
+import json
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from vidmelt import transcriber
+
+
+def _fake_loader(loaded):
+    def load(model_name):
+        loaded.append(model_name)
+
+        def transcribe(audio, **kwargs):
+            return {
+                "text": f" {model_name} text",
+                "segments": [
+                    {"start": 0.0, "end": 2.0, "text": f" {model_name} one"},
+                    {"start": 2.0, "end": 3661.25, "text": " two "},
+                ],
+            }
+
+        return SimpleNamespace(name=model_name, transcribe=transcribe)
+
+    return load
+
+
+def test_pool_reuses_loaded_models():
+    loaded = []
+    pool = transcriber.WhisperModelPool(capacity=2, loader=_fake_loader(loaded))
+
+    first = pool.get("base")
+    second = pool.get("base")
+
+    assert first is second
+    assert loaded == ["base"]
+
+
+def test_pool_evicts_least_recently_used():
+    loaded = []
+    pool = transcriber.WhisperModelPool(capacity=2, loader=_fake_loader(loaded))
+
+    pool.get("base")
+    pool.get("medium")
+    pool.get("base")
+    pool.get("large")
+
+    assert pool.loaded_models() == ["base", "large"]
+    pool.get("medium")
+    assert loaded == ["base", "medium", "large", "medium"]
+
+
+def test_pool_rejects_empty_capacity():
+    with pytest.raises(ValueError):
+        transcriber.WhisperModelPool(capacity=0)
+
+
+def test_transcribe_writes_whisper_txt_layout(tmp_path):
+    pool = transcriber.WhisperModelPool(capacity=1, loader=_fake_loader([]))
+
+    result = pool.transcribe(tmp_path / "clip.wav", "base")
+    transcript_path = tmp_path / "clip.txt"
+    transcriber.write_transcript(result, transcript_path)
+
+    assert transcript_path.read_text() == "base one\ntwo\n"
+    assert json.loads(transcriber.segments_path(transcript_path).read_text()) == [
+        {"start": 0.0, "end": 2.0, "text": "base one"},
+        {"start": 2.0, "end": 3661.25, "text": "two"},
+    ]
+    assert result.format_log().splitlines() == [
+        "[00:00.000 --> 00:02.000] base one",
+        "[00:02.000 --> 01:01:01.250] two",
+    ]
+
+
+def test_split_on_silence_cuts_at_quiet_frames():
+    sample_rate = 1000
+    audio = np.full(10 * sample_rate, 0.5, dtype=np.float32)
+    audio[3800:4100] = 0.0  # silence shortly before the 4 s boundary
+    audio[8200:8400] = 0.0  # silence shortly after the 8 s boundary
+
+    ranges = transcriber.split_on_silence(audio, chunk_seconds=4, sample_rate=sample_rate, search_seconds=0.5)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(audio)
+    assert all(prev[1] == nxt[0] for prev, nxt in zip(ranges, ranges[1:]))
+    assert 3800 <= ranges[0][1] < 4100
+    assert 8200 <= ranges[1][1] < 8400
+
+
+def test_transcribe_chunked_merges_in_order(monkeypatch):
+    sample_rate = 1000
+
+    def transcribe(samples, model_name, **kwargs):
+        label = f" part{int(np.median(samples))}"
+        return transcriber.TranscriptionResult(
+            text=label,
+            segments=[{"start": 0.5, "end": 1.0, "text": label}],
+        )
+
+    monkeypatch.setattr(transcriber.GLOBAL_POOL, "transcribe", transcribe)
+    audio = np.repeat(np.arange(1, 4, dtype=np.float32), 2 * sample_rate)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        result = transcriber.transcribe_chunked(
+            audio,
+            "base",
+            chunk_seconds=2.5,
+            sample_rate=sample_rate,
+            executor=executor,
+        )
+
+    assert result.text == " part1 part2 part3"
+    assert result.cpu_seconds >= 0
+    assert [seg["start"] for seg in result.segments] == pytest.approx([0.5, 2.45, 4.46])
+
+
+def test_load_wav_reads_pcm16(tmp_path):
+    path = tmp_path / "clip.wav"
+    samples = np.array([0, 16384, -16384, 32767], dtype=np.int16)
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(16000)
+        handle.writeframes(samples.tobytes())
+
+    audio = transcriber.load_wav(path)
+
+    assert audio.dtype == np.float32
+    assert np.allclose(audio, samples / 32768.0)
+
+
+def test_pool_loads_replicas_for_concurrent_transcriptions():
+    loaded = []
+    pool = transcriber.WhisperModelPool(capacity=1, loader=_fake_loader(loaded), replicas=2)
+    gate = threading.Barrier(2, timeout=5)
+
+    def slow_loader(model_name):
+        model = _fake_loader(loaded)(model_name)
+        inner = model.transcribe
+
+        def transcribe(audio, **kwargs):
+            gate.wait()  # both replicas must be busy at the same time
+            return inner(audio, **kwargs)
+
+        model.transcribe = transcribe
+        return model
+
+    pool._loader = slow_loader
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lambda _: pool.transcribe("clip.wav", "base"), range(2)))
+
+    assert len(results) == 2
+    assert loaded == ["base", "base"]
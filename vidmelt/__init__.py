@@ -1,3 +1,3 @@
 """Vidmelt package utilities."""
 
-__all__ = ["doctor", "pipeline", "batch", "history", "knowledge", "chat"]
+__all__ = ["doctor", "pipeline", "batch", "history", "knowledge", "chat", "transcriber", "audio", "artifacts", "staging", "summary_cache", "openai_client", "jobqueue", "metrics", "ann", "vector_store", "embedqueue", "sqlite_pool", "query_cache", "embedders", "related", "shards"]
@@ -0,0 +1,186 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index for chunk embeddings."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_NPROBE = int(os.getenv("VIDMELT_ANN_NPROBE", "8"))
+KMEANS_ITERATIONS = 20
+KMEANS_SAMPLE = 100_000
+
+
+def default_nlist(count: int) -> int:
+    """Number of inverted lists for ``count`` vectors (about 4 * sqrt(n))."""
+
+    return max(1, min(count, int(4 * np.sqrt(max(count, 1)))))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    k: int,
+    *,
+    iterations: int = KMEANS_ITERATIONS,
+    sample: int = KMEANS_SAMPLE,
+    seed: int = 0,
+) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity and return ``k`` unit centroids."""
+
+    rng = np.random.default_rng(seed)
+    data = _normalize(vectors)
+    if len(data) > sample:
+        data = data[rng.choice(len(data), sample, replace=False)]
+    k = max(1, min(k, len(data)))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        counts = np.bincount(assignment, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters with random points so every list is used.
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+        updated = _normalize(sums)
+        if np.allclose(updated, centroids, atol=1e-6):
+            break
+        centroids = updated
+    return centroids
+
+
+class IVFIndex:
+    """Vectors bucketed by nearest k-means centroid; a query scans ``nprobe`` buckets.
+
+    Each entry has an integer id (the ``embeddings`` rowid) and a group (the
+    video name) so a re-embedded video can be dropped and re-added without a
+    rebuild.  ``version`` records the knowledge-base embeddings version the
+    index reflects.
+    """
+
+    def __init__(self, centroids: np.ndarray, *, version: int = 0):
+        self.centroids = _normalize(centroids)
+        self.version = version
+        nlist = len(self.centroids)
+        dim = self.centroids.shape[1]
+        self.list_ids: List[np.ndarray] = [np.zeros(0, dtype=np.int64) for _ in range(nlist)]
+        self.list_vectors: List[np.ndarray] = [np.zeros((0, dim), dtype=np.float32) for _ in range(nlist)]
+        self.groups: Dict[str, np.ndarray] = {}
+        self._list_of_id: Dict[int, int] = {}
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, *, nlist: Optional[int] = None, seed: int = 0) -> "IVFIndex":
+        nlist = nlist or default_nlist(len(vectors))
+        return cls(spherical_kmeans(vectors, nlist, seed=seed))
+
+    @property
+    def dim(self) -> int:
+        return self.centroids.shape[1]
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return len(self._list_of_id)
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray, group: str) -> None:
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        vectors = _normalize(vectors)
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+        for list_no in np.unique(assignment):
+            members = assignment == list_no
+            self.list_ids[list_no] = np.concatenate([self.list_ids[list_no], ids[members]])
+            self.list_vectors[list_no] = np.concatenate([self.list_vectors[list_no], vectors[members]])
+        for entry, list_no in zip(ids.tolist(), assignment.tolist()):
+            self._list_of_id[entry] = list_no
+        previous = self.groups.get(group)
+        self.groups[group] = ids if previous is None else np.concatenate([previous, ids])
+
+    def remove_group(self, group: str) -> int:
+        ids = self.groups.pop(group, None)
+        if ids is None:
+            return 0
+        by_list: Dict[int, List[int]] = {}
+        for entry in ids.tolist():
+            list_no = self._list_of_id.pop(entry, None)
+            if list_no is not None:
+                by_list.setdefault(list_no, []).append(entry)
+        for list_no, entries in by_list.items():
+            keep = ~np.isin(self.list_ids[list_no], entries)
+            self.list_ids[list_no] = self.list_ids[list_no][keep]
+            self.list_vectors[list_no] = self.list_vectors[list_no][keep]
+        return len(ids)
+
+    def search(self, query: np.ndarray, k: int, *, nprobe: int = DEFAULT_NPROBE) -> List[Tuple[int, float]]:
+        """Return ``(id, cosine similarity)`` pairs for the best ``k`` candidates, best first."""
+
+        if k <= 0 or not self._list_of_id:
+            return []
+        query = _normalize(query)[0]
+        nprobe = max(1, min(nprobe, self.nlist))
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        ids = np.concatenate([self.list_ids[list_no] for list_no in probes])
+        if not len(ids):
+            return []
+        vectors = np.concatenate([self.list_vectors[list_no] for list_no in probes])
+        scores = vectors @ query
+        k = min(k, len(ids))
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(ids[row]), float(scores[row])) for row in best]
+
+    def save(self, path: Path | str) -> None:
+        """Write the index atomically (temp file + rename)."""
+
+        path = Path(path)
+        sizes = np.array([len(ids) for ids in self.list_ids], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        group_names = sorted(self.groups)
+        group_sizes = np.array([len(self.groups[name]) for name in group_names], dtype=np.int64)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as handle:
+            np.savez(
+                handle,
+                centroids=self.centroids,
+                offsets=offsets,
+                ids=np.concatenate(self.list_ids) if self.list_ids else np.zeros(0, dtype=np.int64),
+                vectors=np.concatenate(self.list_vectors) if self.list_vectors else np.zeros((0, self.dim), np.float32),
+                group_names=np.array(group_names, dtype=np.str_),
+                group_sizes=group_sizes,
+                group_ids=np.concatenate([self.groups[name] for name in group_names]) if group_names else np.zeros(0, dtype=np.int64),
+                version=np.array(self.version, dtype=np.int64),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path | str) -> "IVFIndex":
+        with np.load(path, allow_pickle=False) as data:
+            index = cls(data["centroids"], version=int(data["version"]))
+            offsets = data["offsets"]
+            ids = data["ids"]
+            vectors = data["vectors"]
+            for list_no in range(index.nlist):
+                start, end = int(offsets[list_no]), int(offsets[list_no + 1])
+                index.list_ids[list_no] = ids[start:end].copy()
+                index.list_vectors[list_no] = vectors[start:end].copy()
+                for entry in ids[start:end].tolist():
+                    index._list_of_id[entry] = list_no
+            start = 0
+            group_ids = data["group_ids"]
+            for name, size in zip(data["group_names"].tolist(), data["group_sizes"].tolist()):
+                index.groups[name] = group_ids[start : start + size].copy()
+                start += size
+        return index
@@ -0,0 +1,169 @@
+"""Content-addressed cache mapping videos to their derived artifacts."""
+from __future__ import annotations
+
+import hashlib
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from . import history
+
+DEFAULT_DB_PATH = history.DEFAULT_DB_PATH
+SAMPLE_SIZE = 256 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    content_key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    sampled_hash TEXT NOT NULL,
+    full_hash TEXT,
+    first_path TEXT NOT NULL,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_sampled ON videos(size, sampled_hash);
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    content_key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_lookup ON artifacts(content_key, kind, variant);
+"""
+
+
+def sampled_hash(path: Path, *, sample_size: int = SAMPLE_SIZE) -> str:
+    """Hash the head, middle and tail of ``path``; small files are hashed whole."""
+
+    size = path.stat().st_size
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode())
+    with open(path, "rb") as handle:
+        if size <= sample_size * 3:
+            digest.update(handle.read())
+        else:
+            for offset in (0, size // 2 - sample_size // 2, size - sample_size):
+                handle.seek(offset)
+                digest.update(handle.read(sample_size))
+    return digest.hexdigest()
+
+
+def save_upload(stream: BinaryIO, destination: Path, *, chunk_size: int = COPY_CHUNK_SIZE) -> str:
+    """Copy an upload stream to ``destination`` and return its SHA-256 on the way."""
+
+    digest = hashlib.sha256()
+    with open(destination, "wb") as handle:
+        while True:
+            block = stream.read(chunk_size)
+            if not block:
+                break
+            digest.update(block)
+            handle.write(block)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """Map video content to audio, transcript and summary files.
+
+    Videos are identified by size plus a sampled hash, upgraded with the full
+    SHA-256 when it is known (e.g. computed while an upload streams in).  Each
+    artifact path belongs to exactly one ``(content_key, kind, variant)``, so
+    when a name collision overwrites a file the previous owner's entry is
+    dropped instead of silently returning the wrong content.
+    """
+
+    def __init__(self, db_path: Path | str = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def resolve(self, video_path: Path, *, full_hash: Optional[str] = None) -> str:
+        """Return the content key for ``video_path``, registering it if new."""
+
+        size = video_path.stat().st_size
+        sample = sampled_hash(video_path)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT content_key, full_hash FROM videos WHERE size = ? AND sampled_hash = ? ORDER BY seen_at",
+                (size, sample),
+            ).fetchall()
+            if full_hash is None and rows:
+                return rows[0][0]
+            for content_key, known_hash in rows:
+                if known_hash == full_hash:
+                    return content_key
+                if known_hash is None:
+                    conn.execute("UPDATE videos SET full_hash = ? WHERE content_key = ?", (full_hash, content_key))
+                    conn.commit()
+                    return content_key
+            # Samples agree but the full hashes differ: fall back to the full hash as key.
+            content_key = f"sha256:{full_hash}" if rows else f"{size}:{sample}"
+            conn.execute(
+                "INSERT OR IGNORE INTO videos (content_key, size, sampled_hash, full_hash, first_path, seen_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (content_key, size, sample, full_hash, str(video_path), time.time()),
+            )
+            conn.commit()
+        return content_key
+
+    def lookup(self, content_key: str, kind: str, variant: str = "") -> Optional[Path]:
+        """Return an existing artifact file for the key, pruning entries whose file vanished."""
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT path FROM artifacts WHERE content_key = ? AND kind = ? AND variant = ? "
+                "ORDER BY created_at DESC",
+                (content_key, kind, variant),
+            ).fetchall()
+            missing = [row[0] for row in rows if not Path(row[0]).exists()]
+            if missing:
+                conn.executemany("DELETE FROM artifacts WHERE path = ?", [(path,) for path in missing])
+                conn.commit()
+        for (path,) in rows:
+            if path not in missing:
+                return Path(path)
+        return None
+
+    def owner(self, path: Path) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT content_key FROM artifacts WHERE path = ?", (str(path),)).fetchone()
+        return row[0] if row else None
+
+    def is_reusable(self, path: Path, content_key: Optional[str]) -> bool:
+        """True when ``path`` exists and was not produced for different content."""
+
+        if not path.exists():
+            return False
+        if content_key is None:
+            return True
+        owner = self.owner(path)
+        return owner is None or owner == content_key
+
+    def record(self, content_key: str, kind: str, path: Path, variant: str = "") -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "REPLACE INTO artifacts (path, content_key, kind, variant, created_at) VALUES (?, ?, ?, ?, ?)",
+                (str(path), content_key, kind, variant, time.time()),
+            )
+            conn.commit()
+
+    def materialize(self, content_key: str, kind: str, destination: Path, variant: str = "") -> bool:
+        """Copy a cached artifact for ``content_key`` to ``destination`` if one exists."""
+
+        source = self.lookup(content_key, kind, variant)
+        if source is None:
+            return False
+        if source.resolve() != destination.resolve():
+            shutil.copyfile(source, destination)
+        self.record(content_key, kind, destination, variant)
+        return True
+
+
+GLOBAL_STORE = ArtifactStore(DEFAULT_DB_PATH)
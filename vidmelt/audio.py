@@ -0,0 +1,139 @@
+"""Stream decoded audio from ffmpeg straight into memory."""
+from __future__ import annotations
+
+import io
+import os
+import subprocess
+import threading
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+DEFAULT_CHUNK_SECONDS = 30.0
+KEEP_AUDIO = os.getenv("VIDMELT_KEEP_AUDIO", "0").lower() in {"1", "true", "yes"}
+
+
+@dataclass
+class PcmAudio:
+    samples: np.ndarray
+    log: str = ""
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / SAMPLE_RATE
+
+
+def ffmpeg_command(video_path: Path) -> List[str]:
+    return [
+        "ffmpeg",
+        "-nostdin",
+        "-i", str(video_path),
+        "-vn",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE),
+        "-ac", "1",
+        "-",
+    ]
+
+
+def _open_wav_writer(cache_path: Path) -> wave.Wave_write:
+    writer = wave.open(str(cache_path), "wb")
+    writer.setnchannels(1)
+    writer.setsampwidth(2)
+    writer.setframerate(SAMPLE_RATE)
+    return writer
+
+
+def stream_pcm(
+    video_path: Path,
+    *,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+    cache_path: Optional[Path] = None,
+    stderr_sink: Optional[List[str]] = None,
+) -> Iterator[np.ndarray]:
+    """Yield float32 sample blocks of at most ``chunk_seconds`` from an ffmpeg pipe.
+
+    When ``cache_path`` is given the raw PCM is also written there as a WAV so
+    later runs can skip decoding.  A non-zero ffmpeg exit raises
+    :class:`subprocess.CalledProcessError` with the captured stderr.
+    """
+
+    cmd = ffmpeg_command(video_path)
+    block_bytes = max(2, int(chunk_seconds * SAMPLE_RATE) * 2)
+    stderr_lines: List[str] = stderr_sink if stderr_sink is not None else []
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # Drain stderr on a side thread so a chatty ffmpeg cannot fill the pipe and stall.
+    def _drain() -> None:
+        assert process.stderr is not None
+        for line in iter(process.stderr.readline, b""):
+            stderr_lines.append(line.decode("utf-8", errors="replace"))
+
+    drain_thread = threading.Thread(target=_drain, daemon=True)
+    drain_thread.start()
+
+    writer = _open_wav_writer(cache_path) if cache_path else None
+    leftover = b""
+    try:
+        assert process.stdout is not None
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - len(data) % 2
+            data, leftover = data[:usable], data[usable:]
+            if writer is not None:
+                writer.writeframes(data)
+            yield np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+    finally:
+        if writer is not None:
+            writer.close()
+        if process.poll() is None:
+            process.kill()
+        returncode = process.wait()
+        drain_thread.join()
+        if process.stdout is not None:
+            process.stdout.close()
+        if process.stderr is not None:
+            process.stderr.close()
+
+    if returncode != 0:
+        if cache_path is not None and cache_path.exists():
+            cache_path.unlink()
+        raise subprocess.CalledProcessError(returncode, cmd, output=None, stderr="".join(stderr_lines))
+
+
+def extract_pcm(
+    video_path: Path,
+    *,
+    cache_path: Optional[Path] = None,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+) -> PcmAudio:
+    """Decode ``video_path`` to a 16 kHz mono float32 buffer without touching disk."""
+
+    stderr_lines: List[str] = []
+    blocks = list(
+        stream_pcm(video_path, chunk_seconds=chunk_seconds, cache_path=cache_path, stderr_sink=stderr_lines)
+    )
+    samples = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+    return PcmAudio(samples=samples, log="".join(stderr_lines))
+
+
+def to_wav_bytes(samples: np.ndarray) -> bytes:
+    """Encode float32 samples as an in-memory 16-bit WAV (for upload APIs)."""
+
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(SAMPLE_RATE)
+        writer.writeframes(pcm.tobytes())
+    return buffer.getvalue()
@@ -2,10 +2,11 @@
 from __future__ import annotations
 
 import argparse
+import functools
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Iterable, Iterator, Sequence
 
-from . import pipeline, history, knowledge
+from . import artifacts, embedqueue, pipeline, history, knowledge, openai_client, staging, transcriber
 
 
 def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
@@ -32,6 +33,42 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         action="store_true",
         help="Retry failed or in-progress jobs recorded in the history store",
     )
+    parser.add_argument(
+        "--chunk-workers",
+        type=int,
+        default=transcriber.DEFAULT_CHUNK_WORKERS,
+        help="Transcribe silence-split audio chunks on this many processes (1 = single run)",
+    )
+    parser.add_argument(
+        "--chunk-seconds",
+        type=float,
+        default=transcriber.DEFAULT_CHUNK_SECONDS,
+        help="Target chunk length in seconds for parallel transcription",
+    )
+    parser.add_argument(
+        "--extract-workers",
+        type=int,
+        default=1,
+        help="Concurrent ffmpeg audio extractions",
+    )
+    parser.add_argument(
+        "--transcribe-workers",
+        type=int,
+        default=1,
+        help="Concurrent transcriptions (each loads its own Whisper model replica)",
+    )
+    parser.add_argument(
+        "--summarize-concurrency",
+        type=int,
+        default=1,
+        help="Concurrent summarization requests to the OpenAI API",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=2,
+        help="Videos allowed to wait between two stages",
+    )
     return parser.parse_args(argv)
 
 
@@ -47,7 +84,7 @@ def batch_process(args: argparse.Namespace | None = None) -> int:
         print(f"Input directory {input_dir} does not exist")
         return 2
 
-    kb = knowledge.KnowledgeBase()
+    kb = knowledge.open_knowledge_base()
     kb.sync_from_directories(pipeline.TRANSCRIPT_DIR, pipeline.SUMMARY_DIR)
 
     if ns.resume:
@@ -66,20 +103,77 @@ def batch_process(args: argparse.Namespace | None = None) -> int:
             print(f"[DRY RUN] {label}")
         return 0
 
-    for video, job_id, model in videos:
-        summary_path = pipeline.SUMMARY_DIR / f"{video.stem}.md"
-        if summary_path.exists() and job_id is None:
-            print(f"Skipping {video} (summary already exists)")
-            continue
-
-        selected_model = model if job_id is not None else ns.model
-        print(f"Processing {video} with model {selected_model}")
-        pipeline.process_video(
-            video,
-            selected_model,
-            publish=None,
-            knowledge_base=kb,
-            job_id=job_id,
+    chunk_workers = getattr(ns, "chunk_workers", transcriber.DEFAULT_CHUNK_WORKERS)
+    job_options = {}
+    if chunk_workers > 1:
+        job_options = {
+            "chunk_workers": chunk_workers,
+            "chunk_seconds": getattr(ns, "chunk_seconds", transcriber.DEFAULT_CHUNK_SECONDS),
+        }
+
+    concurrency = {
+        "extract": getattr(ns, "extract_workers", 1),
+        "transcribe": getattr(ns, "transcribe_workers", 1),
+        "summarize": getattr(ns, "summarize_concurrency", 1),
+        "index": 1,  # keep knowledge-base writes serialized
+    }
+    # Embeddings are computed off the stage pipeline, pooling videos from several jobs per batch.
+    embedder = embedqueue.EmbeddingQueue(kb)
+    job_options["embedder"] = embedder
+    transcriber.GLOBAL_POOL.replicas = max(transcriber.GLOBAL_POOL.replicas, concurrency["transcribe"])
+
+    store = artifacts.GLOBAL_STORE
+
+    def prepared_jobs() -> Iterator[pipeline.VideoJob]:
+        # Consumed lazily by the executor, so jobs are only started once the
+        # bounded extract queue has room for them.
+        for video, job_id, model in videos:
+            summary_path = pipeline.SUMMARY_DIR / f"{video.stem}.md"
+            if job_id is None and summary_path.exists():
+                content_key = store.resolve(video) if video.exists() else None
+                if store.is_reusable(summary_path, content_key):
+                    print(f"Skipping {video} (summary already exists)")
+                    continue
+                print(f"{summary_path.name} belongs to different content; reprocessing {video}")
+
+            selected_model = model if job_id is not None else ns.model
+            print(f"Processing {video} with model {selected_model}")
+            job = pipeline.prepare_job(
+                video,
+                selected_model,
+                publish=None,
+                knowledge_base=kb,
+                job_id=job_id,
+                **job_options,
+            )
+            if job is not None:
+                yield job
+
+    executor = staging.StagedExecutor(
+        [
+            staging.Stage(name, functools.partial(pipeline.run_stage, stage=stage), concurrency[name])
+            for name, stage in pipeline.STAGES
+        ],
+        queue_size=getattr(ns, "queue_size", 2),
+    )
+    embedder.start()
+    try:
+        outcomes = executor.run(prepared_jobs())
+    finally:
+        embedder.stop()
+    failed = [outcome for outcome in outcomes if not outcome.ok]
+    if outcomes:
+        print(f"Finished {len(outcomes) - len(failed)} of {len(outcomes)} video(s)")
+    for outcome in failed:
+        print(f"Failed {outcome.item.video_path} during {outcome.failed_stage}")
+    if embedder.batches:
+        print(f"Embedded {embedder.embedded} video(s) in {embedder.batches} batch(es)")
+
+    api_stats = openai_client.shared_client().stats()
+    if api_stats.requests:
+        print(
+            f"OpenAI: {api_stats.requests} request(s), {api_stats.retries} retried, "
+            f"{api_stats.failures} failed, {api_stats.throttled_seconds:.1f}s throttled"
         )
 
     return 0
@@ -8,12 +8,14 @@ from typing import Iterable, List, Optional, Sequence, Tuple
 from . import knowledge
 
 DEFAULT_ANSWER_MODEL = "gpt-4o-mini"
+RETRIEVAL_MODES = ("semantic", "hybrid")
+DEFAULT_RETRIEVAL = "hybrid"
 
 
 def _load_answer_model():
-    from openai import OpenAI  # pragma: no cover
+    from .openai_client import shared_client  # pragma: no cover
 
-    return OpenAI()
+    return shared_client()
 
 
 def generate_answer(
@@ -30,7 +32,7 @@ def generate_answer(
     context_sections: List[str] = []
     for idx, hit in enumerate(hits, 1):
         context_sections.append(
-            f"[{idx}] Video: {hit.video_name}\n"
+            f"[{idx}] Video: {knowledge.format_hit_source(hit)}\n"
             f"Snippet: {hit.snippet}\n"
             f"Transcript: {hit.transcript_path}\n"
         )
@@ -59,6 +61,20 @@ def generate_answer(
     return response.output[0].content[0].text
 
 
+def retrieve(
+    kb: knowledge.KnowledgeBase,
+    question: str,
+    *,
+    top_k: int = 5,
+    mode: str = DEFAULT_RETRIEVAL,
+) -> List[knowledge.SemanticHit]:
+    if mode == "hybrid":
+        return list(kb.hybrid_search(question, limit=top_k))
+    if mode == "semantic":
+        return list(kb.semantic_search(question, limit=top_k))
+    raise ValueError(f"unknown retrieval mode {mode!r}; expected one of {', '.join(RETRIEVAL_MODES)}")
+
+
 def chat(
     question: str,
     kb: knowledge.KnowledgeBase,
@@ -66,8 +82,9 @@ def chat(
     top_k: int = 5,
     history: Optional[List[dict]] = None,
     model: str = DEFAULT_ANSWER_MODEL,
+    mode: str = DEFAULT_RETRIEVAL,
 ) -> Tuple[str, List[dict]]:
-    hits = list(kb.semantic_search(question, limit=top_k))
+    hits = retrieve(kb, question, top_k=top_k, mode=mode)
     if not hits:
         return "I could not find anything relevant.", []
 
@@ -79,6 +96,10 @@ def chat(
             "summary": hit.summary_path,
             "snippet": hit.snippet,
             "score": hit.score,
+            "bm25": hit.bm25,
+            "fused": hit.fused,
+            "start": hit.start,
+            "end": hit.end,
         }
         for hit in hits
     ]
@@ -86,27 +107,35 @@ def chat(
 
 
 def embed_cli(args: argparse.Namespace) -> int:
-    kb = knowledge.KnowledgeBase(db_path=args.db)
-    kb.build_embeddings(model_name=args.model)
-    print(f"Embeddings built using {args.model} -> {args.db}")
+    kb = knowledge.open_knowledge_base(db_path=args.db)
+    report = kb.build_embeddings(
+        model_name=args.model,
+        backend=args.backend,
+        batch_size=args.batch_size,
+        progress=knowledge.print_embed_progress,
+    )
+    print(f"Embeddings built using {kb.embedding_space()} -> {args.db}: {knowledge.format_embed_report(report)}")
     return 0
 
 
 def search_cli(args: argparse.Namespace) -> int:
-    kb = knowledge.KnowledgeBase(db_path=args.db)
-    hits = kb.semantic_search(args.query, limit=args.limit)
+    kb = knowledge.open_knowledge_base(db_path=args.db)
+    hits = retrieve(kb, args.query, top_k=args.limit, mode=args.mode)
     for hit in hits:
-        print(f"[{hit.video_name}] {hit.snippet} (score={hit.score:.3f})")
+        print(f"[{knowledge.format_hit_source(hit)}] {hit.snippet} ({knowledge.format_hit_scores(hit)})")
     return 0
 
 
 def chat_cli(args: argparse.Namespace) -> int:
-    kb = knowledge.KnowledgeBase(db_path=args.db)
-    answer, sources = chat(args.question, kb, top_k=args.limit)
+    kb = knowledge.open_knowledge_base(db_path=args.db)
+    answer, sources = chat(args.question, kb, top_k=args.limit, mode=args.mode)
     print(answer)
     print("\nSources:")
     for source in sources:
-        print(f"- {source['video']}: {source['snippet']}")
+        location = source["video"]
+        if source["start"] is not None:
+            location += f" @ {knowledge.format_timestamp(source['start'])}"
+        print(f"- {location}: {source['snippet']}")
     return 0
 
 
@@ -116,17 +145,21 @@ def main(argv: Sequence[str] | None = None) -> int:
 
     embed_parser = subparsers.add_parser("embed", help="Compute embeddings for indexed documents")
     embed_parser.add_argument("--db", type=Path, default=knowledge.DEFAULT_DB_PATH)
-    embed_parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    embed_parser.add_argument("--backend", choices=sorted(knowledge.embedders.BACKENDS))
+    embed_parser.add_argument("--model")
+    embed_parser.add_argument("--batch-size", type=int, default=knowledge.DEFAULT_EMBED_BATCH, help="Chunks per encode call")
 
     search_parser = subparsers.add_parser("search", help="Search indexed transcripts (vector)")
     search_parser.add_argument("query")
     search_parser.add_argument("--db", type=Path, default=knowledge.DEFAULT_DB_PATH)
     search_parser.add_argument("--limit", type=int, default=5)
+    search_parser.add_argument("--mode", choices=RETRIEVAL_MODES, default="semantic")
 
     chat_parser = subparsers.add_parser("ask", help="Ask a question using RAG")
     chat_parser.add_argument("question")
     chat_parser.add_argument("--db", type=Path, default=knowledge.DEFAULT_DB_PATH)
     chat_parser.add_argument("--limit", type=int, default=5)
+    chat_parser.add_argument("--mode", choices=RETRIEVAL_MODES, default=DEFAULT_RETRIEVAL)
 
     args = parser.parse_args(list(argv) if argv is not None else None)
 
@@ -0,0 +1,207 @@
+"""Embedding backends: SentenceTransformer, ONNX Runtime and a numpy feature-hashing embedder."""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import zlib
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, List, Protocol, Sequence
+
+import numpy as np
+
+SENTENCE_TRANSFORMERS = "sentence-transformers"
+ONNX = "onnx"
+HASHING = "hashing"
+DEFAULT_BACKEND = os.getenv("VIDMELT_EMBED_BACKEND", SENTENCE_TRANSFORMERS)
+DEFAULT_TRANSFORMER_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Quantized export shipped in the model repository; the avx2 build runs on any recent x86 CPU.
+ONNX_FILE = os.getenv("VIDMELT_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+ONNX_MAX_TOKENS = 256
+HASH_DIM = int(os.getenv("VIDMELT_HASH_DIM", "1024"))
+# Distinct tokens whose hash is remembered between calls.
+HASH_MEMO_SIZE = 1 << 20
+
+_TOKEN = re.compile(r"\w+")
+
+
+class Embedder(Protocol):
+    def encode(self, sentences: Sequence[str], **kwargs) -> np.ndarray: ...
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def load_sentence_transformer(model_name: str):  # pragma: no cover - requires torch and model weights
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+class OnnxEmbedder:
+    """Mean-pooled transformer embeddings from an ONNX export, run on the CPU by ONNX Runtime.
+
+    Only ``onnxruntime`` and ``tokenizers`` are imported, never torch.
+    ``model_name`` is a local directory or a Hugging Face repository holding
+    ``tokenizer.json`` and ``file_name`` (by default the int8-quantized
+    export).  Each batch is sorted by length so padding stays short.
+    """
+
+    def __init__(self, model_name: str, *, file_name: str = ONNX_FILE, max_tokens: int = ONNX_MAX_TOKENS):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        root = Path(model_name)
+        if not root.is_dir():  # pragma: no cover - downloads the model
+            from huggingface_hub import snapshot_download
+
+            root = Path(snapshot_download(model_name, allow_patterns=[file_name, "tokenizer.json"]))
+        self.model_name = model_name
+        self.tokenizer = Tokenizer.from_file(str(root / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+        self.tokenizer.enable_padding()
+        self.session = onnxruntime.InferenceSession(str(root / file_name), providers=["CPUExecutionProvider"])
+        self._inputs = {node.name for node in self.session.get_inputs()}
+
+    def encode(
+        self,
+        sentences: Sequence[str],
+        *,
+        batch_size: int = 32,
+        normalize_embeddings: bool = True,
+        **_,
+    ) -> np.ndarray:
+        order = np.argsort([len(text) for text in sentences], kind="stable")
+        pooled: List[np.ndarray] = []
+        for start in range(0, len(order), batch_size):
+            encodings = self.tokenizer.encode_batch([sentences[i] for i in order[start : start + batch_size]])
+            mask = np.array([item.attention_mask for item in encodings], dtype=np.int64)
+            feeds = {"input_ids": np.array([item.ids for item in encodings], dtype=np.int64), "attention_mask": mask}
+            if "token_type_ids" in self._inputs:
+                feeds["token_type_ids"] = np.array([item.type_ids for item in encodings], dtype=np.int64)
+            hidden = self.session.run(None, feeds)[0]
+            weights = mask[:, :, None].astype(np.float32)
+            pooled.append((hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9))
+        if not pooled:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = np.empty((len(sentences), pooled[0].shape[1]), dtype=np.float32)
+        vectors[order] = np.concatenate(pooled)
+        return _normalize(vectors) if normalize_embeddings else vectors
+
+
+class HashingEmbedder:
+    """Signed feature hashing of word unigrams and bigrams, in numpy only.
+
+    ``model_name`` is ``hash-<dim>``.  Words are hashed with CRC-32 (stable
+    across processes, remembered between calls) and bigram hashes are mixed
+    from the two word hashes with array arithmetic, so Python only touches
+    each distinct word once.  Every feature lands in one of ``dim`` buckets
+    with a ±1 sign; counts are damped with ``log1p`` and rows L2-normalized,
+    so cosine similarity approximates overlap of vocabulary.  A batch is
+    accumulated with a single ``np.bincount``.
+    """
+
+    def __init__(self, model_name: str = f"hash-{HASH_DIM}"):
+        match = re.fullmatch(r"hash-(\d+)", model_name)
+        if match is None or int(match.group(1)) <= 0:
+            raise ValueError(f"hashing model names look like 'hash-1024', not {model_name!r}")
+        self.model_name = model_name
+        self.dim = int(match.group(1))
+        self._memo: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _hash(self, words: List[str]) -> np.ndarray:
+        with self._lock:
+            memo = self._memo
+            if len(memo) > HASH_MEMO_SIZE:
+                memo.clear()
+            for word in set(words).difference(memo):
+                memo[word] = zlib.crc32(word.encode("utf-8"))
+            return np.fromiter(map(memo.__getitem__, words), dtype=np.uint64, count=len(words))
+
+    def _encode_batch(self, sentences: Sequence[str]) -> np.ndarray:
+        tokens = [_TOKEN.findall(text.lower()) for text in sentences]
+        lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+        codes = self._hash(list(chain.from_iterable(tokens)))
+        rows = np.repeat(np.arange(len(sentences), dtype=np.int64), lengths)
+        same_row = rows[1:] == rows[:-1]
+        bigrams = _mix32(codes[:-1] * np.uint64(0x01000193) ^ codes[1:])[same_row]
+        codes = np.concatenate([codes, bigrams])
+        rows = np.concatenate([rows, rows[1:][same_row]])
+        signs = np.where(codes & np.uint64(1 << 31), -1.0, 1.0)
+        buckets = (codes % np.uint64(self.dim)).astype(np.int64)
+        cells = np.bincount(rows * self.dim + buckets, weights=signs, minlength=len(sentences) * self.dim)
+        counts = cells.reshape(len(sentences), self.dim).astype(np.float32)
+        return np.sign(counts) * np.log1p(np.abs(counts))
+
+    def encode(
+        self,
+        sentences: Sequence[str],
+        *,
+        batch_size: int = 256,
+        normalize_embeddings: bool = True,
+        **_,
+    ) -> np.ndarray:
+        vectors = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            vectors[start : start + batch_size] = self._encode_batch(sentences[start : start + batch_size])
+        return _normalize(vectors) if normalize_embeddings else vectors
+
+
+def _mix32(values: np.ndarray) -> np.ndarray:
+    """MurmurHash3's 32-bit finalizer, applied elementwise to uint64 values."""
+
+    mask = np.uint64(0xFFFFFFFF)
+    values = values & mask
+    values ^= values >> np.uint64(16)
+    values = (values * np.uint64(0x85EBCA6B)) & mask
+    values ^= values >> np.uint64(13)
+    values = (values * np.uint64(0xC2B2AE35)) & mask
+    values ^= values >> np.uint64(16)
+    return values
+
+
+BACKENDS: Dict[str, Callable[[str], Embedder]] = {
+    SENTENCE_TRANSFORMERS: load_sentence_transformer,
+    ONNX: OnnxEmbedder,
+    HASHING: HashingEmbedder,
+}
+DEFAULT_MODELS: Dict[str, str] = {
+    SENTENCE_TRANSFORMERS: DEFAULT_TRANSFORMER_MODEL,
+    ONNX: DEFAULT_TRANSFORMER_MODEL,
+    HASHING: f"hash-{HASH_DIM}",
+}
+
+_loaded: Dict[tuple[str, str], Embedder] = {}
+_loaded_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: Callable[[str], Embedder], default_model: str) -> None:
+    """Make ``factory(model_name)`` available as backend ``name``."""
+
+    BACKENDS[name] = factory
+    DEFAULT_MODELS[name] = default_model
+
+
+def default_model(backend: str) -> str:
+    _check(backend)
+    return DEFAULT_MODELS[backend]
+
+
+def load(backend: str, model_name: str) -> Embedder:
+    """Return the embedder for ``(backend, model_name)``, loading it once per process."""
+
+    _check(backend)
+    with _loaded_lock:
+        key = (backend, model_name)
+        if key not in _loaded:
+            _loaded[key] = BACKENDS[backend](model_name)
+        return _loaded[key]
+
+
+def _check(backend: str) -> None:
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown embedding backend {backend!r}; expected one of {', '.join(sorted(BACKENDS))}")
@@ -0,0 +1,202 @@
+"""Background embedding of finished documents, batched across pipeline jobs."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from . import knowledge, metrics
+
+DEFAULT_BATCH_DELAY = float(os.getenv("VIDMELT_EMBED_DELAY", "2"))
+DEFAULT_MAX_DOCUMENTS = int(os.getenv("VIDMELT_EMBED_MAX_DOCUMENTS", "32"))
+
+IndexedCallback = Callable[[List[str], knowledge.EmbedReport], None]
+
+
+@dataclass
+class IndexFreshness:
+    documents: int
+    indexed: int
+    pending: int
+    failed: int
+    last_indexed_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+    @property
+    def fresh(self) -> bool:
+        return self.pending == 0 and self.failed == 0
+
+    def as_dict(self) -> dict:
+        return {
+            "documents": self.documents,
+            "indexed": self.indexed,
+            "pending": self.pending,
+            "failed": self.failed,
+            "fresh": self.fresh,
+            "last_indexed_at": self.last_indexed_at,
+            "last_error": self.last_error,
+        }
+
+
+class EmbeddingQueue:
+    """Embed documents on one background thread, several finished jobs per batch.
+
+    :meth:`submit` only records the video name, so a job is complete as soon
+    as its document is in the full-text index.  The worker waits up to
+    ``batch_delay`` seconds after the first submission for more to arrive,
+    then embeds up to ``max_documents`` of them with a single
+    :meth:`KnowledgeBase.embed_documents` call, which encodes their chunks
+    in shared batches.  A name submitted again while still pending is
+    embedded once.  Failures are logged and counted; the documents stay
+    unembedded until they are submitted again.
+    """
+
+    def __init__(
+        self,
+        kb: knowledge.KnowledgeBase,
+        *,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+        batch_delay: float = DEFAULT_BATCH_DELAY,
+        max_documents: int = DEFAULT_MAX_DOCUMENTS,
+        on_indexed: Optional[IndexedCallback] = None,
+    ):
+        self.kb = kb
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_delay = batch_delay
+        self.max_documents = max(1, max_documents)
+        self.on_indexed = on_indexed
+        self.embedded = 0
+        self.batches = 0
+        self.last_indexed_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._pending: Dict[str, None] = {}
+        self._in_flight: List[str] = []
+        self._failed: set[str] = set()
+        self._first_pending_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._cond:
+            if self.running:
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._work, name="vidmelt-embedder", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Embed whatever is still pending, then stop the worker."""
+
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            self._thread = None
+        else:
+            self.drain()
+
+    def submit(self, video_name: str) -> None:
+        self.submit_many([video_name])
+
+    def submit_many(self, video_names: Iterable[str]) -> None:
+        with self._cond:
+            for name in video_names:
+                self._failed.discard(name)
+                self._pending[name] = None
+            if self._pending and self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            self._cond.notify_all()
+
+    def pending(self) -> List[str]:
+        with self._cond:
+            return list(dict.fromkeys(self._in_flight + list(self._pending)))
+
+    def drain(self) -> None:
+        """Embed every pending document in the calling thread."""
+
+        while True:
+            with self._cond:
+                names = self._take_batch()
+            if not names:
+                return
+            self._embed(names)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until nothing is pending or in flight; False on timeout."""
+
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def freshness(self) -> IndexFreshness:
+        documents, indexed = self.kb.embedding_coverage()
+        with self._cond:
+            return IndexFreshness(
+                documents=documents,
+                indexed=indexed,
+                pending=len(set(self._in_flight) | set(self._pending)),
+                failed=len(self._failed),
+                last_indexed_at=self.last_indexed_at,
+                last_error=self.last_error,
+            )
+
+    def _take_batch(self) -> List[str]:
+        names = list(self._pending)[: self.max_documents]
+        for name in names:
+            del self._pending[name]
+        if not self._pending:
+            # Leftovers of a full batch keep the old timestamp and go out at once.
+            self._first_pending_at = None
+        self._in_flight = names
+        return names
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stop)
+                if not self._pending:
+                    return
+                while not self._stop and len(self._pending) < self.max_documents:
+                    remaining = self._first_pending_at + self.batch_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                names = self._take_batch()
+            self._embed(names)
+
+    def _embed(self, names: List[str]) -> None:
+        report = None
+        error = None
+        with metrics.measure("embed", self.model_name or "default") as sample:
+            try:
+                report = self.kb.embed_documents(names, model_name=self.model_name, backend=self.backend)
+                sample.ok = True
+            except Exception as exc:  # keep the worker alive; the documents stay unembedded
+                error = str(exc)
+                print(f"WARN: could not embed {', '.join(names)}: {error}")
+        metrics.GLOBAL_REGISTRY.observe(sample)
+        with self._cond:
+            self._in_flight = []
+            if report is None:
+                self._failed.update(names)
+                self.last_error = error
+            else:
+                self.embedded += report.documents
+                self.batches += 1
+                self.last_indexed_at = time.time()
+            self._cond.notify_all()
+        if report is not None and self.on_indexed is not None:
+            try:
+                self.on_indexed(names, report)
+            except Exception as exc:
+                print(f"WARN: index notification failed: {exc}")
@@ -1,13 +1,14 @@
 """Job history tracking for Vidmelt."""
 from __future__ import annotations
 
+import os
 import sqlite3
 import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable, Iterator, Optional
 
-DEFAULT_DB_PATH = Path("vidmelt_history.sqlite3")
+DEFAULT_DB_PATH = Path(os.getenv("VIDMELT_HISTORY_DB", "vidmelt_history.sqlite3"))
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS jobs (
@@ -19,10 +20,38 @@ CREATE TABLE IF NOT EXISTS jobs (
     error TEXT,
     started_at REAL NOT NULL,
     finished_at REAL,
-    attempt_count INTEGER NOT NULL DEFAULT 0
+    attempt_count INTEGER NOT NULL DEFAULT 0,
+    summary_cached INTEGER NOT NULL DEFAULT 0,
+    saved_tokens INTEGER NOT NULL DEFAULT 0,
+    saved_seconds REAL NOT NULL DEFAULT 0
 );
+CREATE TABLE IF NOT EXISTS stage_metrics (
+    job_id INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    model TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    wall_seconds REAL NOT NULL,
+    cpu_seconds REAL NOT NULL,
+    peak_rss_bytes INTEGER NOT NULL,
+    input_bytes INTEGER NOT NULL,
+    audio_seconds REAL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stage_metrics_job ON stage_metrics (job_id);
 """
 
+MIGRATIONS = (
+    "ALTER TABLE jobs ADD COLUMN attempt_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE jobs ADD COLUMN summary_cached INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE jobs ADD COLUMN saved_tokens INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE jobs ADD COLUMN saved_seconds REAL NOT NULL DEFAULT 0",
+)
+
+JOB_COLUMNS = (
+    "id, video_path, summary_path, model, status, error, started_at, finished_at, attempt_count, "
+    "summary_cached, saved_tokens, saved_seconds"
+)
+
 @dataclass
 class JobRecord:
     id: int
@@ -34,6 +63,52 @@ class JobRecord:
     started_at: float
     finished_at: Optional[float]
     attempt_count: int
+    summary_cached: bool = False
+    saved_tokens: int = 0
+    saved_seconds: float = 0.0
+
+
+@dataclass
+class CacheSavings:
+    hits: int
+    saved_tokens: int
+    saved_seconds: float
+
+
+@dataclass
+class StageMetrics:
+    """Resources used by one pipeline stage of one job."""
+
+    stage: str
+    model: str
+    ok: bool = False
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    input_bytes: int = 0
+    audio_seconds: Optional[float] = None
+
+    @property
+    def real_time_factor(self) -> Optional[float]:
+        """Wall time per second of audio; below 1.0 is faster than real time."""
+
+        if not self.audio_seconds:
+            return None
+        return self.wall_seconds / self.audio_seconds
+
+
+@dataclass
+class StageSummary:
+    stage: str
+    model: str
+    runs: int
+    avg_wall_seconds: float
+    avg_cpu_seconds: float
+    max_peak_rss_bytes: int
+    real_time_factor: Optional[float]
+
+
+STAGE_METRIC_COLUMNS = "stage, model, ok, wall_seconds, cpu_seconds, peak_rss_bytes, input_bytes, audio_seconds"
 
 
 class JobStore:
@@ -41,11 +116,12 @@ class JobStore:
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         with self._connect() as conn:
-            conn.execute(SCHEMA)
-            try:
-                conn.execute("ALTER TABLE jobs ADD COLUMN attempt_count INTEGER NOT NULL DEFAULT 0")
-            except sqlite3.OperationalError:
-                pass
+            conn.executescript(SCHEMA)
+            for migration in MIGRATIONS:
+                try:
+                    conn.execute(migration)
+                except sqlite3.OperationalError:
+                    pass
 
     def _connect(self) -> sqlite3.Connection:
         return sqlite3.connect(self.db_path)
@@ -87,10 +163,65 @@ class JobStore:
             )
             conn.commit()
 
+    def record_summary_cache_hit(self, job_id: int, saved_tokens: int, saved_seconds: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET summary_cached = 1, saved_tokens = ?, saved_seconds = ? WHERE id = ?",
+                (saved_tokens, saved_seconds, job_id),
+            )
+            conn.commit()
+
+    def cache_savings(self) -> CacheSavings:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(saved_tokens), 0), COALESCE(SUM(saved_seconds), 0) "
+                "FROM jobs WHERE summary_cached = 1"
+            ).fetchone()
+        return CacheSavings(int(row[0]), int(row[1]), float(row[2]))
+
+    def record_stage_metrics(self, job_id: int, metrics: StageMetrics) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO stage_metrics (job_id, {STAGE_METRIC_COLUMNS}, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    metrics.stage,
+                    metrics.model,
+                    int(metrics.ok),
+                    metrics.wall_seconds,
+                    metrics.cpu_seconds,
+                    metrics.peak_rss_bytes,
+                    metrics.input_bytes,
+                    metrics.audio_seconds,
+                    time.time(),
+                ),
+            )
+            conn.commit()
+
+    def stage_metrics(self, job_id: int) -> list[StageMetrics]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {STAGE_METRIC_COLUMNS} FROM stage_metrics WHERE job_id = ? ORDER BY rowid",
+                (job_id,),
+            ).fetchall()
+        return [StageMetrics(stage, model, bool(ok), *rest) for stage, model, ok, *rest in rows]
+
+    def stage_summary(self) -> list[StageSummary]:
+        """Per stage and model averages over successful runs, with the real-time factor."""
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT stage, model, COUNT(*), AVG(wall_seconds), AVG(cpu_seconds), MAX(peak_rss_bytes), "
+                "SUM(CASE WHEN audio_seconds > 0 THEN wall_seconds END) / SUM(audio_seconds) "
+                "FROM stage_metrics WHERE ok = 1 GROUP BY stage, model ORDER BY stage, model"
+            ).fetchall()
+        return [StageSummary(*row) for row in rows]
+
     def list_recent(self, limit: int = 20) -> Iterator[JobRecord]:
         with self._connect() as conn:
             cur = conn.execute(
-                "SELECT id, video_path, summary_path, model, status, error, started_at, finished_at, attempt_count "
+                f"SELECT {JOB_COLUMNS} "
                 "FROM jobs ORDER BY started_at DESC LIMIT ?",
                 (limit,),
             )
@@ -101,7 +232,7 @@ class JobStore:
     def pending_jobs(self) -> Iterator[JobRecord]:
         with self._connect() as conn:
             cur = conn.execute(
-                "SELECT id, video_path, summary_path, model, status, error, started_at, finished_at, attempt_count "
+                f"SELECT {JOB_COLUMNS} "
                 "FROM jobs WHERE status = 'processing' ORDER BY started_at"
             )
             rows = cur.fetchall()
@@ -111,7 +242,7 @@ class JobStore:
     def retryable_jobs(self) -> Iterator[JobRecord]:
         with self._connect() as conn:
             cur = conn.execute(
-                "SELECT id, video_path, summary_path, model, status, error, started_at, finished_at, attempt_count "
+                f"SELECT {JOB_COLUMNS} "
                 "FROM jobs WHERE status IN ('failed', 'processing') ORDER BY started_at"
             )
             rows = cur.fetchall()
@@ -126,6 +257,20 @@ def main(argv: Optional[Iterable[str]] = None) -> int:  # pragma: no cover - thi
     print("Recent jobs:")
     for job in GLOBAL_STORE.list_recent():
         print(f"[{job.status}] {job.video_path} -> {job.summary_path or 'pending'}")
+    savings = GLOBAL_STORE.cache_savings()
+    print(
+        f"Summary cache: {savings.hits} hit(s), ~{savings.saved_tokens} tokens "
+        f"and {savings.saved_seconds:.1f}s of model time saved"
+    )
+    summary = GLOBAL_STORE.stage_summary()
+    if summary:
+        print("Stage timings (successful runs):")
+    for row in summary:
+        rtf = f", RTF {row.real_time_factor:.2f}" if row.real_time_factor is not None else ""
+        print(
+            f"  {row.stage:<10} {row.model:<15} {row.runs} run(s), {row.avg_wall_seconds:.1f}s wall, "
+            f"{row.avg_cpu_seconds:.1f}s CPU, peak RSS {row.max_peak_rss_bytes / 2**20:.0f} MiB{rtf}"
+        )
     return 0
 
 
@@ -0,0 +1,312 @@
+"""Durable upload queue and the bounded worker pool that drains it."""
+from __future__ import annotations
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from . import history
+
+DEFAULT_DB_PATH = history.DEFAULT_DB_PATH
+DEFAULT_WORKERS = int(os.getenv("VIDMELT_WORKERS", "1"))
+DEFAULT_MAX_PENDING = int(os.getenv("VIDMELT_QUEUE_MAX", "20"))
+DEFAULT_LEASE_SECONDS = float(os.getenv("VIDMELT_LEASE_SECONDS", "60"))
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_path TEXT NOT NULL,
+    model TEXT NOT NULL,
+    content_digest TEXT,
+    status TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    finished_at REAL,
+    history_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS job_queue_status ON job_queue (status, id);
+"""
+
+MIGRATIONS = ("ALTER TABLE job_queue ADD COLUMN history_id INTEGER",)
+
+QUEUE_COLUMNS = "id, video_path, model, content_digest, status, lease_owner, lease_expires, attempts, error, history_id"
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the queue already holds ``max_pending`` unfinished jobs."""
+
+
+@dataclass
+class QueuedJob:
+    id: int
+    video_path: str
+    model: str
+    content_digest: Optional[str]
+    status: str
+    lease_owner: Optional[str]
+    lease_expires: Optional[float]
+    attempts: int
+    error: Optional[str]
+    # The job's row in the history, once its first attempt recorded one.
+    history_id: Optional[int] = None
+
+
+@dataclass
+class QueueDepth:
+    queued: int
+    running: int
+    capacity: int
+
+    @property
+    def pending(self) -> int:
+        return self.queued + self.running
+
+
+class JobQueue:
+    """Persistent FIFO of uploads, stored next to the job history.
+
+    Workers ``lease`` the oldest queued job for ``lease_seconds`` and must
+    ``renew`` it while they work.  A lease that expires (the worker or the
+    whole process died) makes the job available again, up to
+    ``max_attempts`` times, so a restart never loses accepted uploads.
+    """
+
+    def __init__(
+        self,
+        db_path: Path | str = DEFAULT_DB_PATH,
+        *,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._clock = clock
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            for migration in MIGRATIONS:
+                try:
+                    conn.execute(migration)
+                except sqlite3.OperationalError:
+                    pass
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode so lease() can take the write lock with BEGIN IMMEDIATE.
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _pending_count(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COUNT(*) FROM job_queue WHERE status IN ('queued', 'leased')").fetchone()[0]
+
+    def has_capacity(self) -> bool:
+        with self._connect() as conn:
+            return self._pending_count(conn) < self.max_pending
+
+    def enqueue(self, video_path: Path | str, model: str, content_digest: Optional[str] = None) -> int:
+        """Add a job and return its queue id, or raise :class:`QueueFullError`."""
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if self._pending_count(conn) >= self.max_pending:
+                conn.execute("ROLLBACK")
+                raise QueueFullError(f"job queue is full ({self.max_pending} pending)")
+            cur = conn.execute(
+                "INSERT INTO job_queue (video_path, model, content_digest, status, enqueued_at) "
+                "VALUES (?, ?, ?, 'queued', ?)",
+                (str(video_path), model, content_digest, self._clock()),
+            )
+            conn.execute("COMMIT")
+            return int(cur.lastrowid)
+        finally:
+            conn.close()
+
+    def lease(self, owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[QueuedJob]:
+        """Claim the oldest runnable job for ``owner``; ``None`` when there is none."""
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = self._clock()
+            # Jobs whose worker vanished without finishing have used up their attempts.
+            conn.execute(
+                "UPDATE job_queue SET status = 'failed', finished_at = ?, lease_owner = NULL, "
+                "error = COALESCE(error, 'lease expired too many times') "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT id FROM job_queue WHERE status = 'queued' "
+                "OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE job_queue SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (owner, now + lease_seconds, row[0]),
+            )
+            job = QueuedJob(*conn.execute(f"SELECT {QUEUE_COLUMNS} FROM job_queue WHERE id = ?", row).fetchone())
+            conn.execute("COMMIT")
+            return job
+        finally:
+            conn.close()
+
+    def renew(self, job_id: int, owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend a lease still held by ``owner``; False if it was lost."""
+
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE job_queue SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (self._clock() + lease_seconds, job_id, owner),
+            )
+            return cur.rowcount == 1
+
+    def attach_history(self, job_id: int, history_id: int) -> None:
+        """Remember the history row of ``job_id`` so a retry after a lost lease updates it."""
+
+        with self._connect() as conn:
+            conn.execute("UPDATE job_queue SET history_id = ? WHERE id = ?", (history_id, job_id))
+
+    def complete(self, job_id: int, owner: str, *, ok: bool, error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE job_queue SET status = ?, error = ?, finished_at = ?, lease_owner = NULL, "
+                "lease_expires = NULL WHERE id = ? AND lease_owner = ?",
+                ("done" if ok else "failed", error, self._clock(), job_id, owner),
+            )
+
+    def get(self, job_id: int) -> Optional[QueuedJob]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {QUEUE_COLUMNS} FROM job_queue WHERE id = ?", (job_id,)).fetchone()
+        return QueuedJob(*row) if row else None
+
+    def position(self, job_id: int) -> Optional[int]:
+        """1-based place in line for a queued job, 0 once running, ``None`` when finished."""
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT status FROM job_queue WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row[0] not in ("queued", "leased"):
+                return None
+            if row[0] == "leased":
+                return 0
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM job_queue WHERE status = 'queued' AND id < ?", (job_id,)
+            ).fetchone()[0]
+        return int(ahead) + 1
+
+    def depth(self) -> QueueDepth:
+        with self._connect() as conn:
+            counts: Dict[str, int] = dict(
+                conn.execute(
+                    "SELECT status, COUNT(*) FROM job_queue WHERE status IN ('queued', 'leased') GROUP BY status"
+                ).fetchall()
+            )
+        return QueueDepth(counts.get("queued", 0), counts.get("leased", 0), self.max_pending)
+
+
+class WorkerPool:
+    """Run at most ``workers`` queued jobs at a time with ``handler``.
+
+    ``handler`` receives the leased :class:`QueuedJob` and returns True on
+    success.  A background thread renews the leases of running jobs every
+    third of ``lease_seconds``.
+    """
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        handler: Callable[[QueuedJob], bool],
+        *,
+        workers: int = DEFAULT_WORKERS,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        poll_interval: float = 1.0,
+    ):
+        self.queue = job_queue
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._active: Dict[int, str] = {}
+        self._active_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads) and not self._stop.is_set()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for index in range(self.workers):
+                owner = f"{self.owner_prefix}:{index}"
+                self._threads.append(
+                    threading.Thread(target=self._work, args=(owner,), name=f"vidmelt-worker-{index}", daemon=True)
+                )
+            self._threads.append(threading.Thread(target=self._heartbeat, name="vidmelt-lease-renewal", daemon=True))
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        with self._start_lock:
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def run_once(self, owner: Optional[str] = None) -> bool:
+        """Lease and run a single job; return False when the queue was empty."""
+
+        owner = owner or f"{self.owner_prefix}:0"
+        job = self.queue.lease(owner, self.lease_seconds)
+        if job is None:
+            return False
+        with self._active_lock:
+            self._active[job.id] = owner
+        try:
+            ok = bool(self.handler(job))
+            error = None if ok else "pipeline failed"
+        except Exception as exc:  # keep the worker alive; the failure is recorded on the job
+            ok, error = False, str(exc)
+        finally:
+            with self._active_lock:
+                self._active.pop(job.id, None)
+        self.queue.complete(job.id, owner, ok=ok, error=error)
+        return True
+
+    def _work(self, owner: str) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.run_once(owner):
+                    continue
+            except sqlite3.Error as exc:
+                print(f"WARN: job queue unavailable: {exc}")
+            self._stop.wait(self.poll_interval)
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._active_lock:
+                active = list(self._active.items())
+            for job_id, owner in active:
+                try:
+                    self.queue.renew(job_id, owner, self.lease_seconds)
+                except sqlite3.Error as exc:
+                    print(f"WARN: could not renew lease for queued job {job_id}: {exc}")
@@ -1,18 +1,35 @@
 """Transcript knowledge base indexing, embeddings, and search."""
 from __future__ import annotations
 
+import argparse
+import hashlib
+import heapq
 import json
+import os
 import re
 import sqlite3
-from dataclasses import dataclass
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from functools import lru_cache
+from itertools import chain, groupby
 from pathlib import Path
-from typing import Iterable, Iterator, List, Optional, Sequence
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
 
 import numpy as np
 
-DEFAULT_DB_PATH = Path("vidmelt_kb.sqlite3")
-DEFAULT_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+from . import ann, embedders, query_cache, related, shards, transcriber
+from .query_cache import CacheStats, LRUCache, normalize_query
+from .sqlite_pool import ConnectionPool
+from .vector_store import QUANTIZATIONS, QuantizedVectors, VectorFile
+
+DEFAULT_DB_PATH = Path(os.getenv("VIDMELT_KB_DB", "vidmelt_kb.sqlite3"))
+DEFAULT_EMBED_MODEL = embedders.DEFAULT_TRANSFORMER_MODEL
+# Chunks per ``model.encode`` call when embedding many documents at once.
+DEFAULT_EMBED_BATCH = int(os.getenv("VIDMELT_EMBED_BATCH_SIZE", "256"))
+# Documents whose text is read per query while streaming through the corpus.
+DOCUMENT_PAGE = 200
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS documents (
@@ -37,8 +54,96 @@ CREATE TABLE IF NOT EXISTS embeddings (
     norm REAL NOT NULL,
     PRIMARY KEY(video_name, chunk_index)
 );
+CREATE TABLE IF NOT EXISTS kb_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS file_state (
+    path TEXT PRIMARY KEY,
+    video_name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS embedding_changes (
+    version INTEGER PRIMARY KEY,
+    video_name TEXT
+);
+CREATE TABLE IF NOT EXISTS embedding_space (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    backend TEXT NOT NULL,
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    chunker INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS video_centroids (
+    video_name TEXT PRIMARY KEY,
+    centroid BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS related_videos (
+    video_name TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    neighbour TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY(video_name, rank)
+);
+CREATE INDEX IF NOT EXISTS related_videos_neighbour ON related_videos (neighbour);
+CREATE TABLE IF NOT EXISTS shadow_build (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    backend TEXT NOT NULL,
+    model TEXT NOT NULL,
+    chunker INTEGER NOT NULL,
+    dim INTEGER NOT NULL DEFAULT 0,
+    generation INTEGER NOT NULL,
+    started_at REAL NOT NULL
+);
 """
 
+EMBEDDING_MIGRATIONS = (
+    "ALTER TABLE embeddings ADD COLUMN slot INTEGER",
+    "ALTER TABLE embedding_space ADD COLUMN chunker INTEGER NOT NULL DEFAULT 1",
+    "ALTER TABLE embeddings ADD COLUMN start_seconds REAL",
+    "ALTER TABLE embeddings ADD COLUMN end_seconds REAL",
+    # Whisper segments as JSON ``[{"start", "end", "text"}]``, one per transcript line.
+    "ALTER TABLE documents ADD COLUMN segments TEXT",
+)
+EMBEDDING_INDEXES = "CREATE INDEX IF NOT EXISTS embeddings_slot ON embeddings (slot);"
+
+# A shadow index is built in these tables; embeddings_shadow is swapped in by renaming it.
+SHADOW_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS embeddings_shadow (
+    video_name TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    chunk_text TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    norm REAL NOT NULL,
+    slot INTEGER,
+    start_seconds REAL,
+    end_seconds REAL,
+    PRIMARY KEY(video_name, chunk_index)
+)""",
+    "CREATE TABLE IF NOT EXISTS shadow_documents (video_name TEXT PRIMARY KEY)",
+)
+# Documents embedded per shadow batch, and the pause between batches that
+# leaves CPU and the write lock to the live pipeline.
+REEMBED_DOCUMENTS = int(os.getenv("VIDMELT_REEMBED_DOCUMENTS", "32"))
+REEMBED_PAUSE = float(os.getenv("VIDMELT_REEMBED_PAUSE", "0.5"))
+
+SEARCH_INDEXES = ("exact", "ivf")
+# Embedding changes the in-memory IVF index absorbs before it is written back to
+# disk; a process loading an older file replays the rest from the change log.
+ANN_SAVE_CHANGES = int(os.getenv("VIDMELT_ANN_SAVE_CHANGES", "256"))
+# Reciprocal-rank fusion constant: larger values flatten the advantage of top ranks.
+RRF_K = 60
+# Candidates taken from each ranking, per requested hit, before fusing them.
+HYBRID_CANDIDATES = 4
+SEARCH_WORKERS = int(os.getenv("VIDMELT_SEARCH_WORKERS", "4"))
+# Candidates per requested hit scored on the quantized matrix and rescored in float32.
+RESCORE_FACTOR = int(os.getenv("VIDMELT_RESCORE_FACTOR", "4"))
+# Compact the vector file once dead rows outnumber live ones (and there are enough to matter).
+COMPACT_MIN_ROWS = 1024
+
 TRIGGERS = """
 CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
     INSERT INTO documents_fts(rowid, video_name, transcript, summary)
@@ -54,6 +159,15 @@ CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
     INSERT INTO documents_fts(rowid, video_name, transcript, summary)
     VALUES (new.rowid, new.video_name, new.transcript, new.summary);
 END;
+CREATE TRIGGER IF NOT EXISTS documents_version_ai AFTER INSERT ON documents BEGIN
+    UPDATE kb_meta SET value = value + 1 WHERE key = 'documents_version';
+END;
+CREATE TRIGGER IF NOT EXISTS documents_version_ad AFTER DELETE ON documents BEGIN
+    UPDATE kb_meta SET value = value + 1 WHERE key = 'documents_version';
+END;
+CREATE TRIGGER IF NOT EXISTS documents_version_au AFTER UPDATE ON documents BEGIN
+    UPDATE kb_meta SET value = value + 1 WHERE key = 'documents_version';
+END;
 """
 
 
@@ -72,13 +186,121 @@ class SemanticHit:
     summary_path: Optional[str]
     snippet: str
     score: float
+    bm25: Optional[float] = None
+    fused: Optional[float] = None
+    # Offset of the chunk in the video, in seconds, when its transcript was timed.
+    start: Optional[float] = None
+    end: Optional[float] = None
+
+
+@dataclass
+class SyncReport:
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+
+@dataclass
+class QuantizeReport:
+    quantization: str
+    rows: int = 0
+    float32_bytes: int = 0
+    quantized_bytes: int = 0
+
+    @property
+    def ratio(self) -> float:
+        return self.quantized_bytes / self.float32_bytes if self.float32_bytes else 0.0
+
+
+@dataclass(frozen=True)
+class EmbeddingSpace:
+    """The backend and model every stored vector was computed with."""
+
+    backend: str
+    model: str
+    dim: int = 0
+    chunker: int = 1
+
+    @property
+    def version(self) -> tuple[str, str, int]:
+        """What makes two sets of vectors comparable: backend, model and chunker."""
+
+        return self.backend, self.model, self.chunker
+
+    def __str__(self) -> str:
+        details = [self.backend, f"chunker v{self.chunker}"] + ([f"{self.dim} dims"] if self.dim else [])
+        return f"{self.model} ({', '.join(details)})"
+
+
+@dataclass
+class ShadowStatus:
+    """Progress of a re-embedding into a shadow index."""
+
+    space: EmbeddingSpace
+    documents: int = 0
+    embedded: int = 0
+    started_at: float = 0.0
+    swapped: bool = False
+
+    @property
+    def pending(self) -> int:
+        return self.documents - self.embedded
+
+    def as_dict(self) -> dict:
+        return {
+            "backend": self.space.backend,
+            "model": self.space.model,
+            "chunker": self.space.chunker,
+            "documents": self.documents,
+            "embedded": self.embedded,
+            "pending": self.pending,
+            "started_at": self.started_at,
+            "swapped": self.swapped,
+        }
+
+
+@dataclass
+class RelatedVideo:
+    video_name: str
+    score: float
+    transcript_path: str
+    summary_path: Optional[str]
+
+
+@dataclass
+class RelatedReport:
+    videos: int = 0
+    edges: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class EmbedReport:
+    documents: int = 0
+    total_documents: int = 0
+    chunks: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds > 0 else 0.0
 
 
 @lru_cache(maxsize=2)
 def _load_embeddings_model(model_name: str = DEFAULT_EMBED_MODEL):  # pragma: no cover
-    from sentence_transformers import SentenceTransformer
+    return embedders.load_sentence_transformer(model_name)
+
 
-    return SentenceTransformer(model_name)
+def _load_embedder(space: EmbeddingSpace):
+    if space.backend == embedders.SENTENCE_TRANSFORMERS:
+        return _load_embeddings_model(space.model)
+    return embedders.load(space.backend, space.model)
 
 
 def _chunk_text(text: str, max_chars: int = 400) -> List[str]:
@@ -101,6 +323,172 @@ def _chunk_text(text: str, max_chars: int = 400) -> List[str]:
     return chunks
 
 
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    start: Optional[float] = None
+    end: Optional[float] = None
+
+
+# Token budget of a chunk and how much of its tail is repeated at the head of
+# the next one.  Tokens are counted the way BERT-style tokenizers pre-split
+# (words and punctuation); subword pieces add ~30%, which keeps a chunk within
+# the 256-token window of MiniLM-sized models.  Part of chunker version 2:
+# changing them means a new chunker version.
+CHUNK_TOKENS = 160
+CHUNK_OVERLAP = 32
+
+_PRE_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _count_tokens(text: str) -> int:
+    return len(_PRE_TOKEN.findall(text))
+
+
+def _split_segment(text: str, max_tokens: int) -> List[tuple[str, int]]:
+    """Cut one segment into ``(piece, tokens)`` of at most ``max_tokens``, at sentence ends where possible."""
+
+    tokens = _count_tokens(text)
+    if tokens <= max_tokens:
+        return [(text, tokens)]
+    pieces: List[tuple[str, int]] = []
+    for sentence in _SENTENCE_END.split(text):
+        tokens = _count_tokens(sentence)
+        if tokens <= max_tokens:
+            pieces.append((sentence, tokens))
+            continue
+        words: List[str] = []
+        tokens = 0
+        for word in sentence.split():
+            word_tokens = _count_tokens(word)
+            if words and tokens + word_tokens > max_tokens:
+                pieces.append((" ".join(words), tokens))
+                words, tokens = [], 0
+            words.append(word)
+            tokens += word_tokens
+        if words:
+            pieces.append((" ".join(words), tokens))
+    return pieces
+
+
+def _timed_pieces(
+    segments: Iterable[tuple[str, Optional[float], Optional[float]]],
+    max_tokens: int,
+) -> Iterator[tuple[str, int, Optional[float], Optional[float]]]:
+    """Split ``(text, start, end)`` segments into pieces, interpolating times by token position."""
+
+    for text, start, end in segments:
+        pieces = _split_segment(text.strip(), max_tokens)
+        total = sum(tokens for _piece, tokens in pieces) or 1
+        offset = 0
+        for piece, tokens in pieces:
+            if not tokens:
+                continue
+            if start is None or end is None:
+                yield piece, tokens, start, end
+            else:
+                span = end - start
+                yield piece, tokens, start + span * offset / total, start + span * (offset + tokens) / total
+            offset += tokens
+
+
+def _chunk_segments(
+    segments: Iterable[tuple[str, Optional[float], Optional[float]]],
+    *,
+    max_tokens: int = CHUNK_TOKENS,
+    overlap: int = CHUNK_OVERLAP,
+) -> Iterator[Chunk]:
+    """Pack consecutive segments into chunks of at most ``max_tokens``, lazily.
+
+    Chunks break between segments (a segment too long on its own is cut at
+    sentence ends, then between words), and each chunk starts with the last
+    whole segments of the previous one, up to ``overlap`` tokens, so a
+    passage that straddles a boundary is still found.  A chunk spans from its
+    first segment's start to its last segment's end.
+    """
+
+    window: List[tuple[str, int, Optional[float], Optional[float]]] = []
+    total = 0
+    for piece in _timed_pieces(segments, max_tokens):
+        tokens = piece[1]
+        if window and total + tokens > max_tokens:
+            yield Chunk(" ".join(item[0] for item in window), window[0][2], window[-1][3])
+            kept = 0
+            keep = len(window)
+            while keep > 0 and kept + window[keep - 1][1] <= overlap:
+                keep -= 1
+                kept += window[keep][1]
+            window = window[keep:]
+            total = kept
+            while window and total + tokens > max_tokens:
+                total -= window.pop(0)[1]
+        window.append(piece)
+        total += tokens
+    if window:
+        yield Chunk(" ".join(item[0] for item in window), window[0][2], window[-1][3])
+
+
+def _text_segments(text: Optional[str]) -> Iterator[tuple[str, None, None]]:
+    for line in (text or "").splitlines():
+        if line.strip():
+            yield line, None, None
+
+
+def _transcript_segments(document: sqlite3.Row) -> Iterator[tuple[str, Optional[float], Optional[float]]]:
+    """Whisper's timed segments of a document, or its untimed transcript lines."""
+
+    if document["segments"]:
+        for segment in json.loads(document["segments"]):
+            yield segment["text"], segment["start"], segment["end"]
+    else:
+        yield from _text_segments(document["transcript"])
+
+
+def _chunk_summary_or_transcript(document: sqlite3.Row) -> Iterator[Chunk]:
+    """Version 1: the summary if there is one, else the transcript, split on full stops."""
+
+    for text in _chunk_text(document["summary"] or document["transcript"]):
+        yield Chunk(text)
+
+
+def _chunk_summary_and_transcript(document: sqlite3.Row) -> Iterator[Chunk]:
+    """Version 2: the summary, then the whole transcript in overlapping token-bounded chunks with timestamps."""
+
+    yield from _chunk_segments(_text_segments(document["summary"]))
+    yield from _chunk_segments(_transcript_segments(document))
+
+
+# Chunking strategies by version.  Vectors are only comparable when they were
+# cut by the same chunker, so a new strategy gets a new version (and the
+# library is re-embedded into a shadow index) instead of replacing one.
+CHUNKERS: dict[int, Callable[[sqlite3.Row], Iterator[Chunk]]] = {
+    1: _chunk_summary_or_transcript,
+    2: _chunk_summary_and_transcript,
+}
+CHUNKER_VERSION = max(CHUNKERS)
+
+
+def _read_segments(transcript_path: Path, transcript_text: str) -> Optional[str]:
+    """The timed segments stored beside a transcript, if they still match its text."""
+
+    timed = transcriber.segments_path(transcript_path)
+    if not timed.exists():
+        return None
+    try:
+        segments = [
+            {"start": float(segment["start"]), "end": float(segment["end"]), "text": str(segment["text"]).strip()}
+            for segment in json.loads(timed.read_text(encoding="utf-8"))
+        ]
+    except (OSError, ValueError, KeyError, TypeError):
+        print(f"WARN: Ignoring unreadable segment timestamps in {timed}")
+        return None
+    if "\n".join(segment["text"] for segment in segments).strip() != transcript_text.strip():
+        # The transcript was rewritten (e.g. by the Whisper API) after the segments were saved.
+        return None
+    return json.dumps(segments, ensure_ascii=False)
+
+
 _NON_WORD = re.compile(r"[^\w\s]")
 
 
@@ -118,26 +506,576 @@ def _from_blob(blob: bytes) -> np.ndarray:
     return np.frombuffer(blob, dtype=np.float32)
 
 
-class KnowledgeBase:
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _record_file_state(conn: sqlite3.Connection, video_name: str, kind: str, path: Path, digest: str) -> None:
+    stat = path.stat()
+    conn.execute(
+        "REPLACE INTO file_state (path, video_name, kind, mtime, size, sha256) VALUES (?, ?, ?, ?, ?, ?)",
+        (str(path.resolve()), video_name, kind, stat.st_mtime, stat.st_size, digest),
+    )
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+EMBEDDINGS_VERSION_KEY = "embeddings_version"
+# Bumped by the documents triggers on every insert, update and delete.
+DOCUMENTS_VERSION_KEY = "documents_version"
+VECTOR_GENERATION_KEY = "vector_generation"
+# Highest generation number handed out, live or shadow.
+LAST_GENERATION_KEY = "last_vector_generation"
+VECTOR_DIM_KEY = "vector_dim"
+# Neighbours kept per video in the related-videos graph; 0 until the graph is first built.
+RELATED_NEIGHBOURS_KEY = "related_neighbours"
+# Index into QUANTIZATIONS; 0 (float32) means no quantized copy.
+VECTOR_QUANTIZATION_KEY = "vector_quantization"
+
+
+def _meta(conn: sqlite3.Connection, key: str) -> int:
+    row = conn.execute("SELECT value FROM kb_meta WHERE key = ?", (key,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: int) -> None:
+    conn.execute(
+        "INSERT INTO kb_meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
+
+
+def _allocate_generation(conn: sqlite3.Connection) -> int:
+    """Reserve a vector-file generation no live, shadow or retired file uses."""
+
+    generation = max(_meta(conn, LAST_GENERATION_KEY), _meta(conn, VECTOR_GENERATION_KEY)) + 1
+    _set_meta(conn, LAST_GENERATION_KEY, generation)
+    return generation
+
+
+def _embeddings_version(conn: sqlite3.Connection) -> int:
+    return _meta(conn, EMBEDDINGS_VERSION_KEY)
+
+
+def _bump_embeddings_version(
+    conn: sqlite3.Connection,
+    video_name: Optional[str] = None,
+    *,
+    log_change: bool = True,
+) -> int:
+    """Increment the embeddings version inside the caller's write transaction.
+
+    The change is logged with the affected video so derived indexes can catch
+    up incrementally; ``None`` means any row may have changed.  Storage-only
+    rewrites that keep every vector pass ``log_change=False``.
+    """
+
+    previous = _embeddings_version(conn)
+    _set_meta(conn, EMBEDDINGS_VERSION_KEY, previous + 1)
+    if log_change:
+        conn.execute("REPLACE INTO embedding_changes (version, video_name) VALUES (?, ?)", (previous + 1, video_name))
+    return previous
+
+
+def _read_space(conn: sqlite3.Connection, table: str = "embedding_space") -> Optional[EmbeddingSpace]:
+    row = conn.execute(f"SELECT backend, model, dim, chunker FROM {table}").fetchone()
+    return EmbeddingSpace(row["backend"], row["model"], row["dim"], row["chunker"]) if row else None
+
+
+def _resolve_space(
+    recorded: Optional[EmbeddingSpace],
+    backend: Optional[str],
+    model_name: Optional[str],
+) -> EmbeddingSpace:
+    backend = backend or (recorded.backend if recorded else embedders.DEFAULT_BACKEND)
+    if model_name is None:
+        model_name = recorded.model if recorded and recorded.backend == backend else embedders.default_model(backend)
+    else:
+        embedders.default_model(backend)  # reject unknown backends early
+    if recorded is not None and (recorded.backend, recorded.model) != (backend, model_name):
+        raise ValueError(
+            f"the knowledge base holds vectors from {recorded}, not {model_name} ({backend}); "
+            "switch with `reembed` (or `embed --rebuild`, which empties the index first)"
+        )
+    return recorded if recorded is not None else EmbeddingSpace(backend, model_name, 0, CHUNKER_VERSION)
+
+
+def _shadow_status(conn: sqlite3.Connection) -> Optional[ShadowStatus]:
+    row = conn.execute("SELECT started_at FROM shadow_build").fetchone()
+    if row is None:
+        return None
+    documents = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    embedded = conn.execute(
+        "SELECT COUNT(*) FROM shadow_documents s JOIN documents d ON d.video_name = s.video_name"
+    ).fetchone()[0]
+    return ShadowStatus(_read_space(conn, "shadow_build"), int(documents), int(embedded), row["started_at"])
+
+
+def _load_centroids(conn: sqlite3.Connection) -> tuple[List[str], np.ndarray]:
+    rows = conn.execute("SELECT video_name, centroid FROM video_centroids ORDER BY video_name").fetchall()
+    if not rows:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    centroids = np.frombuffer(b"".join(row["centroid"] for row in rows), dtype=np.float32)
+    return [row["video_name"] for row in rows], centroids.reshape(len(rows), -1)
+
+
+def _store_neighbours(
+    conn: sqlite3.Connection,
+    names: Sequence[str],
+    centroids: np.ndarray,
+    rows: Sequence[int],
+    neighbours: int,
+) -> int:
+    """Replace the neighbour lists of ``rows``; return how many edges were written."""
+
+    conn.executemany("DELETE FROM related_videos WHERE video_name = ?", [(names[row],) for row in rows])
+    edges = [
+        (names[row], rank, names[neighbour], score)
+        for row, found, scores in related.top_neighbours(centroids, neighbours, rows)
+        for rank, (neighbour, score) in enumerate(zip(found.tolist(), scores.tolist()))
+    ]
+    conn.executemany("INSERT INTO related_videos (video_name, rank, neighbour, score) VALUES (?, ?, ?, ?)", edges)
+    return len(edges)
+
+
+class _StaleIndex(Exception):
+    """The vectors moved to a new generation while a query was being answered."""
+
+
+def _invalidate_shadow(conn: sqlite3.Connection, video_name: str) -> None:
+    """Make a running shadow build (re-)embed ``video_name`` before it can be swapped in."""
+
+    if conn.execute("SELECT 1 FROM shadow_build").fetchone() is None:
+        return
+    conn.execute("DELETE FROM shadow_documents WHERE video_name = ?", (video_name,))
+    conn.execute("DELETE FROM embeddings_shadow WHERE video_name = ?", (video_name,))
+
+
+class _EmbeddingMatrix:
+    """Live slots of the memory-mapped vector file, scored in one product.
+
+    ``vectors`` is the shared ``np.memmap`` of unit-normalized embeddings;
+    only the ``alive`` mask and the slots of each video live in this process.
+    A re-embedded video's old slots are masked out and its new slots, already
+    appended to the file, are mapped in.
+
+    With a ``quantized`` copy the scan runs over the compressed rows and only
+    the best ``RESCORE_FACTOR * k`` candidates are read back from ``vectors``
+    and rescored in full precision, so the float32 pages stay cold.
+    """
+
+    def __init__(self, store: Optional[VectorFile], generation: int, quantized: Optional[QuantizedVectors] = None):
+        self.store = store
+        self.generation = generation
+        self.quantized = quantized
+        self.vectors = store.view() if store is not None else np.zeros((0, 0), dtype=np.float32)
+        self.alive = np.zeros(len(self.vectors), dtype=bool)
+        self.rows_by_video: dict[str, np.ndarray] = {}
+        self.count = 0
+
+    def assign(self, video_name: str, slots: Sequence[int], *, append: bool = False) -> None:
+        slots = np.asarray(slots, dtype=np.int64)
+        if append:
+            if not len(slots):
+                return
+            kept = self.rows_by_video.get(video_name)
+            if kept is not None:
+                self.remove(video_name)
+                slots = np.concatenate([kept, slots])
+        else:
+            self.remove(video_name)
+        if not len(slots):
+            return
+        if slots.max() >= len(self.vectors):
+            self.vectors = self.store.view()
+            alive = np.zeros(len(self.vectors), dtype=bool)
+            alive[: len(self.alive)] = self.alive
+            self.alive = alive
+        self.alive[slots] = True
+        self.rows_by_video[video_name] = slots
+        self.count += len(slots)
+
+    def remove(self, video_name: str) -> None:
+        slots = self.rows_by_video.pop(video_name, None)
+        if slots is not None:
+            self.alive[slots] = False
+            self.count -= len(slots)
+
+    def _best(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the ``k`` highest live ``scores``, best first."""
+
+        if self.count < len(scores):
+            scores[~self.alive] = -np.inf
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        scores = self.quantized.scores(query, len(self.vectors))
+        if len(scores) < len(self.vectors):
+            # Rows appended since the quantized copy last caught up are scored exactly.
+            scores = np.concatenate([scores, self.vectors[len(scores) :] @ query])
+        return scores
+
+    def top_k(self, query: np.ndarray, k: int) -> List[tuple[int, float]]:
+        """Return ``(slot, cosine similarity)`` pairs, best first."""
+
+        if self.count == 0 or k <= 0:
+            return []
+        query = _normalize_rows(query)[0]
+        k = min(k, self.count)
+        if self.quantized is None:
+            scores = self.vectors @ query
+            best = self._best(scores, k)
+            return [(int(row), float(scores[row])) for row in best]
+        candidates = np.sort(self._best(self._approximate_scores(query), min(self.count, k * RESCORE_FACTOR)))
+        exact = np.asarray(self.vectors[candidates]) @ query
+        order = np.argsort(-exact, kind="stable")[:k]
+        return [(int(candidates[i]), float(exact[i])) for i in order]
+
+
+class _SearchFrontend:
+    """Full-text, semantic and hybrid search over ``_fts_matches`` and ``_vector_hits``.
+
+    Shared by :class:`KnowledgeBase` and :class:`ShardedKnowledgeBase`,
+    which supply those candidate sources, ``_index_version`` and
+    ``resolve_embedding_space``; ranking, fusion and result caching live
+    here once.
+    """
+
+    def __init__(self):
+        self.query_embeddings = LRUCache(query_cache.EMBEDDING_CACHE_SIZE, query_cache.EMBEDDING_CACHE_TTL)
+        self.search_results = LRUCache(query_cache.RESULT_CACHE_SIZE, query_cache.RESULT_CACHE_TTL)
+        self._search_pool: Optional[ThreadPoolExecutor] = None
+        self._search_lock = threading.Lock()
+
+    def search(self, query: str, *, limit: int = 5) -> Iterator[SearchHit]:
+        for hit, _bm25 in self._fts_matches(query, limit):
+            yield hit
+
+    def semantic_search(
+        self,
+        query: str,
+        *,
+        limit: int = 5,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+        index: str = "exact",
+        nprobe: int = ann.DEFAULT_NPROBE,
+    ) -> Iterator[SemanticHit]:
+        """Rank embedded chunks by cosine distance to ``query`` (lower score is closer).
+
+        With ``index="exact"`` scoring is one matrix-vector product over the
+        resident embedding matrix followed by ``np.argpartition`` for the top
+        ``limit`` rows.  ``index="ivf"`` scans only the ``nprobe`` closest
+        inverted lists of the index built by :meth:`build_ann_index`, falling
+        back to exact search when no index has been built.  The query is
+        encoded with the backend and model of the stored vectors.
+        """
+
+        space = self.resolve_embedding_space(backend, model_name)
+        key = ("semantic", normalize_query(query), limit, space.backend, space.model, index, nprobe)
+        hits = self._cached_results(key)
+        if hits is None:
+            hits = self._vector_hits(query, limit, backend=backend, model_name=model_name, index=index, nprobe=nprobe)
+            if hits is None:
+                hits = [
+                    SemanticHit(
+                        video_name=hit.video_name,
+                        transcript_path=hit.transcript_path,
+                        summary_path=hit.summary_path,
+                        snippet=hit.snippet,
+                        score=1.0,
+                    )
+                    for hit in self.search(query, limit=limit)
+                ]
+            self.search_results.put(key, hits)
+        for hit in hits:
+            yield replace(hit)
+
+    def _cached_results(self, key: tuple) -> Optional[List[SemanticHit]]:
+        """Hits cached under ``key`` for the current index version, or None."""
+
+        self.search_results.validate(self._index_version())
+        return self.search_results.get(key)
+
+    def cache_stats(self) -> dict[str, CacheStats]:
+        """Hit, miss and eviction counters of the query-embedding and result caches."""
+
+        return {"embedding": self.query_embeddings.stats(), "result": self.search_results.stats()}
+
+    def _search_executor(self) -> ThreadPoolExecutor:
+        with self._search_lock:
+            if self._search_pool is None:
+                self._search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="vidmelt-search")
+            return self._search_pool
+
+    def hybrid_search(
+        self,
+        query: str,
+        *,
+        limit: int = 5,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+        index: str = "exact",
+        nprobe: int = ann.DEFAULT_NPROBE,
+        rrf_k: int = RRF_K,
+    ) -> List[SemanticHit]:
+        """Fuse the bm25 full-text ranking and the vector ranking with reciprocal-rank fusion.
+
+        The FTS5 query and the vector top-k (query encoding included) run
+        concurrently, each fetching ``HYBRID_CANDIDATES * limit`` candidates.
+        Vector candidates are chunks and full-text candidates are documents,
+        so a chunk scores ``1 / (rrf_k + its rank)`` plus ``1 / (rrf_k + rank)``
+        of its video in the full-text ranking; a document found only by the
+        full-text query becomes a hit with its FTS snippet.  Hits keep the
+        cosine distance in ``score`` (1.0 without a vector match), the raw
+        ``bm25`` value (None without a text match) and are ordered by ``fused``.
+        """
+
+        if limit <= 0:
+            return []
+        space = self.resolve_embedding_space(backend, model_name)
+        key = ("hybrid", normalize_query(query), limit, space.backend, space.model, index, nprobe, rrf_k)
+        cached = self._cached_results(key)
+        if cached is not None:
+            return [replace(hit) for hit in cached]
+        depth = limit * HYBRID_CANDIDATES
+        pool = self._search_executor()
+        lexical = pool.submit(self._fts_matches, query, depth)
+
+        def vector_hits() -> List[SemanticHit]:
+            hits = self._vector_hits(query, depth, backend=backend, model_name=model_name, index=index, nprobe=nprobe)
+            return hits or []
+
+        vector = pool.submit(vector_hits)
+        chunks = vector.result()
+        text_ranks = {hit.video_name: (rank, hit, bm25) for rank, (hit, bm25) in enumerate(lexical.result(), 1)}
+
+        fused: List[SemanticHit] = []
+        for rank, hit in enumerate(chunks, 1):
+            hit.fused = 1.0 / (rrf_k + rank)
+            if hit.video_name in text_ranks:
+                text_rank, _text_hit, hit.bm25 = text_ranks[hit.video_name]
+                hit.fused += 1.0 / (rrf_k + text_rank)
+            fused.append(hit)
+        matched = {hit.video_name for hit in chunks}
+        for video_name, (text_rank, text_hit, bm25) in text_ranks.items():
+            if video_name in matched:
+                continue
+            fused.append(
+                SemanticHit(
+                    video_name=video_name,
+                    transcript_path=text_hit.transcript_path,
+                    summary_path=text_hit.summary_path,
+                    snippet=text_hit.snippet,
+                    score=1.0,
+                    bm25=bm25,
+                    fused=1.0 / (rrf_k + text_rank),
+                )
+            )
+        fused.sort(key=lambda hit: -hit.fused)
+        self.search_results.put(key, fused[:limit])
+        return [replace(hit) for hit in fused[:limit]]
+
+
+class KnowledgeBase(_SearchFrontend):
+    """Documents, full-text index and embeddings in one SQLite database.
+
+    Each thread reuses its own connection from :attr:`pool`; every write runs
+    through :meth:`_write`, one transaction at a time per process, while
+    reads proceed concurrently against the WAL.
+
+    Query embeddings are cached in :attr:`query_embeddings` by normalized
+    text and model, and finished rankings in :attr:`search_results` by query,
+    limit, search options and the (embeddings, documents) version pair, so a
+    change made by any process invalidates them on the next lookup.
+    """
+
     def __init__(self, db_path: Path | str = DEFAULT_DB_PATH):
+        super().__init__()
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.pool = ConnectionPool(self.db_path)
         with self._connect() as conn:
             conn.executescript(SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO kb_meta (key, value) VALUES (?, 0)", (DOCUMENTS_VERSION_KEY,))
             conn.executescript(TRIGGERS)
+            for migration in EMBEDDING_MIGRATIONS:
+                try:
+                    conn.execute(migration)
+                except sqlite3.OperationalError:
+                    pass
+            conn.executescript(EMBEDDING_INDEXES)
+        self._matrix: Optional[_EmbeddingMatrix] = None
+        self._matrix_version = -1
+        self._matrix_lock = threading.RLock()
+        self._ann: Optional[ann.IVFIndex] = None
+        self._ann_saved_version = -1
+        self._ann_lock = threading.RLock()
+        self._vector_files: dict[tuple[int, int], VectorFile] = {}
+        self._quantized_files: dict[tuple[int, int, str], QuantizedVectors] = {}
+        self._migrate_blob_embeddings()
+        self._record_legacy_space()
+
+    @property
+    def ann_path(self) -> Path:
+        """Where the IVF index lives: next to the database, e.g. ``vidmelt_kb.ivf.npz``."""
+
+        return self.db_path.with_suffix(".ivf.npz")
+
+    def vector_path(self, generation: int) -> Path:
+        """Raw float32 embedding file, e.g. ``vidmelt_kb.vectors-0.f32``."""
+
+        return self.db_path.with_name(f"{self.db_path.stem}.vectors-{generation}.f32")
+
+    def _vector_file(self, conn: sqlite3.Connection, dim: Optional[int] = None) -> Optional[VectorFile]:
+        """The current vector file; ``dim`` fixes the dimension on first write."""
+
+        stored_dim = _meta(conn, VECTOR_DIM_KEY)
+        if not stored_dim:
+            if dim is None:
+                return None
+            _set_meta(conn, VECTOR_DIM_KEY, dim)
+            stored_dim = dim
+        elif dim is not None and dim != stored_dim:
+            raise ValueError(
+                f"embedding dimension {dim} does not match the stored dimension {stored_dim}; "
+                "re-embed the library with a single model"
+            )
+        key = (_meta(conn, VECTOR_GENERATION_KEY), stored_dim)
+        if key not in self._vector_files:
+            self._vector_files = {key: VectorFile(self.vector_path(key[0]), stored_dim)}
+        return self._vector_files[key]
+
+    def quantized_path(self, generation: int, quantization: str) -> Path:
+        """Compressed copy of a vector file, e.g. ``vidmelt_kb.vectors-0.int8``."""
+
+        return self.db_path.with_name(f"{self.db_path.stem}.vectors-{generation}.{quantization}")
+
+    def quantization(self) -> str:
+        with self._connect() as conn:
+            return QUANTIZATIONS[_meta(conn, VECTOR_QUANTIZATION_KEY)]
+
+    def _quantized_file(self, conn: sqlite3.Connection, generation: Optional[int] = None) -> Optional[QuantizedVectors]:
+        """The quantized copy of the current (or given) generation, None when storing float32 only."""
+
+        kind = QUANTIZATIONS[_meta(conn, VECTOR_QUANTIZATION_KEY)]
+        dim = _meta(conn, VECTOR_DIM_KEY)
+        if kind == "float32" or not dim:
+            return None
+        if generation is None:
+            generation = _meta(conn, VECTOR_GENERATION_KEY)
+        key = (generation, dim, kind)
+        if key not in self._quantized_files:
+            self._quantized_files = {key: QuantizedVectors(self.quantized_path(generation, kind), dim, kind)}
+        return self._quantized_files[key]
+
+    def quantize_vectors(self, quantization: str) -> QuantizeReport:
+        """Switch candidate scoring to a ``float16`` or ``int8`` copy of the vectors (``float32`` to stop).
+
+        The float32 file is kept for rescoring.  Existing rows are quantized
+        in blocks; later writes keep the copy in step.
+        """
+
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"unknown quantization {quantization!r}; expected one of {', '.join(QUANTIZATIONS)}")
+        with self._write() as conn:
+            previous = self._quantized_file(conn)
+            _set_meta(conn, VECTOR_QUANTIZATION_KEY, QUANTIZATIONS.index(quantization))
+            store = self._vector_file(conn)
+            quantized = self._quantized_file(conn)
+            report = QuantizeReport(quantization)
+            if quantized is not None:
+                quantized.catch_up(store)
+                report.rows = quantized.rows
+                report.quantized_bytes = quantized.nbytes
+            if store is not None:
+                report.float32_bytes = store.rows * store.row_bytes
+            # Readers reload their matrix with the new scoring path; the vectors themselves are unchanged.
+            _bump_embeddings_version(conn, log_change=False)
+        if previous is not None and previous.kind != quantization:
+            previous.unlink()
+        return report
+
+    def _migrate_blob_embeddings(self) -> int:
+        """Move embeddings still stored as per-row BLOBs into the vector file."""
+
+        with self._connect() as conn:
+            if not conn.execute("SELECT EXISTS(SELECT 1 FROM embeddings WHERE slot IS NULL)").fetchone()[0]:
+                return 0
+        with self._write() as conn:
+            rows = conn.execute("SELECT rowid, embedding FROM embeddings WHERE slot IS NULL ORDER BY rowid").fetchall()
+            vectors = _normalize_rows(
+                np.frombuffer(b"".join(row["embedding"] for row in rows), dtype=np.float32).reshape(len(rows), -1)
+            )
+            slots = self._vector_file(conn, vectors.shape[1]).append(vectors)
+            conn.executemany(
+                "UPDATE embeddings SET slot = ?, embedding = X'' WHERE rowid = ?",
+                [(slot, row["rowid"]) for slot, row in zip(slots, rows)],
+            )
+            _bump_embeddings_version(conn, log_change=False)
+        return len(rows)
+
+    def _record_legacy_space(self) -> bool:
+        """Record the space of embeddings written before spaces were tracked.
+
+        Those came from the sentence-transformers default model, cut by
+        chunker 1; without the row, the first write would claim its own
+        space for them and queries would be encoded by the wrong model.
+        """
+
+        with self._connect() as conn:
+            if conn.execute("SELECT EXISTS(SELECT 1 FROM embedding_space)").fetchone()[0]:
+                return False
+            if not conn.execute("SELECT EXISTS(SELECT 1 FROM embeddings)").fetchone()[0]:
+                return False
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO embedding_space (id, backend, model, dim, chunker) VALUES (1, ?, ?, ?, 1)",
+                (embedders.SENTENCE_TRANSFORMERS, DEFAULT_EMBED_MODEL, _meta(conn, VECTOR_DIM_KEY)),
+            )
+        return True
 
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """This thread's pooled connection, for reads."""
+
+        return self.pool.connection()
+
+    def _write(self):
+        """Context manager for one serialized ``BEGIN IMMEDIATE`` write transaction."""
+
+        return self.pool.write()
+
+    def index_directory(
+        self,
+        transcripts_dir: Path,
+        summaries_dir: Path | None = None,
+        *,
+        include: Optional[Callable[[str], bool]] = None,
+    ) -> None:
+        """Index every transcript in ``transcripts_dir`` (only videos ``include`` accepts, when given)."""
 
-    def index_directory(self, transcripts_dir: Path, summaries_dir: Path | None = None) -> None:
         transcripts_dir = transcripts_dir.resolve()
         summaries_dir = summaries_dir.resolve() if summaries_dir else None
 
-        with self._connect() as conn:
+        with self._write() as conn:
             for transcript_path in sorted(transcripts_dir.glob("*.txt")):
                 video_name = transcript_path.stem
+                if include is not None and not include(video_name):
+                    continue
                 transcript_text = transcript_path.read_text(encoding="utf-8")
                 summary_path = None
                 summary_text = None
@@ -148,17 +1086,17 @@ class KnowledgeBase:
                         summary_text = candidate.read_text(encoding="utf-8")
 
                 conn.execute(
-                    "REPLACE INTO documents (video_name, transcript_path, summary_path, transcript, summary) "
-                    "VALUES (?, ?, ?, ?, ?)",
+                    "REPLACE INTO documents (video_name, transcript_path, summary_path, transcript, summary, segments) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
                     (
                         video_name,
                         str(transcript_path),
                         summary_path,
                         transcript_text,
                         summary_text,
+                        _read_segments(transcript_path, transcript_text),
                     ),
                 )
-            conn.commit()
 
     def upsert_document(
         self,
@@ -168,130 +1106,1540 @@ class KnowledgeBase:
     ) -> None:
         transcript_text = transcript_path.read_text(encoding="utf-8")
         summary_text = summary_path.read_text(encoding="utf-8") if summary_path and summary_path.exists() else None
-        with self._connect() as conn:
+        segments = _read_segments(transcript_path, transcript_text)
+        transcript_digest = _file_digest(transcript_path)
+        summary_digest = _file_digest(summary_path) if summary_text is not None else None
+        with self._write() as conn:
             conn.execute(
-                "REPLACE INTO documents (video_name, transcript_path, summary_path, transcript, summary) "
-                "VALUES (?, ?, ?, ?, ?)",
+                "REPLACE INTO documents (video_name, transcript_path, summary_path, transcript, summary, segments) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
                 (
                     video_name,
                     str(transcript_path),
                     str(summary_path) if summary_path else None,
                     transcript_text,
                     summary_text,
+                    segments,
                 ),
             )
-            conn.commit()
+            # Remember what was indexed so the next directory sync can skip these files.
+            _record_file_state(conn, video_name, "transcript", transcript_path, transcript_digest)
+            if summary_digest is not None:
+                _record_file_state(conn, video_name, "summary", summary_path, summary_digest)
+            _invalidate_shadow(conn, video_name)
 
-    def update_embeddings_for(self, video_name: str, *, model_name: str = DEFAULT_EMBED_MODEL) -> None:
-        model = _load_embeddings_model(model_name)
-        with self._connect() as conn:
-            row = conn.execute(
-                "SELECT transcript, summary FROM documents WHERE video_name = ?",
-                (video_name,),
-            ).fetchone()
-            if row is None:
-                return
-            conn.execute("DELETE FROM embeddings WHERE video_name = ?", (video_name,))
-            text_source = row["summary"] or row["transcript"]
-            chunks = _chunk_text(text_source)
-            vectors = model.encode(chunks, convert_to_numpy=True, normalize_embeddings=True)
-            for idx, (chunk, vector) in enumerate(zip(chunks, vectors)):
-                conn.execute(
-                    "INSERT INTO embeddings (video_name, chunk_index, chunk_text, embedding, norm)"
-                    " VALUES (?, ?, ?, ?, ?)",
-                    (
-                        video_name,
-                        idx,
-                        chunk,
-                        _to_blob(vector),
-                        float(np.linalg.norm(vector)),
-                    ),
-                )
-            conn.commit()
+    def remove_document(self, video_name: str) -> None:
+        """Drop a video's document, search entries, embeddings and file state."""
 
-    def search(self, query: str, *, limit: int = 5) -> Iterator[SearchHit]:
-        match_query = _sanitize_query(query)
-        with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT d.video_name, d.transcript_path, d.summary_path, "
-                "snippet(documents_fts, -1, '[', ']', ' … ', 10) AS snippet "
-                "FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid "
-                "WHERE documents_fts MATCH ? ORDER BY rank LIMIT ?",
-                (match_query, limit),
-            )
-            for row in cur.fetchall():
-                yield SearchHit(
-                    video_name=row["video_name"],
-                    transcript_path=row["transcript_path"],
-                    summary_path=row["summary_path"],
-                    snippet=row["snippet"],
-                )
+        with self._write() as conn:
+            conn.execute("DELETE FROM documents WHERE video_name = ?", (video_name,))
+            conn.execute("DELETE FROM file_state WHERE video_name = ?", (video_name,))
+            removed = conn.execute("DELETE FROM embeddings WHERE video_name = ?", (video_name,)).rowcount
+            _invalidate_shadow(conn, video_name)
+            self._update_related(conn, [video_name])
+            previous_version = _bump_embeddings_version(conn, video_name) if removed else None
+            generation = _meta(conn, VECTOR_GENERATION_KEY)
+        if previous_version is None:
+            return
+        self._apply_embedding_update({video_name: []}, previous_version, generation)
+        with self._ann_lock:
+            if self._ann is not None and self._ann.version == previous_version:
+                self._ann.remove_group(video_name)
+                self._ann.version = previous_version + 1
 
-    # Embeddings -----------------------------------------------------------------
-    def build_embeddings(self, *, model_name: str = DEFAULT_EMBED_MODEL) -> None:
-        with self._connect() as conn:
-            cur = conn.execute("SELECT video_name FROM documents")
-            video_names = [row["video_name"] for row in cur.fetchall()]
+    def update_embeddings_for(
+        self,
+        video_name: str,
+        *,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> None:
+        self.embed_documents([video_name], model_name=model_name, backend=backend)
 
-        for video_name in video_names:
-            self.update_embeddings_for(video_name, model_name=model_name)
+    # Embedding space -------------------------------------------------------------
+    def embedding_space(self) -> Optional[EmbeddingSpace]:
+        """The backend, model and dimension of the stored vectors, or None before the first embedding."""
 
-    def semantic_search(self, query: str, *, limit: int = 5, model_name: str = DEFAULT_EMBED_MODEL) -> Iterator[SemanticHit]:
         with self._connect() as conn:
-            count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
-            if count == 0:
-                for hit in self.search(query, limit=limit):
-                    yield SemanticHit(
-                        video_name=hit.video_name,
-                        transcript_path=hit.transcript_path,
-                        summary_path=hit.summary_path,
-                        snippet=hit.snippet,
-                        score=1.0,
-                    )
-                return
+            return _read_space(conn)
 
-        model = _load_embeddings_model(model_name)
-        query_vec = model.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0]
+    def resolve_embedding_space(
+        self,
+        backend: Optional[str] = None,
+        model_name: Optional[str] = None,
+    ) -> EmbeddingSpace:
+        """Fill in ``backend`` and ``model_name`` from the stored vectors, then the defaults.
+
+        Raises ValueError when they name a different space than the stored
+        vectors: scores across two models are meaningless.
+        """
+
+        return _resolve_space(self.embedding_space(), backend, model_name)
+
+    def clear_embeddings(self) -> int:
+        """Delete every embedding and the recorded space; return how many chunks were dropped."""
+
+        with self._write() as conn:
+            store = self._vector_file(conn)
+            quantized = self._quantized_file(conn)
+            dropped = conn.execute("DELETE FROM embeddings").rowcount
+            conn.execute("DELETE FROM embedding_space")
+            # The graph stays enabled and refills as videos are embedded again.
+            conn.execute("DELETE FROM video_centroids")
+            conn.execute("DELETE FROM related_videos")
+            _set_meta(conn, VECTOR_DIM_KEY, 0)
+            _set_meta(conn, VECTOR_GENERATION_KEY, _allocate_generation(conn))
+            _bump_embeddings_version(conn)
+        with self._ann_lock:
+            self._ann = None
+        self.ann_path.unlink(missing_ok=True)
+        try:
+            if store is not None:
+                store.unlink()
+            if quantized is not None:
+                quantized.unlink()
+        except OSError:
+            pass
+        return dropped
+
+    def clear(self) -> int:
+        """Drop every document, embedding and file record; return how many documents were dropped."""
+
+        self.discard_shadow()
+        self.clear_embeddings()
+        with self._write() as conn:
+            conn.execute("DELETE FROM file_state")
+            return conn.execute("DELETE FROM documents").rowcount
+
+    def embedding_coverage(self) -> tuple[int, int]:
+        """Return ``(documents, documents with embeddings)``."""
+
+        with self._connect() as conn:
+            documents = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            embedded = conn.execute(
+                "SELECT COUNT(*) FROM documents d WHERE EXISTS (SELECT 1 FROM embeddings e WHERE e.video_name = d.video_name)"
+            ).fetchone()[0]
+        return int(documents), int(embedded)
+
+    def unembedded_documents(self) -> List[str]:
+        """Names of indexed documents that have no embeddings yet."""
 
         with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT e.video_name, e.chunk_text, d.transcript_path, d.summary_path, e.embedding "
-                "FROM embeddings e JOIN documents d ON d.video_name = e.video_name"
+            return [
+                row[0]
+                for row in conn.execute(
+                    "SELECT video_name FROM documents d WHERE NOT EXISTS "
+                    "(SELECT 1 FROM embeddings e WHERE e.video_name = d.video_name) ORDER BY video_name"
+                )
+            ]
+
+    def embed_documents(
+        self,
+        video_names: Optional[Iterable[str]] = None,
+        *,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+        batch_size: int = DEFAULT_EMBED_BATCH,
+        progress: Optional[Callable[[EmbedReport], None]] = None,
+    ) -> EmbedReport:
+        """(Re-)embed ``video_names`` (default: every document) in corpus-wide batches.
+
+        Chunks from consecutive documents are pooled until ``batch_size`` of
+        them are pending, encoded in one ``model.encode`` call and written with
+        ``executemany`` in a single transaction.  Document text is read a page
+        at a time and chunked lazily; a long transcript simply continues into
+        the next batch, so memory stays bounded by one batch of chunks however
+        long the documents or large the corpus.  ``progress`` is called with
+        the running report after each batch.
+
+        ``backend`` and ``model_name`` default to those of the stored vectors
+        (see :meth:`resolve_embedding_space`), which the first batch records.
+        """
+
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        space = self.resolve_embedding_space(backend, model_name)
+        if video_names is None:
+            with self._connect() as conn:
+                names = [row[0] for row in conn.execute("SELECT video_name FROM documents ORDER BY video_name")]
+        else:
+            names = list(dict.fromkeys(video_names))
+        report = EmbedReport(total_documents=len(names))
+        started = time.perf_counter()
+        model = None
+        # (video_name, index of its first chunk here, chunks); a non-zero index continues a document.
+        pending: List[tuple[str, int, List[Chunk]]] = []
+        pending_chunks = 0
+
+        def flush() -> None:
+            nonlocal model, pending_chunks
+            model = model or _load_embedder(space)
+            self._write_embedding_batch(model, space, pending, batch_size)
+            report.documents += sum(1 for _name, first, _chunks in pending if first == 0)
+            report.chunks += pending_chunks
+            report.batches += 1
+            report.seconds = time.perf_counter() - started
+            if progress is not None:
+                progress(report)
+            pending.clear()
+            pending_chunks = 0
+
+        for video_name, chunks in self._iter_document_chunks(names, space.chunker):
+            if pending_chunks >= batch_size:
+                flush()
+            piece: List[Chunk] = []
+            pending.append((video_name, 0, piece))
+            for index, chunk in enumerate(chunks):
+                if pending_chunks >= batch_size:
+                    flush()
+                    piece = []
+                    pending.append((video_name, index, piece))
+                piece.append(chunk)
+                pending_chunks += 1
+        if pending:
+            flush()
+        if report.batches:
+            self._maybe_compact()
+            self.update_related(names)
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def _iter_document_chunks(
+        self,
+        names: Sequence[str],
+        chunker: int = CHUNKER_VERSION,
+    ) -> Iterator[tuple[str, Iterator[Chunk]]]:
+        """Yield ``(video_name, lazy chunks)`` for the named documents that exist, reading a page at a time."""
+
+        for start in range(0, len(names), DOCUMENT_PAGE):
+            page = names[start : start + DOCUMENT_PAGE]
+            placeholders = ", ".join("?" for _ in page)
+            # Fetch the whole page up front: no read cursor may stay open while batches are written.
+            with self._connect() as conn:
+                rows = {
+                    row["video_name"]: row
+                    for row in conn.execute(
+                        "SELECT video_name, transcript, summary, segments FROM documents "
+                        f"WHERE video_name IN ({placeholders})",
+                        page,
+                    ).fetchall()
+                }
+            for video_name in page:
+                if video_name in rows:
+                    yield video_name, CHUNKERS[chunker](rows.pop(video_name))
+
+    def _write_embedding_batch(
+        self,
+        model,
+        space: EmbeddingSpace,
+        documents: Sequence[tuple[str, int, List[Chunk]]],
+        batch_size: int,
+    ) -> None:
+        """Write ``(video_name, first chunk index, chunks)`` pieces in one transaction.
+
+        A piece starting at chunk 0 replaces the video's embeddings; a later
+        piece continues a video whose earlier chunks an earlier batch wrote.
+        """
+
+        texts = [chunk.text for _name, _first, chunks in documents for chunk in chunks]
+        vectors = None
+        if texts:
+            vectors = np.asarray(
+                model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True),
+                dtype=np.float32,
             )
-            rows = cur.fetchall()
-
-        hits: List[SemanticHit] = []
-        for row in rows:
-            embedding = _from_blob(row["embedding"])
-            similarity = float(np.dot(query_vec, embedding))
-            score = 1.0 - similarity
-            hits.append(
-                SemanticHit(
+        names = [name for name, _first, _chunks in documents]
+        continued = {name for name, first, _chunks in documents if first}
+        with self._write() as conn:
+            conn.executemany(
+                "DELETE FROM embeddings WHERE video_name = ?", [(name,) for name in names if name not in continued]
+            )
+            # Appending inside the write transaction serializes writers across processes.
+            generation = _meta(conn, VECTOR_GENERATION_KEY)
+            store = self._vector_file(conn, vectors.shape[1] if vectors is not None else None)
+            slots = range(0)
+            if vectors is None:
+                # Every document in the batch came out without a chunk: only their old ones go.
+                vectors = np.zeros((0, store.dim if store is not None else 0), dtype=np.float32)
+            else:
+                conn.execute(
+                    "INSERT OR IGNORE INTO embedding_space (id, backend, model, dim, chunker) VALUES (1, ?, ?, ?, ?)",
+                    (space.backend, space.model, store.dim, space.chunker),
+                )
+                conn.execute("UPDATE embedding_space SET dim = ? WHERE dim = 0", (store.dim,))
+                recorded = conn.execute("SELECT backend, model, chunker FROM embedding_space").fetchone()
+                if tuple(recorded) != space.version:
+                    raise ValueError(
+                        f"another writer switched the knowledge base to {recorded['model']} ({recorded['backend']}, "
+                        f"chunker v{recorded['chunker']})"
+                    )
+                slots = store.append(_normalize_rows(vectors))
+                quantized = self._quantized_file(conn)
+                if quantized is not None:
+                    quantized.catch_up(store)
+            norms = np.linalg.norm(vectors, axis=1)
+            rows = []
+            slots_by_video: dict[str, range] = {}
+            offset = 0
+            for name, first, chunks in documents:
+                slots_by_video[name] = slots[offset : offset + len(chunks)]
+                rows.extend(
+                    (name, first + idx, chunk.text, float(norms[offset + idx]), slots[offset + idx], chunk.start, chunk.end)
+                    for idx, chunk in enumerate(chunks)
+                )
+                offset += len(chunks)
+            conn.executemany(
+                "INSERT INTO embeddings (video_name, chunk_index, chunk_text, embedding, norm, slot, start_seconds, end_seconds)"
+                " VALUES (?, ?, ?, X'', ?, ?, ?, ?)",
+                rows,
+            )
+            previous_version = _embeddings_version(conn)
+            for name in names:
+                _bump_embeddings_version(conn, name)
+        self._apply_embedding_update(slots_by_video, previous_version, generation, continued=continued)
+        with self._ann_lock:
+            if self._ann is None or self._ann.version != previous_version:
+                return
+            placeholders = ", ".join("?" for _ in names)
+            with self._connect() as conn:
+                row_ids = {
+                    row["slot"]: row["rowid"]
+                    for row in conn.execute(
+                        f"SELECT rowid, slot FROM embeddings WHERE video_name IN ({placeholders})", names
+                    ).fetchall()
+                }
+            offset = 0
+            for name, _first, chunks in documents:
+                video_slots = slots_by_video[name]
+                if name not in continued:
+                    self._ann.remove_group(name)
+                self._ann.add([row_ids[slot] for slot in video_slots], vectors[offset : offset + len(chunks)], name)
+                offset += len(chunks)
+            self._ann.version = previous_version + len(names)
+
+    def _apply_embedding_update(
+        self,
+        slots_by_video: dict[str, Sequence[int]],
+        previous_version: int,
+        generation: int,
+        *,
+        continued: Iterable[str] = (),
+    ) -> None:
+        """Patch the resident matrix in place if it was current before this write.
+
+        Each video in ``slots_by_video`` accounts for one version bump; the
+        slots of ``continued`` videos are added to the ones they already have.
+        """
+
+        with self._matrix_lock:
+            matrix = self._matrix
+            if matrix is None or self._matrix_version != previous_version or matrix.generation != generation:
+                self._matrix = None
+                return
+            if matrix.store is None:
+                with self._connect() as conn:
+                    matrix.store = self._vector_file(conn)
+                    matrix.quantized = self._quantized_file(conn)
+            continued = set(continued)
+            for video_name, slots in slots_by_video.items():
+                matrix.assign(video_name, slots, append=video_name in continued)
+            self._matrix_version = previous_version + len(slots_by_video)
+
+    def _embedding_matrix(self) -> _EmbeddingMatrix:
+        """Return the resident matrix, reloading it if another writer changed the table."""
+
+        with self._connect() as conn:
+            version = _embeddings_version(conn)
+            generation = _meta(conn, VECTOR_GENERATION_KEY)
+            with self._matrix_lock:
+                matrix = self._matrix
+                if matrix is not None and self._matrix_version == version and matrix.generation == generation:
+                    return matrix
+                matrix = _EmbeddingMatrix(self._vector_file(conn), generation, self._quantized_file(conn, generation))
+                rows = conn.execute(
+                    "SELECT video_name, slot FROM embeddings WHERE slot IS NOT NULL ORDER BY video_name, slot"
+                ).fetchall()
+                slots_by_video: dict[str, List[int]] = {}
+                for row in rows:
+                    slots_by_video.setdefault(row["video_name"], []).append(row["slot"])
+                for name, slots in slots_by_video.items():
+                    matrix.assign(name, slots)
+                self._matrix, self._matrix_version = matrix, version
+                return matrix
+
+    def _maybe_compact(self) -> None:
+        with self._connect() as conn:
+            store = self._vector_file(conn)
+            if store is None:
+                return
+            rows = store.rows
+            live = conn.execute("SELECT COUNT(*) FROM embeddings WHERE slot IS NOT NULL").fetchone()[0]
+        if rows >= COMPACT_MIN_ROWS and (rows - live) * 2 > rows:
+            self.compact_vectors()
+
+    def compact_vectors(self) -> int:
+        """Rewrite the vector file without dead rows; return how many were dropped.
+
+        The live rows are copied to a new generation of the file and the slot
+        mapping is updated in one transaction, so readers either see the old
+        file with old slots or the new file with new slots.
+        """
+
+        with self._write() as conn:
+            store = self._vector_file(conn)
+            if store is None:
+                return 0
+            rows = conn.execute("SELECT rowid, slot FROM embeddings WHERE slot IS NOT NULL ORDER BY slot").fetchall()
+            dropped = store.rows - len(rows)
+            if dropped <= 0:
+                return 0
+            generation = _allocate_generation(conn)
+            slots = np.array([row["slot"] for row in rows], dtype=np.int64)
+            compacted = store.write_compacted(self.vector_path(generation), slots)
+            old_quantized = self._quantized_file(conn)
+            new_quantized = self._quantized_file(conn, generation)
+            try:
+                if new_quantized is not None:
+                    new_quantized.catch_up(compacted)
+                conn.executemany(
+                    "UPDATE embeddings SET slot = ? WHERE rowid = ?",
+                    [(new_slot, row["rowid"]) for new_slot, row in enumerate(rows)],
+                )
+                _set_meta(conn, VECTOR_GENERATION_KEY, generation)
+            except (sqlite3.Error, OSError):
+                compacted.unlink()
+                if new_quantized is not None:
+                    new_quantized.unlink()
+                raise
+        try:
+            # Processes that still map the old file keep reading it until they notice the new generation.
+            store.unlink()
+            if old_quantized is not None:
+                old_quantized.unlink()
+        except OSError:
+            pass
+        return dropped
+
+    # Shadow re-embedding -------------------------------------------------------
+    def shadow_status(self) -> Optional[ShadowStatus]:
+        """Progress of the re-embedding in progress, or None."""
+
+        with self.pool.snapshot() as conn:
+            return _shadow_status(conn)
+
+    def start_reembedding(
+        self,
+        *,
+        backend: Optional[str] = None,
+        model_name: Optional[str] = None,
+    ) -> ShadowStatus:
+        """Begin (or resume) re-embedding the library into a shadow index.
+
+        The target is ``backend``/``model_name`` (defaulting like
+        :meth:`resolve_embedding_space`, but without requiring them to match
+        the live vectors) cut by the current :data:`CHUNKER_VERSION`.  A
+        build for another target is discarded first; with neither given, a
+        build in progress is resumed.  Searches keep reading the live
+        vectors until :meth:`swap_shadow`.
+        """
+
+        if backend is None and model_name is None:
+            status = self.shadow_status()
+            if status is not None:
+                return status
+        live = self.embedding_space()
+        backend = backend or (live.backend if live else embedders.DEFAULT_BACKEND)
+        if model_name is None:
+            model_name = live.model if live and live.backend == backend else embedders.default_model(backend)
+        embedders.default_model(backend)
+        target = EmbeddingSpace(backend, model_name, 0, CHUNKER_VERSION)
+        with self._write() as conn:
+            building = _read_space(conn, "shadow_build")
+            if building is not None and building.version == target.version:
+                return _shadow_status(conn)
+            if live is not None and live.version == target.version:
+                raise ValueError(f"the knowledge base already holds vectors from {live}")
+            if building is not None:
+                self._drop_shadow(conn)
+            for statement in SHADOW_SCHEMA:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO shadow_build (id, backend, model, chunker, dim, generation, started_at) "
+                "VALUES (1, ?, ?, ?, 0, ?, ?)",
+                (backend, model_name, CHUNKER_VERSION, _allocate_generation(conn), time.time()),
+            )
+            return _shadow_status(conn)
+
+    def discard_shadow(self) -> None:
+        """Abandon the re-embedding in progress and delete what it built."""
+
+        with self._write() as conn:
+            self._drop_shadow(conn)
+
+    def _drop_shadow(self, conn: sqlite3.Connection) -> None:
+        row = conn.execute("SELECT generation FROM shadow_build").fetchone()
+        conn.execute("DROP TABLE IF EXISTS embeddings_shadow")
+        conn.execute("DROP TABLE IF EXISTS shadow_documents")
+        conn.execute("DELETE FROM shadow_build")
+        if row is not None:
+            self.vector_path(row["generation"]).unlink(missing_ok=True)
+
+    def reembed_batch(
+        self,
+        *,
+        max_documents: int = REEMBED_DOCUMENTS,
+        batch_size: int = DEFAULT_EMBED_BATCH,
+    ) -> ShadowStatus:
+        """Embed up to ``max_documents`` documents the shadow index lacks, in one write.
+
+        Documents rewritten or removed while the batch was encoding are left
+        for the next batch; the rest of the batch is committed.
+        """
+
+        with self._connect() as conn:
+            target = _read_space(conn, "shadow_build")
+            if target is None:
+                raise ValueError("no re-embedding in progress; call start_reembedding first")
+            documents_version = _meta(conn, DOCUMENTS_VERSION_KEY)
+            # Bounded by ``max_documents``: the batch is written in one transaction, after encoding.
+            read = {
+                row["video_name"]: row
+                for row in conn.execute(
+                    "SELECT video_name, transcript, summary, segments FROM documents d WHERE NOT EXISTS "
+                    "(SELECT 1 FROM shadow_documents s WHERE s.video_name = d.video_name) "
+                    "ORDER BY video_name LIMIT ?",
+                    (max_documents,),
+                ).fetchall()
+            }
+        documents = [(name, list(CHUNKERS[target.chunker](row))) for name, row in read.items()]
+        texts = [chunk.text for _name, chunks in documents for chunk in chunks]
+        vectors = None
+        if texts:
+            vectors = np.asarray(
+                _load_embedder(target).encode(
+                    texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True
+                ),
+                dtype=np.float32,
+            )
+        with self._write() as conn:
+            building = _read_space(conn, "shadow_build")
+            if building is None or building.version != target.version:
+                raise ValueError("the re-embedding was discarded or restarted by another writer")
+            names = list(read)
+            if _meta(conn, DOCUMENTS_VERSION_KEY) != documents_version:
+                # Something changed since the batch was read; only its own documents are read again.
+                names = self._unchanged_documents(conn, read)
+            if vectors is not None and len(names) < len(read):
+                chunk_names = np.repeat([name for name, _ in documents], [len(chunks) for _, chunks in documents])
+                vectors = vectors[np.isin(chunk_names, names)]
+                documents = [(name, chunks) for name, chunks in documents if name in names]
+            if vectors is not None and len(vectors):
+                generation = conn.execute("SELECT generation FROM shadow_build").fetchone()[0]
+                dim = building.dim or vectors.shape[1]
+                conn.execute("UPDATE shadow_build SET dim = ?", (dim,))
+                slots = VectorFile(self.vector_path(generation), dim).append(_normalize_rows(vectors))
+                norms = np.linalg.norm(vectors, axis=1)
+                rows = []
+                offset = 0
+                for name, chunks in documents:
+                    rows.extend(
+                        (name, idx, chunk.text, float(norms[offset + idx]), slots[offset + idx], chunk.start, chunk.end)
+                        for idx, chunk in enumerate(chunks)
+                    )
+                    offset += len(chunks)
+                conn.executemany("DELETE FROM embeddings_shadow WHERE video_name = ?", [(name,) for name in names])
+                conn.executemany(
+                    "INSERT INTO embeddings_shadow (video_name, chunk_index, chunk_text, embedding, norm, slot, "
+                    "start_seconds, end_seconds) VALUES (?, ?, ?, X'', ?, ?, ?, ?)",
+                    rows,
+                )
+            conn.executemany("INSERT OR IGNORE INTO shadow_documents (video_name) VALUES (?)", [(n,) for n in names])
+            return _shadow_status(conn)
+
+    @staticmethod
+    def _unchanged_documents(conn: sqlite3.Connection, read: dict[str, sqlite3.Row]) -> List[str]:
+        """Names in ``read`` whose document still holds the text that was read."""
+
+        placeholders = ", ".join("?" for _ in read)
+        current = {
+            row["video_name"]: tuple(row)
+            for row in conn.execute(
+                f"SELECT video_name, transcript, summary, segments FROM documents WHERE video_name IN ({placeholders})",
+                list(read),
+            )
+        }
+        return [name for name, row in read.items() if current.get(name) == tuple(row)]
+
+    def swap_shadow(self) -> bool:
+        """Atomically make a complete shadow index the live one; False if it is not complete yet.
+
+        In one write transaction the shadow table replaces ``embeddings``,
+        its vector file becomes the live generation and the embedding space
+        is updated.  Readers see either the old version or the new one, and
+        the old version is garbage-collected afterwards.
+        """
+
+        status = self.shadow_status()
+        if status is None or status.pending:
+            return False
+        with self._connect() as conn:
+            generation = conn.execute("SELECT generation FROM shadow_build").fetchone()[0]
+            kind = QUANTIZATIONS[_meta(conn, VECTOR_QUANTIZATION_KEY)]
+        store = VectorFile(self.vector_path(generation), status.space.dim) if status.space.dim else None
+        quantized = None
+        if store is not None and kind != "float32":
+            # Quantize outside the write lock; the swap only catches up on rows added since.
+            quantized = QuantizedVectors(self.quantized_path(generation, kind), store.dim, kind)
+            quantized.catch_up(store)
+        with self._write() as conn:
+            current = _shadow_status(conn)
+            if current is None or current.pending or current.space != status.space:
+                return False
+            if quantized is not None:
+                quantized.catch_up(store)
+            conn.execute("DROP TABLE IF EXISTS embeddings_retired")
+            conn.execute("DROP INDEX IF EXISTS embeddings_slot")
+            conn.execute("ALTER TABLE embeddings RENAME TO embeddings_retired")
+            conn.execute("ALTER TABLE embeddings_shadow RENAME TO embeddings")
+            for migration in EMBEDDING_MIGRATIONS:
+                try:
+                    # A shadow table created by an older release may lack the newest columns.
+                    conn.execute(migration)
+                except sqlite3.OperationalError:
+                    pass
+            conn.execute(EMBEDDING_INDEXES)
+            conn.execute("DROP TABLE shadow_documents")
+            conn.execute("DELETE FROM shadow_build")
+            space = status.space
+            conn.execute(
+                "REPLACE INTO embedding_space (id, backend, model, dim, chunker) VALUES (1, ?, ?, ?, ?)",
+                (space.backend, space.model, space.dim, space.chunker),
+            )
+            _set_meta(conn, VECTOR_DIM_KEY, status.space.dim)
+            _set_meta(conn, VECTOR_GENERATION_KEY, generation)
+            _bump_embeddings_version(conn)
+            neighbours = _meta(conn, RELATED_NEIGHBOURS_KEY)
+        self.collect_garbage()
+        if neighbours:
+            # Centroids from the old model are not comparable with the new ones.
+            self.build_related_graph(neighbours=neighbours)
+        return True
+
+    def collect_garbage(self) -> int:
+        """Drop the retired embeddings table and vector files no live or shadow version uses.
+
+        Returns how many files were deleted.  Runs under the write lock, so
+        no other writer can be halfway through creating a new generation.
+        """
+
+        removed = 0
+        prefix = f"{self.db_path.stem}.vectors-"
+        with self._write() as conn:
+            conn.execute("DROP TABLE IF EXISTS embeddings_retired")
+            keep = {_meta(conn, VECTOR_GENERATION_KEY)}
+            keep.update(row[0] for row in conn.execute("SELECT generation FROM shadow_build"))
+            for path in self.db_path.parent.glob(f"{prefix}*"):
+                generation = path.name[len(prefix) :].split(".", 1)[0]
+                if not generation.isdigit() or int(generation) in keep:
+                    continue
+                try:
+                    # Processes still mapping the file keep reading it until they notice the new generation.
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def reembed(
+        self,
+        *,
+        backend: Optional[str] = None,
+        model_name: Optional[str] = None,
+        max_documents: int = REEMBED_DOCUMENTS,
+        pause: float = REEMBED_PAUSE,
+        batch_size: int = DEFAULT_EMBED_BATCH,
+        progress: Optional[Callable[[ShadowStatus], None]] = None,
+    ) -> ShadowStatus:
+        """Re-embed the whole library into a shadow index, then swap it in.
+
+        Batches of ``max_documents`` are separated by ``pause`` seconds so the
+        live pipeline and searches keep their share of the CPU and the write
+        lock.  Safe to interrupt: calling it again resumes the build.
+        """
+
+        status = self.start_reembedding(backend=backend, model_name=model_name)
+        while True:
+            status = self.reembed_batch(max_documents=max_documents, batch_size=batch_size)
+            if progress is not None:
+                progress(status)
+            if not status.pending and self.swap_shadow():
+                status.swapped = True
+                return status
+            time.sleep(pause)
+
+    # Related videos ----------------------------------------------------------------
+    def related_videos(self, video_name: str, *, limit: Optional[int] = None) -> List[RelatedVideo]:
+        """The videos closest to ``video_name``, best first, read from the precomputed graph."""
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT r.neighbour, r.score, d.transcript_path, d.summary_path FROM related_videos r "
+                "JOIN documents d ON d.video_name = r.neighbour WHERE r.video_name = ? ORDER BY r.rank LIMIT ?",
+                (video_name, -1 if limit is None else limit),
+            ).fetchall()
+        return [
+            RelatedVideo(row["neighbour"], float(row["score"]), row["transcript_path"], row["summary_path"])
+            for row in rows
+        ]
+
+    def related_neighbours(self) -> int:
+        """Neighbours kept per video, or 0 when the related-videos graph has not been built."""
+
+        with self._connect() as conn:
+            return _meta(conn, RELATED_NEIGHBOURS_KEY)
+
+    def build_related_graph(self, *, neighbours: int = related.DEFAULT_NEIGHBOURS) -> RelatedReport:
+        """Recompute every video's centroid and its ``neighbours`` most similar videos.
+
+        Centroids are the normalized means of each video's chunk vectors, and
+        the graph comes from blocked centroid-by-centroid products (see
+        :func:`related.top_neighbours`).  Both are stored in SQLite; from then
+        on every embed or removal updates just the affected neighbourhood.
+        """
+
+        if neighbours <= 0:
+            raise ValueError("neighbours must be positive")
+        started = time.perf_counter()
+        names: List[str] = []
+        vectors: List[np.ndarray] = []
+        with self.pool.snapshot() as conn:
+            version = _embeddings_version(conn)
+            store = self._vector_file(conn)
+            rows = conn.execute(
+                "SELECT video_name, slot FROM embeddings WHERE slot IS NOT NULL ORDER BY video_name, chunk_index"
+            ).fetchall()
+            for name, group in groupby(rows, key=lambda row: row["video_name"]):
+                names.append(name)
+                vectors.append(related.centroid(store.read(row["slot"] for row in group)))
+        centroids = np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        with self._write() as conn:
+            conn.execute("DELETE FROM video_centroids")
+            conn.execute("DELETE FROM related_videos")
+            conn.executemany(
+                "INSERT INTO video_centroids (video_name, centroid) VALUES (?, ?)",
+                [(name, _to_blob(vector)) for name, vector in zip(names, centroids)],
+            )
+            edges = _store_neighbours(conn, names, centroids, range(len(names)), neighbours)
+            _set_meta(conn, RELATED_NEIGHBOURS_KEY, neighbours)
+            changed = [
+                row[0]
+                for row in conn.execute("SELECT video_name FROM embedding_changes WHERE version > ?", (version,))
+            ]
+            if None in changed:
+                # Rewritten wholesale while the centroids were computed: refresh every video.
+                changed = names + [row[0] for row in conn.execute("SELECT DISTINCT video_name FROM embeddings")]
+            if changed:
+                # Videos (re-)embedded or removed while the centroids were computed.
+                self._update_related(conn, changed)
+        return RelatedReport(videos=len(names), edges=edges, seconds=time.perf_counter() - started)
+
+    def update_related(self, video_names: Iterable[str]) -> None:
+        """Bring the related-videos graph up to date after ``video_names`` were (re-)embedded or removed."""
+
+        with self._write() as conn:
+            self._update_related(conn, video_names)
+
+    def _video_centroids(self, conn: sqlite3.Connection, names: Iterable[str]) -> dict[str, Optional[np.ndarray]]:
+        """Centroids of the named videos' current chunks (None for a video without any)."""
+
+        store = self._vector_file(conn)
+        centroids: dict[str, Optional[np.ndarray]] = {}
+        for name in names:
+            slots = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT slot FROM embeddings WHERE video_name = ? AND slot IS NOT NULL ORDER BY chunk_index", (name,)
+                )
+            ]
+            centroids[name] = related.centroid(store.read(slots)) if slots and store is not None else None
+        return centroids
+
+    def _update_related(self, conn: sqlite3.Connection, video_names: Iterable[str]) -> None:
+        """Refresh the centroids of ``video_names`` and re-rank only the neighbour lists they can change.
+
+        Runs inside the caller's write transaction.  A list is recomputed
+        when it belongs to a changed video, when it contained a changed
+        video (whose score moved or which is gone), or when a changed video
+        now beats its weakest entry.  Everything else is left untouched.
+        """
+
+        neighbours = _meta(conn, RELATED_NEIGHBOURS_KEY)
+        if not neighbours:
+            return
+        fresh = self._video_centroids(conn, dict.fromkeys(video_names))
+        if not fresh:
+            return
+        for name, vector in fresh.items():
+            if vector is None:
+                conn.execute("DELETE FROM video_centroids WHERE video_name = ?", (name,))
+                conn.execute("DELETE FROM related_videos WHERE video_name = ?", (name,))
+            else:
+                conn.execute("REPLACE INTO video_centroids (video_name, centroid) VALUES (?, ?)", (name, _to_blob(vector)))
+        names, centroids = _load_centroids(conn)
+        position = {name: row for row, name in enumerate(names)}
+        changed = [position[name] for name in fresh if name in position]
+        affected = set(changed)
+        placeholders = ", ".join("?" for _ in fresh)
+        affected.update(
+            position[row[0]]
+            for row in conn.execute(
+                f"SELECT DISTINCT video_name FROM related_videos WHERE neighbour IN ({placeholders})", list(fresh)
+            )
+            if row[0] in position
+        )
+        if changed:
+            full = min(neighbours, len(names) - 1)
+            weakest = np.full(len(names), -np.inf, dtype=np.float32)
+            for row in conn.execute("SELECT video_name, MIN(score), COUNT(*) FROM related_videos GROUP BY video_name"):
+                if row[0] in position and row[2] >= full:
+                    weakest[position[row[0]]] = row[1]
+            scores = centroids @ centroids[changed].T
+            scores[changed, np.arange(len(changed))] = -np.inf
+            affected.update(np.flatnonzero((scores > weakest[:, None]).any(axis=1)).tolist())
+        if affected:
+            _store_neighbours(conn, names, centroids, sorted(affected), neighbours)
+
+    # Approximate index -----------------------------------------------------------
+    def build_ann_index(self, *, nlist: Optional[int] = None) -> ann.IVFIndex:
+        """Train an IVF index over all embeddings and save it to :attr:`ann_path`."""
+
+        with self._connect() as conn:
+            version = _embeddings_version(conn)
+            rows = conn.execute(
+                "SELECT rowid, video_name, slot FROM embeddings WHERE slot IS NOT NULL ORDER BY video_name, chunk_index"
+            ).fetchall()
+            if not rows:
+                raise ValueError("no embeddings to index; run `embed` first")
+            vectors = self._vector_file(conn).read(row["slot"] for row in rows)
+        index = ann.IVFIndex.train(vectors, nlist=nlist)
+        names = [row["video_name"] for row in rows]
+        start = 0
+        while start < len(rows):
+            end = start
+            while end < len(rows) and names[end] == names[start]:
+                end += 1
+            index.add([row["rowid"] for row in rows[start:end]], vectors[start:end], names[start])
+            start = end
+        index.version = version
+        index.save(self.ann_path)
+        with self._ann_lock:
+            self._ann = index
+            self._ann_saved_version = version
+        self.search_results.clear()
+        return index
+
+    def _ann_index(self) -> Optional[ann.IVFIndex]:
+        """Return the IVF index caught up with the embeddings table, or None if never built.
+
+        The file on disk is rewritten once :data:`ANN_SAVE_CHANGES` changes
+        have been applied since it was last written, not after every one.
+        """
+
+        with self._ann_lock:
+            if self._ann is None:
+                if not self.ann_path.exists():
+                    return None
+                self._ann = ann.IVFIndex.load(self.ann_path)
+                self._ann_saved_version = self._ann.version
+            index = self._ann
+            with self._connect() as conn:
+                version = _embeddings_version(conn)
+                if index.version != version:
+                    changes = [
+                        row["video_name"]
+                        for row in conn.execute(
+                            "SELECT video_name FROM embedding_changes WHERE version > ? ORDER BY version",
+                            (index.version,),
+                        )
+                    ]
+                    if version < index.version or None in changes:
+                        # The database was replaced or bulk-rewritten; retrain from scratch.
+                        return self.build_ann_index(nlist=index.nlist)
+                    for video_name in dict.fromkeys(changes):
+                        index.remove_group(video_name)
+                        rows = conn.execute(
+                            "SELECT rowid, slot FROM embeddings WHERE video_name = ? ORDER BY chunk_index",
+                            (video_name,),
+                        ).fetchall()
+                        if rows:
+                            vectors = self._vector_file(conn).read(row["slot"] for row in rows)
+                            index.add([row["rowid"] for row in rows], vectors, video_name)
+                    index.version = version
+            if index.version - self._ann_saved_version >= ANN_SAVE_CHANGES:
+                index.save(self.ann_path)
+                self._ann_saved_version = index.version
+            return index
+
+    def _fts_matches(self, query: str, limit: int) -> List[tuple[SearchHit, float]]:
+        """Full-text hits in bm25 order, each with its raw ``bm25()`` value (lower is better)."""
+
+        match_query = _sanitize_query(query)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT d.video_name, d.transcript_path, d.summary_path, "
+                "snippet(documents_fts, -1, '[', ']', ' … ', 10) AS snippet, bm25(documents_fts) AS bm25 "
+                "FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid "
+                "WHERE documents_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match_query, limit),
+            ).fetchall()
+        return [
+            (
+                SearchHit(
                     video_name=row["video_name"],
                     transcript_path=row["transcript_path"],
                     summary_path=row["summary_path"],
-                    snippet=row["chunk_text"],
-                    score=score,
-                )
+                    snippet=row["snippet"],
+                ),
+                float(row["bm25"]),
             )
+            for row in rows
+        ]
 
-            hits.sort(key=lambda hit: hit.score)
-        for hit in hits[:limit]:
-            yield hit
+    # Embeddings -----------------------------------------------------------------
+    def build_embeddings(
+        self,
+        *,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+        batch_size: int = DEFAULT_EMBED_BATCH,
+        progress: Optional[Callable[[EmbedReport], None]] = None,
+    ) -> EmbedReport:
+        return self.embed_documents(model_name=model_name, backend=backend, batch_size=batch_size, progress=progress)
+
+    def _index_version(self) -> tuple[int, int]:
+        with self._connect() as conn:
+            return _embeddings_version(conn), _meta(conn, DOCUMENTS_VERSION_KEY)
+
+    def _encode_query(self, query: str, space: EmbeddingSpace) -> np.ndarray:
+        key = (space.backend, space.model, normalize_query(query))
+        vector = self.query_embeddings.get(key)
+        if vector is None:
+            model = _load_embedder(space)
+            vector = np.asarray(model.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0])
+            vector.setflags(write=False)
+            self.query_embeddings.put(key, vector)
+        return vector
+
+    def _vector_candidates(
+        self,
+        query: str,
+        limit: int,
+        *,
+        space: EmbeddingSpace,
+        generation: int,
+        index: str,
+        nprobe: int,
+    ) -> Optional[tuple[str, List[tuple[int, float]]]]:
+        """Return ``(key column, [(slot or rowid, similarity)])``, or None when nothing is embedded.
+
+        Raises :class:`_StaleIndex` when the resident matrix is already at a
+        newer ``generation`` than ``space`` was read from.
+        """
+
+        if index not in SEARCH_INDEXES:
+            raise ValueError(f"unknown search index {index!r}; expected one of {', '.join(SEARCH_INDEXES)}")
+        ann_index = self._ann_index() if index == "ivf" else None
+        matrix = None if ann_index is not None else self._embedding_matrix()
+        if matrix is not None and matrix.generation != generation:
+            raise _StaleIndex
+        if (matrix.count if matrix is not None else len(ann_index)) == 0:
+            return None
+
+        query_vec = self._encode_query(query, space)
+        if matrix is not None:
+            with self._matrix_lock:
+                return "slot", matrix.top_k(query_vec, limit)
+        with self._ann_lock:
+            return "rowid", ann_index.search(query_vec, limit, nprobe=nprobe)
+
+    def _vector_hits(
+        self,
+        query: str,
+        limit: int,
+        *,
+        backend: Optional[str],
+        model_name: Optional[str],
+        index: str,
+        nprobe: int,
+    ) -> Optional[List[SemanticHit]]:
+        """Chunk hits read from one complete version of the vectors, or None when nothing is embedded.
+
+        The space and generation are read in one snapshot, and the hits are
+        resolved against that generation only.  If a shadow swap or a
+        compaction lands in between, the query is answered again from the
+        new version rather than mixing slots of two.
+        """
+
+        while True:
+            with self.pool.snapshot() as conn:
+                generation = _meta(conn, VECTOR_GENERATION_KEY)
+                space = _resolve_space(_read_space(conn), backend, model_name)
+            try:
+                candidates = self._vector_candidates(
+                    query, limit, space=space, generation=generation, index=index, nprobe=nprobe
+                )
+                if candidates is None:
+                    return None
+                return self._semantic_hits(*candidates, generation=generation)
+            except _StaleIndex:
+                continue
+
+    def _semantic_hits(
+        self,
+        key: str,
+        candidates: Sequence[tuple[int, float]],
+        *,
+        generation: Optional[int] = None,
+    ) -> List[SemanticHit]:
+        """Resolve ``(slot or rowid, similarity)`` pairs into hits, keeping their order.
+
+        With ``generation``, raises :class:`_StaleIndex` if the vectors have
+        moved to another generation since the candidates were scored.
+        """
+
+        if not candidates:
+            return []
+        placeholders = ", ".join("?" for _ in candidates)
+        with self.pool.snapshot() as conn:
+            if generation is not None and _meta(conn, VECTOR_GENERATION_KEY) != generation:
+                raise _StaleIndex
+            rows = {
+                row["key"]: row
+                for row in conn.execute(
+                    f"SELECT e.{key} AS key, e.video_name, e.chunk_text, e.start_seconds, e.end_seconds, "
+                    "d.transcript_path, d.summary_path "
+                    "FROM embeddings e JOIN documents d ON d.video_name = e.video_name "
+                    f"WHERE e.{key} IN ({placeholders})",
+                    [row_key for row_key, _similarity in candidates],
+                ).fetchall()
+            }
+        return [
+            SemanticHit(
+                video_name=rows[row_key]["video_name"],
+                transcript_path=rows[row_key]["transcript_path"],
+                summary_path=rows[row_key]["summary_path"],
+                snippet=rows[row_key]["chunk_text"],
+                score=1.0 - similarity,
+                start=rows[row_key]["start_seconds"],
+                end=rows[row_key]["end_seconds"],
+            )
+            for row_key, similarity in candidates
+            if row_key in rows
+        ]
 
     def sync_from_directories(
         self,
         transcripts_dir: Path,
         summaries_dir: Path | None = None,
         *,
-        model_name: str = DEFAULT_EMBED_MODEL,
-    ) -> None:
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+        include: Optional[Callable[[str], bool]] = None,
+    ) -> SyncReport:
+        """Bring the index in line with the files on disk, touching only what changed.
+
+        Each indexed file's path, mtime, size and SHA-256 are kept in
+        ``file_state``.  Files whose mtime and size match are skipped without
+        being read; the rest are hashed, and only videos whose content really
+        changed are re-indexed and re-embedded.  Videos whose transcript was
+        deleted are removed.  With nothing changed, a sync costs one ``stat``
+        per file and no model load.
+
+        With ``include``, only videos it accepts count as on disk, so a shard
+        syncs just its own share and drops videos that now belong elsewhere.
+        """
+
+        report = SyncReport()
         transcripts_dir = Path(transcripts_dir)
         summaries_dir = Path(summaries_dir) if summaries_dir else None
         if not transcripts_dir.exists():
-            return
-        self.index_directory(transcripts_dir, summaries_dir)
-        self.build_embeddings(model_name=model_name)
+            return report
+        transcripts_dir = transcripts_dir.resolve()
+        transcripts = {
+            path.stem: path
+            for path in sorted(transcripts_dir.glob("*.txt"))
+            if include is None or include(path.stem)
+        }
+        summaries = {}
+        if summaries_dir is not None and summaries_dir.exists():
+            summaries = {
+                path.stem: path for path in sorted(summaries_dir.resolve().glob("*.md")) if path.stem in transcripts
+            }
+
+        with self._connect() as conn:
+            state = {
+                row["path"]: row
+                for row in conn.execute("SELECT path, video_name, kind, mtime, size, sha256 FROM file_state")
+            }
+            documents = {
+                row["video_name"]: row
+                for row in conn.execute("SELECT video_name, transcript_path, summary_path FROM documents")
+            }
+            embedded = {row[0] for row in conn.execute("SELECT DISTINCT video_name FROM embeddings")}
+
+        dirty: set[str] = set()
+        refreshed: List[tuple[str, str, Path, str]] = []
+        for kind, files in (("transcript", transcripts), ("summary", summaries)):
+            for video_name, path in files.items():
+                stat = path.stat()
+                previous = state.pop(str(path), None)
+                if previous is not None and previous["mtime"] == stat.st_mtime and previous["size"] == stat.st_size:
+                    continue
+                digest = _file_digest(path)
+                if previous is not None and previous["sha256"] == digest:
+                    refreshed.append((video_name, kind, path, digest))
+                elif previous is None and self._already_indexed(video_name, kind, path, documents, embedded):
+                    refreshed.append((video_name, kind, path, digest))
+                else:
+                    dirty.add(video_name)
+
+        # Whatever is left in ``state`` vanished from disk: a lost summary makes its
+        # video dirty, a lost transcript removes the video.
+        removed = {
+            name
+            for name, row in documents.items()
+            if name not in transcripts and Path(row["transcript_path"]).resolve().parent == transcripts_dir
+        }
+        for row in state.values():
+            if row["kind"] == "summary" and row["video_name"] in transcripts:
+                dirty.add(row["video_name"])
+        with self._write() as conn:
+            conn.executemany("DELETE FROM file_state WHERE path = ?", [(path,) for path in state])
+
+        for video_name in sorted(removed):
+            self.remove_document(video_name)
+            report.removed += 1
+
+        with self._write() as conn:
+            for video_name, kind, path, digest in refreshed:
+                if video_name not in dirty:
+                    _record_file_state(conn, video_name, kind, path, digest)
+
+        for video_name in sorted(dirty):
+            if video_name in documents:
+                report.updated += 1
+            else:
+                report.added += 1
+            self.upsert_document(video_name, transcripts[video_name], summaries.get(video_name))
+        if dirty:
+            self.embed_documents(sorted(dirty), model_name=model_name, backend=backend)
+        report.unchanged = len(transcripts) - len(dirty)
+        return report
+
+    def _already_indexed(
+        self,
+        video_name: str,
+        kind: str,
+        path: Path,
+        documents: dict,
+        embedded: set,
+    ) -> bool:
+        """True when an untracked file matches what is already indexed (e.g. a DB from before file tracking)."""
+
+        if video_name not in documents or video_name not in embedded:
+            return False
+        column = "transcript" if kind == "transcript" else "summary"
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {column} FROM documents WHERE video_name = ?", (video_name,)).fetchone()
+        return row is not None and row[0] == path.read_text(encoding="utf-8")
+
+
+def _combine_embed_reports(reports: Iterable[EmbedReport], seconds: float) -> EmbedReport:
+    combined = EmbedReport(seconds=seconds)
+    for report in reports:
+        combined.documents += report.documents
+        combined.total_documents += report.total_documents
+        combined.chunks += report.chunks
+        combined.batches += report.batches
+    return combined
+
+
+class ShardedKnowledgeBase(_SearchFrontend):
+    """Documents spread over several :class:`KnowledgeBase` files, queried in parallel.
+
+    ``router`` names each video's shard: a hash of its name
+    (:class:`shards.HashRouter`) or its collection
+    (:class:`shards.CollectionRouter`).  Shard ``key`` is a complete
+    knowledge base in :func:`shards.shard_path`, with its own FTS table,
+    vector file, IVF index and related-videos graph.
+
+    Searches fan out over a thread pool, where SQLite and numpy release the
+    GIL so shards are scored on separate cores, and the per-shard top-k
+    lists are merged.  Syncs and embedding runs go through each shard's own
+    write lock, so shards are indexed side by side and one can be rebuilt
+    while the others keep serving.
+    """
+
+    def __init__(
+        self,
+        db_path: Path | str = DEFAULT_DB_PATH,
+        router: Optional[shards.Router] = None,
+        *,
+        workers: int = shards.SHARD_WORKERS,
+    ):
+        super().__init__()
+        self.db_path = Path(db_path)
+        self.router = router if router is not None else shards.HashRouter(shards.SHARD_COUNT)
+        existing = shards.existing_shards(self.db_path)
+        self.router.check(existing)
+        self.shards = {
+            key: KnowledgeBase(shards.shard_path(self.db_path, key))
+            for key in dict.fromkeys([*self.router.keys, *existing])
+        }
+        for shard in self.shards.values():
+            # One cache, so a query is encoded once rather than once per shard.
+            shard.query_embeddings = self.query_embeddings
+        self._shard_pool = ThreadPoolExecutor(
+            max_workers=max(1, min(workers, len(self.shards))), thread_name_prefix="vidmelt-shard"
+        )
+
+    def shard_for(self, video_name: str) -> KnowledgeBase:
+        return self.shards[self.router(video_name)]
+
+    def _owns(self, key: str) -> Callable[[str], bool]:
+        return lambda video_name: self.router(video_name) == key
+
+    def _each(self, call: Callable[[str, KnowledgeBase], object], keys: Optional[Iterable[str]] = None) -> dict:
+        """``{key: call(key, shard)}`` for ``keys`` (default: every shard), run on the shard pool."""
+
+        keys = list(self.shards) if keys is None else list(keys)
+        return dict(zip(keys, self._shard_pool.map(lambda key: call(key, self.shards[key]), keys)))
+
+    # Documents -----------------------------------------------------------------
+    def index_directory(self, transcripts_dir: Path, summaries_dir: Path | None = None) -> None:
+        self._each(lambda key, shard: shard.index_directory(transcripts_dir, summaries_dir, include=self._owns(key)))
+
+    def upsert_document(
+        self,
+        video_name: str,
+        transcript_path: Path,
+        summary_path: Optional[Path] = None,
+    ) -> None:
+        self.shard_for(video_name).upsert_document(video_name, transcript_path, summary_path)
+
+    def remove_document(self, video_name: str) -> None:
+        # Every shard: a copy left behind by an edited collection mapping goes too.
+        self._each(lambda _key, shard: shard.remove_document(video_name))
+
+    def update_embeddings_for(
+        self,
+        video_name: str,
+        *,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> None:
+        self.embed_documents([video_name], model_name=model_name, backend=backend)
+
+    def sync_from_directories(
+        self,
+        transcripts_dir: Path,
+        summaries_dir: Path | None = None,
+        *,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> SyncReport:
+        """Sync every shard with its share of the files at once (see :meth:`KnowledgeBase.sync_from_directories`).
+
+        A video whose shard changed, because its collection mapping was
+        edited, is removed from the old shard and added to the new one.
+        """
+
+        space = self.resolve_embedding_space(backend, model_name)
+        reports = self._each(
+            lambda key, shard: shard.sync_from_directories(
+                transcripts_dir,
+                summaries_dir,
+                model_name=space.model,
+                backend=space.backend,
+                include=self._owns(key),
+            )
+        ).values()
+        return SyncReport(
+            added=sum(report.added for report in reports),
+            updated=sum(report.updated for report in reports),
+            removed=sum(report.removed for report in reports),
+            unchanged=sum(report.unchanged for report in reports),
+        )
+
+    def rebuild_shard(
+        self,
+        key: str,
+        transcripts_dir: Path,
+        summaries_dir: Path | None = None,
+        *,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> SyncReport:
+        """Empty shard ``key`` and index and embed its videos again; the other shards keep serving."""
+
+        if key not in self.shards:
+            raise ValueError(f"unknown shard {key!r}; expected one of {', '.join(self.shards)}")
+        space = self.resolve_embedding_space(backend, model_name)
+        shard = self.shards[key]
+        shard.clear()
+        return shard.sync_from_directories(
+            transcripts_dir, summaries_dir, model_name=space.model, backend=space.backend, include=self._owns(key)
+        )
+
+    # Embeddings ----------------------------------------------------------------
+    def embedding_space(self) -> Optional[EmbeddingSpace]:
+        """The space of the stored vectors; every shard is embedded into the same one."""
+
+        for shard in self.shards.values():
+            space = shard.embedding_space()
+            if space is not None:
+                return space
+        return None
+
+    def resolve_embedding_space(
+        self,
+        backend: Optional[str] = None,
+        model_name: Optional[str] = None,
+    ) -> EmbeddingSpace:
+        return _resolve_space(self.embedding_space(), backend, model_name)
+
+    def clear_embeddings(self) -> int:
+        return sum(self._each(lambda _key, shard: shard.clear_embeddings()).values())
+
+    def embedding_coverage(self) -> tuple[int, int]:
+        coverage = self._each(lambda _key, shard: shard.embedding_coverage()).values()
+        return sum(documents for documents, _ in coverage), sum(embedded for _, embedded in coverage)
+
+    def unembedded_documents(self) -> List[str]:
+        return sorted(chain.from_iterable(self._each(lambda _key, shard: shard.unembedded_documents()).values()))
+
+    def embed_documents(
+        self,
+        video_names: Optional[Iterable[str]] = None,
+        *,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+        batch_size: int = DEFAULT_EMBED_BATCH,
+        progress: Optional[Callable[[EmbedReport], None]] = None,
+    ) -> EmbedReport:
+        """Embed ``video_names`` (default: every document) on all their shards concurrently.
+
+        Each shard batches its own documents as
+        :meth:`KnowledgeBase.embed_documents` does; ``progress`` receives the
+        combined report.
+        """
+
+        space = self.resolve_embedding_space(backend, model_name)
+        names: dict[str, Optional[List[str]]] = {}
+        if video_names is None:
+            names = dict.fromkeys(self.shards)
+        else:
+            for video_name in dict.fromkeys(video_names):
+                names.setdefault(self.router(video_name), []).append(video_name)
+        reports: dict[str, EmbedReport] = {}
+        lock = threading.Lock()
+        started = time.perf_counter()
+
+        def embed(key: str, shard: KnowledgeBase) -> EmbedReport:
+            def shard_progress(report: EmbedReport) -> None:
+                with lock:
+                    reports[key] = report
+                    if progress is not None:
+                        progress(_combine_embed_reports(reports.values(), time.perf_counter() - started))
+
+            return shard.embed_documents(
+                names[key],
+                model_name=space.model,
+                backend=space.backend,
+                batch_size=batch_size,
+                progress=shard_progress,
+            )
+
+        finished = self._each(embed, names)
+        return _combine_embed_reports(finished.values(), time.perf_counter() - started)
+
+    def build_embeddings(
+        self,
+        *,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+        batch_size: int = DEFAULT_EMBED_BATCH,
+        progress: Optional[Callable[[EmbedReport], None]] = None,
+    ) -> EmbedReport:
+        return self.embed_documents(model_name=model_name, backend=backend, batch_size=batch_size, progress=progress)
+
+    def shadow_status(self) -> Optional[ShadowStatus]:
+        """Combined progress of the shards' re-embedding, or None.
+
+        Read shard by shard rather than on the shard pool: :meth:`reembed`
+        reports progress from inside pool tasks.
+        """
+
+        statuses = [status for status in (shard.shadow_status() for shard in self.shards.values()) if status]
+        if not statuses:
+            return None
+        return ShadowStatus(
+            space=statuses[0].space,
+            documents=sum(status.documents for status in statuses),
+            embedded=sum(status.embedded for status in statuses),
+            started_at=min(status.started_at for status in statuses),
+        )
+
+    def discard_shadow(self) -> None:
+        self._each(lambda _key, shard: shard.discard_shadow())
+
+    def reembed(
+        self,
+        *,
+        backend: Optional[str] = None,
+        model_name: Optional[str] = None,
+        max_documents: int = REEMBED_DOCUMENTS,
+        pause: float = REEMBED_PAUSE,
+        batch_size: int = DEFAULT_EMBED_BATCH,
+        progress: Optional[Callable[[ShadowStatus], None]] = None,
+    ) -> ShadowStatus:
+        """Build every shard's shadow index concurrently, then swap them in back to back.
+
+        Swapping only once all shards are built keeps the window in which
+        shards answer from different models down to the swaps themselves.
+        Called again with no target, it resumes the shards still building.
+        """
+
+        resuming = backend is None and model_name is None and self.shadow_status() is not None
+        lock = threading.Lock()
+
+        def build(_key: str, shard: KnowledgeBase) -> None:
+            if resuming and shard.shadow_status() is None:
+                return
+            shard.start_reembedding(backend=backend, model_name=model_name)
+            while True:
+                status = shard.reembed_batch(max_documents=max_documents, batch_size=batch_size)
+                if progress is not None:
+                    with lock:
+                        progress(self.shadow_status())
+                if not status.pending:
+                    return
+                time.sleep(pause)
+
+        self._each(build)
+        status = self.shadow_status()
+        for shard in self.shards.values():
+            # Documents changed since their shard finished are embedded again first.
+            while shard.shadow_status() is not None and not shard.swap_shadow():
+                shard.reembed_batch(max_documents=max_documents, batch_size=batch_size)
+        if status is not None:
+            status.swapped = True
+        return status
+
+    # Vector storage --------------------------------------------------------------
+    def compact_vectors(self) -> int:
+        return sum(self._each(lambda _key, shard: shard.compact_vectors()).values())
+
+    def collect_garbage(self) -> int:
+        return sum(self._each(lambda _key, shard: shard.collect_garbage()).values())
+
+    def quantization(self) -> str:
+        return next(iter(self.shards.values())).quantization()
+
+    def quantize_vectors(self, quantization: str) -> QuantizeReport:
+        """Switch every shard's candidate scoring (see :meth:`KnowledgeBase.quantize_vectors`)."""
+
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"unknown quantization {quantization!r}; expected one of {', '.join(QUANTIZATIONS)}")
+        reports = self._each(lambda _key, shard: shard.quantize_vectors(quantization)).values()
+        return QuantizeReport(
+            quantization,
+            rows=sum(report.rows for report in reports),
+            float32_bytes=sum(report.float32_bytes for report in reports),
+            quantized_bytes=sum(report.quantized_bytes for report in reports),
+        )
+
+    # Related videos --------------------------------------------------------------
+    def related_videos(self, video_name: str, *, limit: Optional[int] = None) -> List[RelatedVideo]:
+        """Neighbours from the video's own shard's graph: collection shards keep these on topic."""
+
+        return self.shard_for(video_name).related_videos(video_name, limit=limit)
+
+    def related_neighbours(self) -> int:
+        """Neighbours kept per video, or 0 while any shard's graph is missing."""
+
+        return min(self._each(lambda _key, shard: shard.related_neighbours()).values())
+
+    def build_related_graph(self, *, neighbours: int = related.DEFAULT_NEIGHBOURS) -> RelatedReport:
+        started = time.perf_counter()
+        reports = self._each(lambda _key, shard: shard.build_related_graph(neighbours=neighbours)).values()
+        return RelatedReport(
+            videos=sum(report.videos for report in reports),
+            edges=sum(report.edges for report in reports),
+            seconds=time.perf_counter() - started,
+        )
+
+    # Search --------------------------------------------------------------------
+    def build_ann_index(self, *, nlist: Optional[int] = None) -> dict[str, ann.IVFIndex]:
+        """Train each shard's IVF index over its own embeddings; shards with none are skipped."""
+
+        keys = [key for key, shard in self.shards.items() if shard.embedding_coverage()[1]]
+        if not keys:
+            raise ValueError("no embeddings to index; run `embed` first")
+        indexes = self._each(lambda _key, shard: shard.build_ann_index(nlist=nlist), keys)
+        self.search_results.clear()
+        return indexes
+
+    def _index_version(self) -> tuple[int, ...]:
+        return tuple(part for shard in self.shards.values() for part in shard._index_version())
+
+    def _fts_matches(self, query: str, limit: int) -> List[tuple[SearchHit, float]]:
+        """Each shard's best ``limit`` full-text matches, merged by bm25.
+
+        bm25 weighs terms by their rarity within one shard, so on small or
+        skewed shards the merged order only approximates a single index's.
+        """
+
+        matches = self._each(lambda _key, shard: shard._fts_matches(query, limit)).values()
+        return heapq.nsmallest(limit, chain.from_iterable(matches), key=lambda match: match[1])
+
+    def _vector_hits(
+        self,
+        query: str,
+        limit: int,
+        *,
+        backend: Optional[str],
+        model_name: Optional[str],
+        index: str,
+        nprobe: int,
+    ) -> Optional[List[SemanticHit]]:
+        """Each shard's top ``limit`` chunks, merged by cosine distance, or None when nothing is embedded."""
+
+        space = self.embedding_space()
+        if space is None:
+            return None
+        # Warm the shared cache so the shards do not all encode the query at once.
+        next(iter(self.shards.values()))._encode_query(query, _resolve_space(space, backend, model_name))
+        found = self._each(
+            lambda _key, shard: shard._vector_hits(
+                query, limit, backend=backend, model_name=model_name, index=index, nprobe=nprobe
+            )
+        ).values()
+        hits = [shard_hits for shard_hits in found if shard_hits is not None]
+        if not hits:
+            return None
+        return heapq.nsmallest(limit, chain.from_iterable(hits), key=lambda hit: hit.score)
+
+
+def open_knowledge_base(db_path: Path | str = DEFAULT_DB_PATH) -> KnowledgeBase | ShardedKnowledgeBase:
+    """One database file, or shards of it when ``VIDMELT_KB_SHARDS`` or ``VIDMELT_KB_COLLECTIONS`` asks for them."""
+
+    router = shards.router_from_env()
+    if router is not None:
+        return ShardedKnowledgeBase(db_path, router)
+    if shards.existing_shards(Path(db_path)):
+        print(f"WARN: shard files exist next to {db_path} but sharding is not configured; they are not searched")
+    return KnowledgeBase(db_path)
 
 
 def index_documents(
@@ -300,18 +2648,73 @@ def index_documents(
     *,
     db_path: Path | str = DEFAULT_DB_PATH,
 ) -> None:
-    kb = KnowledgeBase(db_path)
+    kb = open_knowledge_base(db_path)
     kb.index_directory(transcripts_dir, summaries_dir)
 
 
 def search(query: str, *, db_path: Path | str = DEFAULT_DB_PATH, limit: int = 5) -> Iterator[SearchHit]:
-    kb = KnowledgeBase(db_path)
+    kb = open_knowledge_base(db_path)
     yield from kb.search(query, limit=limit)
 
 
-def semantic_search(query: str, *, db_path: Path | str = DEFAULT_DB_PATH, limit: int = 5) -> Iterator[SemanticHit]:
-    kb = KnowledgeBase(db_path)
-    yield from kb.semantic_search(query, limit=limit)
+def semantic_search(
+    query: str,
+    *,
+    db_path: Path | str = DEFAULT_DB_PATH,
+    limit: int = 5,
+    index: str = "exact",
+) -> Iterator[SemanticHit]:
+    kb = open_knowledge_base(db_path)
+    yield from kb.semantic_search(query, limit=limit, index=index)
+
+
+def hybrid_search(
+    query: str,
+    *,
+    db_path: Path | str = DEFAULT_DB_PATH,
+    limit: int = 5,
+    index: str = "exact",
+) -> List[SemanticHit]:
+    kb = open_knowledge_base(db_path)
+    return kb.hybrid_search(query, limit=limit, index=index)
+
+
+def format_timestamp(seconds: float) -> str:
+    """A position in a video as players show it, ``m:ss`` or ``h:mm:ss``."""
+
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def format_hit_source(hit: SemanticHit) -> str:
+    """The hit's video, with the time offset of the chunk when its transcript was timed."""
+
+    return f"{hit.video_name} @ {format_timestamp(hit.start)}" if hit.start is not None else hit.video_name
+
+
+def format_hit_scores(hit: SemanticHit) -> str:
+    parts = [f"score={hit.score:.3f}"]
+    if hit.bm25 is not None:
+        parts.append(f"bm25={hit.bm25:.3f}")
+    if hit.fused is not None:
+        parts.append(f"fused={hit.fused:.4f}")
+    return ", ".join(parts)
+
+
+def format_embed_report(report: EmbedReport) -> str:
+    return (
+        f"{report.documents}/{report.total_documents} documents, {report.chunks} chunks "
+        f"in {report.seconds:.1f}s ({report.chunks_per_second:.1f} chunks/s)"
+    )
+
+
+def format_shadow_status(status: ShadowStatus) -> str:
+    return f"{status.embedded}/{status.documents} documents re-embedded with {status.space}"
+
+
+def print_embed_progress(report: EmbedReport) -> None:
+    print(f"  batch {report.batches}: {format_embed_report(report)}", flush=True)
 
 
 def main(argv: Sequence[str] | None = None) -> int:  # pragma: no cover - CLI entry
@@ -330,13 +2733,67 @@ def main(argv: Sequence[str] | None = None) -> int:  # pragma: no cover - CLI en
 
     embed_parser = subparsers.add_parser("embed", help="Build semantic embeddings")
     embed_parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
-    embed_parser.add_argument("--model", default=DEFAULT_EMBED_MODEL)
+    embed_parser.add_argument("--backend", choices=sorted(embedders.BACKENDS), help="Default: the stored vectors' backend")
+    embed_parser.add_argument("--model", help="Default: the stored vectors' model, else the backend's default")
+    embed_parser.add_argument("--rebuild", action="store_true", help="Drop all embeddings first (needed to switch model)")
+    embed_parser.add_argument("--batch-size", type=int, default=DEFAULT_EMBED_BATCH, help="Chunks per encode call")
 
     sem_search_parser = subparsers.add_parser("semantic", help="Semantic search using embeddings")
     sem_search_parser.add_argument("query")
     sem_search_parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
     sem_search_parser.add_argument("--limit", type=int, default=5)
-    sem_search_parser.add_argument("--model", default=DEFAULT_EMBED_MODEL)
+    sem_search_parser.add_argument("--model")
+    sem_search_parser.add_argument("--backend", choices=sorted(embedders.BACKENDS))
+    sem_search_parser.add_argument("--index", choices=SEARCH_INDEXES, default="exact")
+    sem_search_parser.add_argument("--nprobe", type=int, default=ann.DEFAULT_NPROBE)
+
+    hybrid_parser = subparsers.add_parser("hybrid", help="Full-text and semantic search fused by rank")
+    hybrid_parser.add_argument("query")
+    hybrid_parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
+    hybrid_parser.add_argument("--limit", type=int, default=5)
+    hybrid_parser.add_argument("--model")
+    hybrid_parser.add_argument("--backend", choices=sorted(embedders.BACKENDS))
+    hybrid_parser.add_argument("--index", choices=SEARCH_INDEXES, default="exact")
+    hybrid_parser.add_argument("--nprobe", type=int, default=ann.DEFAULT_NPROBE)
+
+    ann_parser = subparsers.add_parser("ann", help="Build the approximate nearest-neighbour (IVF) index")
+    ann_parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
+    ann_parser.add_argument("--nlist", type=int, help="Number of inverted lists (default: 4 * sqrt(chunks))")
+
+    compact_parser = subparsers.add_parser("compact", help="Drop re-embedded rows from the vector file")
+    compact_parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
+
+    reembed_parser = subparsers.add_parser(
+        "reembed", help="Re-embed into a shadow index with another backend/model, then swap it in"
+    )
+    reembed_parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
+    reembed_parser.add_argument("--backend", choices=sorted(embedders.BACKENDS))
+    reembed_parser.add_argument("--model")
+    reembed_parser.add_argument("--documents", type=int, default=REEMBED_DOCUMENTS, help="Documents per batch")
+    reembed_parser.add_argument("--pause", type=float, default=REEMBED_PAUSE, help="Seconds between batches")
+    reembed_parser.add_argument("--batch-size", type=int, default=DEFAULT_EMBED_BATCH, help="Chunks per encode call")
+    reembed_parser.add_argument("--status", action="store_true", help="Only report progress")
+    reembed_parser.add_argument("--discard", action="store_true", help="Abandon the build in progress")
+
+    gc_parser = subparsers.add_parser("gc", help="Delete retired embeddings and unused vector files")
+    gc_parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
+
+    related_parser = subparsers.add_parser(
+        "related", help="Build the related-videos graph, or list the videos related to one"
+    )
+    related_parser.add_argument("video", nargs="?", help="Video to list neighbours for (default: rebuild the graph)")
+    related_parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
+    related_parser.add_argument("--neighbours", type=int, default=related.DEFAULT_NEIGHBOURS)
+
+    quantize_parser = subparsers.add_parser("quantize", help="Score candidates on a float16/int8 copy of the vectors")
+    quantize_parser.add_argument("mode", choices=QUANTIZATIONS)
+    quantize_parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
+
+    shards_parser = subparsers.add_parser("shards", help="List the shards, or rebuild one from the files on disk")
+    shards_parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
+    shards_parser.add_argument("--rebuild", metavar="KEY", help="Shard to empty and index again")
+    shards_parser.add_argument("--transcripts", type=Path, default=Path("transcripts"))
+    shards_parser.add_argument("--summaries", type=Path, default=Path("summaries"))
 
     args = parser.parse_args(list(argv) if argv is not None else None)
 
@@ -349,14 +2806,112 @@ def main(argv: Sequence[str] | None = None) -> int:  # pragma: no cover - CLI en
             print(f"[{hit.video_name}] {hit.snippet}")
         return 0
     if args.command == "embed":
-        kb = KnowledgeBase(args.db)
-        kb.build_embeddings(model_name=args.model)
-        print(f"Embeddings built using {args.model}")
+        kb = open_knowledge_base(args.db)
+        if args.rebuild:
+            print(f"Dropped {kb.clear_embeddings()} chunk embedding(s)")
+        report = kb.build_embeddings(
+            model_name=args.model,
+            backend=args.backend,
+            batch_size=args.batch_size,
+            progress=print_embed_progress,
+        )
+        print(f"Embeddings built using {kb.embedding_space()}: {format_embed_report(report)}")
         return 0
     if args.command == "semantic":
-        kb = KnowledgeBase(args.db)
-        for hit in kb.semantic_search(args.query, limit=args.limit, model_name=args.model):
-            print(f"[{hit.video_name}] {hit.snippet} (score={hit.score:.3f})")
+        kb = open_knowledge_base(args.db)
+        hits = kb.semantic_search(
+            args.query,
+            limit=args.limit,
+            model_name=args.model,
+            backend=args.backend,
+            index=args.index,
+            nprobe=args.nprobe,
+        )
+        for hit in hits:
+            print(f"[{format_hit_source(hit)}] {hit.snippet} (score={hit.score:.3f})")
+        return 0
+    if args.command == "hybrid":
+        kb = open_knowledge_base(args.db)
+        hits = kb.hybrid_search(
+            args.query,
+            limit=args.limit,
+            model_name=args.model,
+            backend=args.backend,
+            index=args.index,
+            nprobe=args.nprobe,
+        )
+        for hit in hits:
+            print(f"[{format_hit_source(hit)}] {hit.snippet} ({format_hit_scores(hit)})")
+        return 0
+    if args.command == "ann":
+        kb = open_knowledge_base(args.db)
+        if isinstance(kb, ShardedKnowledgeBase):
+            indexes = {kb.shards[key].ann_path: index for key, index in kb.build_ann_index(nlist=args.nlist).items()}
+        else:
+            indexes = {kb.ann_path: kb.build_ann_index(nlist=args.nlist)}
+        for path, index in indexes.items():
+            print(f"IVF index with {len(index)} chunks in {index.nlist} lists written to {path}")
+        return 0
+    if args.command == "compact":
+        kb = open_knowledge_base(args.db)
+        print(f"Dropped {kb.compact_vectors()} dead row(s) from the vector file")
+        return 0
+    if args.command == "reembed":
+        kb = open_knowledge_base(args.db)
+        if args.discard:
+            kb.discard_shadow()
+            print("Re-embedding discarded")
+            return 0
+        if args.status:
+            status = kb.shadow_status()
+            print(format_shadow_status(status) if status else f"No re-embedding in progress; live: {kb.embedding_space()}")
+            return 0
+        status = kb.reembed(
+            backend=args.backend,
+            model_name=args.model,
+            max_documents=args.documents,
+            pause=args.pause,
+            batch_size=args.batch_size,
+            progress=lambda status: print(f"  {format_shadow_status(status)}", flush=True),
+        )
+        print(f"Swapped in {kb.embedding_space()}")
+        return 0
+    if args.command == "gc":
+        kb = open_knowledge_base(args.db)
+        print(f"Deleted {kb.collect_garbage()} unused vector file(s)")
+        return 0
+    if args.command == "related":
+        kb = open_knowledge_base(args.db)
+        if args.video:
+            for video in kb.related_videos(args.video, limit=args.neighbours):
+                print(f"{video.score:.3f}  {video.video_name}")
+            return 0
+        report = kb.build_related_graph(neighbours=args.neighbours)
+        print(f"Related-videos graph: {report.videos} videos, {report.edges} edges in {report.seconds:.2f}s")
+        return 0
+    if args.command == "quantize":
+        kb = open_knowledge_base(args.db)
+        report = kb.quantize_vectors(args.mode)
+        if report.quantization == "float32":
+            print("Scoring on the float32 vectors; quantized copies removed")
+        else:
+            print(
+                f"{report.rows} row(s) stored as {report.quantization}: {report.quantized_bytes / 2**20:.1f} MiB scanned "
+                f"instead of {report.float32_bytes / 2**20:.1f} MiB ({report.ratio:.0%}); float32 kept for rescoring"
+            )
+        return 0
+    if args.command == "shards":
+        kb = open_knowledge_base(args.db)
+        if not isinstance(kb, ShardedKnowledgeBase):
+            print("Sharding is not configured; set VIDMELT_KB_SHARDS or VIDMELT_KB_COLLECTIONS")
+            return 1
+        if args.rebuild:
+            report = kb.rebuild_shard(args.rebuild, args.transcripts, args.summaries)
+            print(f"Rebuilt shard {args.rebuild}: {report.added} document(s) indexed and embedded")
+            return 0
+        for key, shard in kb.shards.items():
+            documents, embedded = shard.embedding_coverage()
+            print(f"{key:>12}  {documents} document(s), {embedded} embedded  {shard.db_path}")
         return 0
     return 1
 
@@ -0,0 +1,196 @@
+"""Per-stage resource measurement and a Prometheus text exposition of it."""
+from __future__ import annotations
+
+import contextlib
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .history import StageMetrics
+
+RSS_SAMPLE_INTERVAL = 0.1
+WALL_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+RTF_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (the peak so far where /proc is missing)."""
+
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _RssSampler(threading.Thread):
+    def __init__(self, interval: float):
+        super().__init__(name="vidmelt-rss-sampler", daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return max(self.peak, current_rss())
+
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextlib.contextmanager
+def measure(stage: str, model: str, *, rss_interval: float = RSS_SAMPLE_INTERVAL) -> Iterator[StageMetrics]:
+    """Time the body and fill in wall time, CPU time and peak RSS.
+
+    CPU time is that of the calling thread plus any child processes (ffmpeg)
+    reaped meanwhile; with stages running concurrently the children share is
+    approximate.  Long-lived pool processes such as the transcription chunk
+    workers are never reaped, so callers add the time they report.  Peak RSS
+    is sampled process-wide every ``rss_interval`` seconds.
+    """
+
+    sample = StageMetrics(stage=stage, model=model)
+    sampler = _RssSampler(rss_interval)
+    sampler.start()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time() + _children_cpu()
+    try:
+        yield sample
+    finally:
+        sample.wall_seconds = time.perf_counter() - wall_start
+        sample.cpu_seconds = time.thread_time() + _children_cpu() - cpu_start
+        sample.peak_rss_bytes = sampler.stop()
+
+
+def _labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _key, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _value), value in zip(pairs, escaped)) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_metric(name: str, kind: str, help_text: str, samples: Iterable[Tuple[Sequence[Tuple[str, str]], float]]) -> str:
+    """Render one metric family in the Prometheus text format."""
+
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.total += value
+
+
+class MetricsRegistry:
+    """In-process counters and histograms fed by :func:`measure` results."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._runs: Dict[Tuple[str, str, str], int] = {}
+        self._cpu: Dict[Tuple[str, str], float] = {}
+        self._input: Dict[Tuple[str, str], int] = {}
+        self._audio: Dict[Tuple[str, str], float] = {}
+        self._peak_rss: Dict[str, int] = {}
+        self._wall: Dict[Tuple[str, str], _Histogram] = {}
+        self._rtf: Dict[Tuple[str, str], _Histogram] = {}
+
+    def observe(self, sample: StageMetrics) -> None:
+        key = (sample.stage, sample.model)
+        status = "ok" if sample.ok else "failed"
+        with self._lock:
+            self._runs[key + (status,)] = self._runs.get(key + (status,), 0) + 1
+            self._cpu[key] = self._cpu.get(key, 0.0) + sample.cpu_seconds
+            self._input[key] = self._input.get(key, 0) + sample.input_bytes
+            self._peak_rss[sample.stage] = max(self._peak_rss.get(sample.stage, 0), sample.peak_rss_bytes)
+            self._wall.setdefault(key, _Histogram(WALL_BUCKETS)).observe(sample.wall_seconds)
+            if sample.ok and sample.audio_seconds:
+                self._audio[key] = self._audio.get(key, 0.0) + sample.audio_seconds
+                self._rtf.setdefault(key, _Histogram(RTF_BUCKETS)).observe(sample.real_time_factor)
+
+    @staticmethod
+    def _histogram_lines(name: str, help_text: str, histograms: Dict[Tuple[str, str], _Histogram]) -> str:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (stage, model), hist in sorted(histograms.items()):
+            base = [("stage", stage), ("model", model)]
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f"{name}_bucket{_labels(base + [('le', _number(float(bound)))])} {count}")
+            lines.append(f"{name}_bucket{_labels(base + [('le', '+Inf')])} {hist.count}")
+            lines.append(f"{name}_sum{_labels(base)} {_number(hist.total)}")
+            lines.append(f"{name}_count{_labels(base)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def render(self) -> str:
+        with self._lock:
+            def pairs(values: Dict[Tuple[str, str], float]) -> List[Tuple[Sequence[Tuple[str, str]], float]]:
+                return [([("stage", stage), ("model", model)], value) for (stage, model), value in sorted(values.items())]
+
+            parts = [
+                format_metric(
+                    "vidmelt_stage_runs_total",
+                    "counter",
+                    "Pipeline stage runs by outcome.",
+                    [
+                        ([("stage", stage), ("model", model), ("status", status)], count)
+                        for (stage, model, status), count in sorted(self._runs.items())
+                    ],
+                ),
+                self._histogram_lines("vidmelt_stage_wall_seconds", "Wall-clock time per stage run.", self._wall),
+                format_metric("vidmelt_stage_cpu_seconds_total", "counter", "CPU time spent in stages.", pairs(self._cpu)),
+                format_metric("vidmelt_stage_input_bytes_total", "counter", "Bytes read by stages.", pairs(self._input)),
+                format_metric("vidmelt_stage_audio_seconds_total", "counter", "Seconds of audio handled by stages.", pairs(self._audio)),
+                format_metric(
+                    "vidmelt_stage_peak_rss_bytes",
+                    "gauge",
+                    "Highest process RSS observed while a stage ran.",
+                    [([("stage", stage)], value) for stage, value in sorted(self._peak_rss.items())],
+                ),
+                self._histogram_lines(
+                    "vidmelt_stage_real_time_factor",
+                    "Stage wall time divided by audio duration.",
+                    self._rtf,
+                ),
+            ]
+        return "".join(parts)
+
+
+GLOBAL_REGISTRY = MetricsRegistry()
+
+
+def record(job_store, job_id: int, sample: StageMetrics, registry: Optional[MetricsRegistry] = None) -> None:
+    """Persist ``sample`` for the job and add it to the scrape registry."""
+
+    (registry or GLOBAL_REGISTRY).observe(sample)
+    try:
+        job_store.record_stage_metrics(job_id, sample)
+    except Exception as exc:  # metrics must never fail a job
+        print(f"WARN: could not store {sample.stage} metrics for job {job_id}: {exc}")
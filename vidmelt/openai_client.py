@@ -0,0 +1,220 @@
+"""Process-wide OpenAI client with rate limiting, retries and counters."""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Optional
+
+import openai
+
+DEFAULT_RPM = int(os.getenv("VIDMELT_OPENAI_RPM", "500"))
+DEFAULT_TPM = int(os.getenv("VIDMELT_OPENAI_TPM", "30000"))
+DEFAULT_MAX_RETRIES = int(os.getenv("VIDMELT_OPENAI_MAX_RETRIES", "5"))
+DEFAULT_CONCURRENCY = int(os.getenv("VIDMELT_OPENAI_CONCURRENCY", "8"))
+DEFAULT_COMPLETION_ALLOWANCE = 512
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``per_minute`` tokens per minute."""
+
+    def __init__(
+        self,
+        per_minute: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.capacity = float(per_minute)
+        self._rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until ``amount`` tokens are available; return the seconds waited."""
+
+        if self.capacity <= 0:
+            return 0.0
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self._rate
+            self._sleep(delay)
+            waited += delay
+
+
+@dataclass
+class ClientStats:
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    throttled_seconds: float = 0.0
+    backoff_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+def estimate_tokens(kwargs: dict) -> int:
+    """Rough request size (prompt chars / 4 plus the completion allowance)."""
+
+    chars = 0
+    for message in kwargs.get("messages") or []:
+        content = message.get("content", "") if isinstance(message, dict) else ""
+        chars += len(content) if isinstance(content, str) else len(str(content))
+    payload = kwargs.get("input")
+    if isinstance(payload, str):
+        chars += len(payload)
+    elif isinstance(payload, list):
+        chars += sum(len(str(item.get("content", "")) if isinstance(item, dict) else str(item)) for item in payload)
+    if not chars:
+        return 0
+    allowance = kwargs.get("max_tokens") or kwargs.get("max_output_tokens") or DEFAULT_COMPLETION_ALLOWANCE
+    return chars // 4 + int(allowance)
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class _ResourceProxy:
+    def __init__(self, owner: "RateLimitedClient", target: Any):
+        self._owner = owner
+        self._target = target
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if callable(attr) and not isinstance(attr, type):
+            return lambda *args, **kwargs: self._owner.call(attr, *args, **kwargs)
+        return _ResourceProxy(self._owner, attr)
+
+
+class RateLimitedClient:
+    """Share one ``openai.OpenAI`` (and its keep-alive connection pool) per process.
+
+    Every API call made through the proxy, e.g.
+    ``client.chat.completions.create(...)``, first takes a slot from a
+    concurrency semaphore and from request- and token-per-minute buckets, then
+    retries 429/5xx/connection errors with full-jitter exponential backoff.
+    The SDK's own retries are disabled so retries are coordinated here.
+    """
+
+    def __init__(
+        self,
+        client_factory: Optional[Callable[[], Any]] = None,
+        *,
+        rpm: int = DEFAULT_RPM,
+        tpm: int = DEFAULT_TPM,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[], float] = random.random,
+    ):
+        self._factory = client_factory or (lambda: openai.OpenAI(max_retries=0))
+        self._client: Any = None
+        self._client_lock = threading.Lock()
+        self._requests = TokenBucket(rpm, sleep=sleep)
+        self._tokens = TokenBucket(tpm, sleep=sleep)
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._max_retries = max_retries
+        self._sleep = sleep
+        self._jitter = jitter
+        self._stats = ClientStats()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        with self._client_lock:
+            if self._client is None:
+                self._client = self._factory()
+            return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _ResourceProxy(self, getattr(self.client, name))
+
+    def _count(self, **deltas: float) -> None:
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                setattr(self._stats, key, getattr(self._stats, key) + delta)
+
+    def stats(self) -> ClientStats:
+        with self._stats_lock:
+            return ClientStats(**asdict(self._stats))
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        tokens = estimate_tokens(kwargs)
+        attempt = 0
+        while True:
+            throttled = self._requests.acquire(1)
+            if tokens:
+                throttled += self._tokens.acquire(tokens)
+            self._count(requests=1, throttled_seconds=throttled)
+            try:
+                with self._slots:
+                    response = fn(*args, **kwargs)
+            except RETRYABLE_ERRORS as exc:
+                if attempt >= self._max_retries:
+                    self._count(failures=1)
+                    raise
+                delay = _retry_after(exc)
+                if delay is None:
+                    delay = self._jitter() * min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt))
+                attempt += 1
+                self._count(retries=1, backoff_seconds=delay)
+                self._sleep(delay)
+                continue
+            except Exception:
+                self._count(failures=1)
+                raise
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self._count(
+                    prompt_tokens=getattr(usage, "prompt_tokens", 0) or getattr(usage, "input_tokens", 0) or 0,
+                    completion_tokens=getattr(usage, "completion_tokens", 0) or getattr(usage, "output_tokens", 0) or 0,
+                )
+            return response
+
+
+_SHARED: Optional[RateLimitedClient] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_client() -> RateLimitedClient:
+    """Return the process-wide rate-limited client, creating it on first use."""
+
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = RateLimitedClient()
+        return _SHARED
@@ -3,14 +3,14 @@ from __future__ import annotations
 
 import shutil
 import subprocess
-import sys
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Callable, Optional
 
-import openai
+import numpy as np
 
-from summarize import SummarizationError, summarize_transcript
-from vidmelt import history, knowledge
+from summarize import SummarizationError, SummaryResult, summarize_transcript, summary_variant
+from vidmelt import artifacts, audio, embedqueue, history, knowledge, metrics, openai_client, transcriber
 
 Publisher = Callable[[dict[str, str], str], None]
 
@@ -45,7 +45,87 @@ def _write_log(video_name: str, stage: str, stdout: Optional[str], stderr: Optio
     log_path.write_text("\n\n".join(content) + "\n")
 
 
-def process_video(
+def _load_audio(
+    video_path: Path,
+    audio_path: Path,
+    publish: Optional[Publisher],
+    *,
+    keep_audio: bool,
+    artifact_store: artifacts.ArtifactStore,
+    content_key: Optional[str],
+) -> np.ndarray:
+    """Return 16 kHz mono samples, preferring a cached WAV over decoding again."""
+
+    if artifact_store.is_reusable(audio_path, content_key) and audio_path.stat().st_size > 0:
+        return transcriber.load_wav(audio_path)
+    cached = artifact_store.lookup(content_key, "audio") if content_key else None
+    if cached is not None:
+        return transcriber.load_wav(cached)
+
+    video_name = video_path.stem
+    _emit(publish, "update", f"Extracting audio from {video_name}... This might take a moment, our digital ears are tuning in! 🎧", "🎶")
+    extracted = audio.extract_pcm(video_path, cache_path=audio_path if keep_audio else None)
+    _emit(publish, "update", f"Audio extracted: {extracted.duration:.1f}s streamed from {video_path.name} - Success! Our digital ears are happy. 🎉", "✅")
+    _write_log(video_name, "ffmpeg", None, extracted.log)
+    if keep_audio and content_key:
+        artifact_store.record(content_key, "audio", audio_path)
+    return extracted.samples
+
+
+def _reuse_artifact(
+    artifact_store: artifacts.ArtifactStore,
+    content_key: Optional[str],
+    kind: str,
+    path: Path,
+    variant: str,
+    *,
+    allow_legacy: bool,
+) -> bool:
+    """Make a cached artifact available at ``path``; legacy files are only trusted if unowned."""
+
+    if content_key is None:
+        return allow_legacy and path.exists()
+    if artifact_store.materialize(content_key, kind, path, variant):
+        return True
+    if allow_legacy and path.exists() and artifact_store.owner(path) is None:
+        artifact_store.record(content_key, kind, path, variant)
+        return True
+    return False
+
+
+@dataclass
+class VideoJob:
+    """State carried between the extract, transcribe, summarize and index stages."""
+
+    video_path: Path
+    transcription_model: str
+    publish: Optional[Publisher]
+    job_store: history.JobStore
+    knowledge_base: knowledge.KnowledgeBase
+    artifact_store: artifacts.ArtifactStore
+    job_id: int
+    content_key: Optional[str] = None
+    embedder: Optional[embedqueue.EmbeddingQueue] = None
+    chunk_workers: int = transcriber.DEFAULT_CHUNK_WORKERS
+    chunk_seconds: float = transcriber.DEFAULT_CHUNK_SECONDS
+    keep_audio: bool = audio.KEEP_AUDIO
+    transcript_cached: bool = False
+    audio_seconds: Optional[float] = None
+    # CPU time the current stage spent in other long-lived processes (chunk workers).
+    worker_cpu_seconds: float = 0.0
+    samples: Optional[np.ndarray] = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        self.video_name = self.video_path.stem
+        self.audio_path = AUDIO_DIR / f"{self.video_name}.wav"
+        self.transcript_path = TRANSCRIPT_DIR / f"{self.video_name}.txt"
+        self.summary_path = SUMMARY_DIR / f"{self.video_name}.md"
+
+    def emit(self, event_type: str, message: str, icon: str | None = None) -> None:
+        _emit(self.publish, event_type, message, icon)
+
+
+def prepare_job(
     video_path: Path,
     transcription_model: str,
     publish: Optional[Publisher] = None,
@@ -53,115 +133,284 @@ def process_video(
     job_store: Optional[history.JobStore] = None,
     knowledge_base: Optional[knowledge.KnowledgeBase] = None,
     job_id: Optional[int] = None,
-) -> bool:
-    """Process a single video and return True on success."""
+    chunk_workers: int = transcriber.DEFAULT_CHUNK_WORKERS,
+    chunk_seconds: float = transcriber.DEFAULT_CHUNK_SECONDS,
+    keep_audio: bool = audio.KEEP_AUDIO,
+    artifact_store: Optional[artifacts.ArtifactStore] = None,
+    content_digest: Optional[str] = None,
+    embedder: Optional[embedqueue.EmbeddingQueue] = None,
+    on_recorded: Optional[Callable[[int], None]] = None,
+) -> Optional[VideoJob]:
+    """Check prerequisites and record the job start; returns None if it cannot run.
+
+    With an ``embedder`` the index stage only queues the video for embedding;
+    without one it embeds inline before the job completes.  A ``job_id``
+    retries that history row; otherwise a new row is recorded and its id
+    passed to ``on_recorded``.
+    """
 
     if shutil.which("ffmpeg") is None:
         msg = "Oops! FFmpeg is playing hide-and-seek. Please install it and try again! 🕵️‍♂️"
         _emit(publish, "error", msg, "❌")
-        return False
+        return None
 
-    video_name = video_path.stem
-    audio_path = AUDIO_DIR / f"{video_name}.wav"
-    transcript_path = TRANSCRIPT_DIR / f"{video_name}.txt"
-    summary_path = SUMMARY_DIR / f"{video_name}.md"
     job_store = job_store or history.GLOBAL_STORE
-    knowledge_base = knowledge_base or knowledge.KnowledgeBase()
+    knowledge_base = knowledge_base or knowledge.open_knowledge_base()
+    artifact_store = artifact_store or artifacts.GLOBAL_STORE
+    content_key = (
+        artifact_store.resolve(video_path, full_hash=content_digest) if video_path.exists() else None
+    )
     if job_id is None:
         job_id = job_store.record_start(video_path, transcription_model)
+        if on_recorded is not None:
+            on_recorded(job_id)
     else:
         job_store.record_retry(job_id)
 
-    try:
-        if not audio_path.exists():
-            _emit(publish, "update", f"Extracting audio from {video_name}... This might take a moment, our digital ears are tuning in! 🎧", "🎶")
-            ffmpeg_result = subprocess.run([
-                "ffmpeg",
-                "-i", str(video_path),
-                "-vn",
-                "-acodec", "pcm_s16le",
-                "-ar", "16000",
-                "-ac", "1",
-                str(audio_path)
-            ], check=True, capture_output=True, text=True)
-            _emit(publish, "update", f"Audio extracted: {audio_path.name} - Success! Our digital ears are happy. 🎉", "✅")
-            _write_log(video_name, "ffmpeg", ffmpeg_result.stdout, ffmpeg_result.stderr)
-
-        if not audio_path.exists() or audio_path.stat().st_size == 0:
-            msg = f"Error: Audio file {audio_path.name} was not created or is empty. Cannot proceed with transcription. 🚫"
-            _emit(publish, "error", msg, "❌")
-            return False
-
-        transcript_exists = transcript_path.exists()
-        _emit(publish, "update", f"Checking if transcript exists: {transcript_exists}")
-
-        if not transcript_exists:
-            _emit(publish, "update", f"Transcribing audio for {video_name}... Our AI is listening intently! 👂", "✍️")
-
-            if transcription_model.startswith('whisper-') and transcription_model != 'whisper-api':
-                model_name = transcription_model.split('-')[1]
-                whisper_result = subprocess.run([
-                    sys.executable, "-m", "whisper",
-                    str(audio_path),
-                    "--model", model_name,
-                    "--language", "en",
-                    "--output_dir", str(TRANSCRIPT_DIR)
-                ], check=True, capture_output=True, text=True)
-                _write_log(video_name, f"whisper-{model_name}", whisper_result.stdout, whisper_result.stderr)
-            elif transcription_model == 'whisper-api':
-                client = openai.OpenAI()
-                with open(audio_path, "rb") as audio_file:
-                    transcript_response = client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file
-                    )
-                with open(transcript_path, "w") as f:
-                    f.write(transcript_response.text)
-            else:
-                msg = f"Invalid transcription model selected: {transcription_model}"
-                _emit(publish, "error", msg, "❌")
-                raise ValueError(msg)
+    return VideoJob(
+        video_path=video_path,
+        transcription_model=transcription_model,
+        publish=publish,
+        job_store=job_store,
+        knowledge_base=knowledge_base,
+        artifact_store=artifact_store,
+        job_id=job_id,
+        content_key=content_key,
+        embedder=embedder,
+        chunk_workers=chunk_workers,
+        chunk_seconds=chunk_seconds,
+        keep_audio=keep_audio,
+    )
+
+
+def extract_stage(job: VideoJob) -> bool:
+    """Reuse a cached transcript or decode the audio needed to produce one."""
+
+    job.transcript_cached = _reuse_artifact(
+        job.artifact_store,
+        job.content_key,
+        "transcript",
+        job.transcript_path,
+        job.transcription_model,
+        allow_legacy=True,
+    )
+    job.emit("update", f"Checking if transcript exists: {job.transcript_cached}")
+    if job.transcript_cached:
+        return True
 
-            transcript_exists = transcript_path.exists()
+    job.samples = _load_audio(
+        job.video_path,
+        job.audio_path,
+        job.publish,
+        keep_audio=job.keep_audio,
+        artifact_store=job.artifact_store,
+        content_key=job.content_key,
+    )
+    if job.samples.size == 0:
+        msg = f"Error: No audio could be extracted from {job.video_path.name}. Cannot proceed with transcription. 🚫"
+        job.emit("error", msg, "❌")
+        return False
+    job.audio_seconds = job.samples.size / audio.SAMPLE_RATE
+    return True
+
+
+def transcribe_stage(job: VideoJob) -> bool:
+    video_name = job.video_name
+    transcript_path = job.transcript_path
+    transcription_model = job.transcription_model
+
+    if job.transcript_cached:
+        job.emit("update", f"Transcript found for {video_name}, skipping re-transcription. 📝", "🗂️")
+    else:
+        samples, job.samples = job.samples, None
+        job.emit("update", f"Transcribing audio for {video_name}... Our AI is listening intently! 👂", "✍️")
+
+        if transcription_model.startswith('whisper-') and transcription_model != 'whisper-api':
+            model_name = transcription_model.split('-')[1]
+            if job.chunk_workers > 1:
+                whisper_result = transcriber.transcribe_chunked(
+                    samples,
+                    model_name,
+                    workers=job.chunk_workers,
+                    chunk_seconds=job.chunk_seconds,
+                )
+                job.worker_cpu_seconds = whisper_result.cpu_seconds
+            else:
+                whisper_result = transcriber.GLOBAL_POOL.transcribe(samples, model_name)
+            transcriber.write_transcript(whisper_result, transcript_path)
+            _write_log(video_name, f"whisper-{model_name}", whisper_result.format_log(), None)
+        elif transcription_model == 'whisper-api':
+            client = openai_client.shared_client()
+            transcript_response = client.audio.transcriptions.create(
+                model="whisper-1",
+                file=(job.audio_path.name, audio.to_wav_bytes(samples)),
+            )
+            with open(transcript_path, "w") as f:
+                f.write(transcript_response.text)
+            # The API returns plain text; drop timestamps left by an earlier local transcription.
+            transcriber.segments_path(transcript_path).unlink(missing_ok=True)
         else:
-            _emit(publish, "update", f"Transcript found for {video_name}, skipping re-transcription. 📝", "🗂️")
-
-        if not transcript_exists or transcript_path.stat().st_size == 0:
-            msg = f"Transcription failed for {video_name}; no transcript was produced. ❌"
-            _emit(publish, "error", msg, "❌")
-            return False
-
-        _emit(publish, "update", f"Audio transcribed: {transcript_path.name} - Phew, that was a lot of words! 📝", "✅")
-
-        _emit(publish, "update", f"Summarizing transcript for {video_name}... Our AI is brewing some wisdom! 🧠", "✨")
-        try:
-            summarize_transcript(transcript_path, video_name)
-        except SummarizationError as err:
-            msg = f"Summarization failed for {video_name}: {err}"
-            _emit(publish, "error", msg, "❌")
-            job_store.record_failure(job_id, msg)
-            return False
-
-        _emit(publish, "update", f"Summary created for {video_name}. - Ta-da! Your insights are ready! 🌟", "✅")
-        _emit(publish, "complete", (
-            "Completed! "
-            f"<a href='/summaries/{summary_path.name}' target='_blank'>Download Summary</a> | "
-            f"<a href='/transcripts/{transcript_path.name}' target='_blank'>Download Transcript</a> - Mission accomplished! 🚀"
-        ), "🎉")
-        job_store.record_success(job_id, summary_path)
-        knowledge_base.upsert_document(video_name, transcript_path, summary_path)
-        knowledge_base.update_embeddings_for(video_name)
+            msg = f"Invalid transcription model selected: {transcription_model}"
+            job.emit("error", msg, "❌")
+            raise ValueError(msg)
+
+        if transcript_path.exists() and job.content_key:
+            job.artifact_store.record(job.content_key, "transcript", transcript_path, transcription_model)
+
+    if not transcript_path.exists() or transcript_path.stat().st_size == 0:
+        msg = f"Transcription failed for {video_name}; no transcript was produced. ❌"
+        job.emit("error", msg, "❌")
+        return False
+
+    job.emit("update", f"Audio transcribed: {transcript_path.name} - Phew, that was a lot of words! 📝", "✅")
+    return True
+
+
+def summarize_stage(job: VideoJob) -> bool:
+    video_name = job.video_name
+    variant = summary_variant()
+    if _reuse_artifact(job.artifact_store, job.content_key, "summary", job.summary_path, variant, allow_legacy=False):
+        job.emit("update", f"Summary found for {video_name}, skipping re-summarization. 🗂️", "🗂️")
         return True
 
+    job.emit("update", f"Summarizing transcript for {video_name}... Our AI is brewing some wisdom! 🧠", "✨")
+    try:
+        result = summarize_transcript(job.transcript_path, video_name)
+    except SummarizationError as err:
+        msg = f"Summarization failed for {video_name}: {err}"
+        job.emit("error", msg, "❌")
+        job.job_store.record_failure(job.job_id, msg)
+        return False
+    if isinstance(result, SummaryResult) and result.cached:
+        saved_tokens = result.prompt_tokens + result.completion_tokens
+        job.job_store.record_summary_cache_hit(job.job_id, saved_tokens, result.latency)
+        job.emit("update", f"Summary for {video_name} reused from cache (~{saved_tokens} tokens, {result.latency:.1f}s saved). ♻️", "♻️")
+    if job.content_key and job.summary_path.exists():
+        job.artifact_store.record(job.content_key, "summary", job.summary_path, variant)
+
+    job.emit("update", f"Summary created for {video_name}. - Ta-da! Your insights are ready! 🌟", "✅")
+    return True
+
+
+def index_stage(job: VideoJob) -> bool:
+    job.knowledge_base.upsert_document(job.video_name, job.transcript_path, job.summary_path)
+    if job.embedder is not None:
+        job.embedder.submit(job.video_name)
+    else:
+        job.knowledge_base.update_embeddings_for(job.video_name)
+    job.job_store.record_success(job.job_id, job.summary_path)
+    job.emit("complete", (
+        "Completed! "
+        f"<a href='/summaries/{job.summary_path.name}' target='_blank'>Download Summary</a> | "
+        f"<a href='/transcripts/{job.transcript_path.name}' target='_blank'>Download Transcript</a> - Mission accomplished! 🚀"
+    ), "🎉")
+    return True
+
+
+STAGES: tuple[tuple[str, Callable[[VideoJob], bool]], ...] = (
+    ("extract", extract_stage),
+    ("transcribe", transcribe_stage),
+    ("summarize", summarize_stage),
+    ("index", index_stage),
+)
+
+
+def _file_size(*paths: Path) -> int:
+    return sum(path.stat().st_size for path in paths if path.exists())
+
+
+def _stage_input_bytes(job: VideoJob, name: str) -> int:
+    if name == "extract":
+        return _file_size(job.video_path)
+    if name == "transcribe":
+        return int(job.samples.nbytes) if job.samples is not None else 0
+    if name == "summarize":
+        return _file_size(job.transcript_path)
+    return _file_size(job.transcript_path, job.summary_path)
+
+
+def _guarded(job: VideoJob, stage: Callable[[VideoJob], bool]) -> bool:
+    try:
+        return stage(job)
     except subprocess.CalledProcessError as exc:
         msg = (
             "Uh oh! A tool ran into trouble! 🛠️\n"
             f"Command: {exc.cmd}\nReturn Code: {exc.returncode}\nStdout: {exc.stdout}\nStderr: {exc.stderr} 💥"
         )
-        _emit(publish, "error", msg, "❌")
-        job_store.record_failure(job_id, msg)
+        job.emit("error", msg, "❌")
+        job.job_store.record_failure(job.job_id, msg)
         return False
     except Exception as exc:  # pragma: no cover - defensive
-        _emit(publish, "error", f"An unexpected error occurred: {exc}", "❌")
-        job_store.record_failure(job_id, str(exc))
+        job.emit("error", f"An unexpected error occurred: {exc}", "❌")
+        job.job_store.record_failure(job.job_id, str(exc))
+        return False
+
+
+def run_stage(job: VideoJob, stage: Callable[[VideoJob], bool]) -> bool:
+    """Run one stage, turning tool and unexpected errors into failure events.
+
+    Wall time, CPU time, peak RSS, input bytes and (for audio stages) the
+    audio duration are recorded per job in the history store and exported
+    through :data:`metrics.GLOBAL_REGISTRY`.  CPU time includes what the
+    stage's chunk workers report.
+    """
+
+    name = getattr(stage, "__name__", "stage").removesuffix("_stage")
+    with metrics.measure(name, job.transcription_model) as sample:
+        sample.input_bytes = _stage_input_bytes(job, name)
+        sample.ok = bool(_guarded(job, stage))
+    sample.cpu_seconds += job.worker_cpu_seconds
+    job.worker_cpu_seconds = 0.0
+    if name in ("extract", "transcribe") and not job.transcript_cached:
+        sample.audio_seconds = job.audio_seconds
+    metrics.record(job.job_store, job.job_id, sample)
+    return sample.ok
+
+
+def process_video(
+    video_path: Path,
+    transcription_model: str,
+    publish: Optional[Publisher] = None,
+    *,
+    job_store: Optional[history.JobStore] = None,
+    knowledge_base: Optional[knowledge.KnowledgeBase] = None,
+    job_id: Optional[int] = None,
+    chunk_workers: int = transcriber.DEFAULT_CHUNK_WORKERS,
+    chunk_seconds: float = transcriber.DEFAULT_CHUNK_SECONDS,
+    keep_audio: bool = audio.KEEP_AUDIO,
+    artifact_store: Optional[artifacts.ArtifactStore] = None,
+    content_digest: Optional[str] = None,
+    embedder: Optional[embedqueue.EmbeddingQueue] = None,
+    on_recorded: Optional[Callable[[int], None]] = None,
+) -> bool:
+    """Process a single video and return True on success.
+
+    Audio is decoded from an ffmpeg pipe straight into memory; with
+    ``keep_audio`` the WAV is also cached in ``AUDIO_DIR`` for later runs.
+    With ``chunk_workers`` above one, local Whisper transcription splits the
+    audio at silences and transcribes the pieces on a process pool.
+
+    Artifacts are looked up by video content (``content_digest`` is the full
+    SHA-256 when the caller already computed it), so re-uploads under another
+    name reuse earlier work and same-named videos never share results.
+    Keyword options are those of :func:`prepare_job`.
+    """
+
+    job = prepare_job(
+        video_path,
+        transcription_model,
+        publish,
+        job_store=job_store,
+        knowledge_base=knowledge_base,
+        job_id=job_id,
+        chunk_workers=chunk_workers,
+        chunk_seconds=chunk_seconds,
+        keep_audio=keep_audio,
+        artifact_store=artifact_store,
+        content_digest=content_digest,
+        embedder=embedder,
+        on_recorded=on_recorded,
+    )
+    if job is None:
         return False
+    return all(run_stage(job, stage) for _name, stage in STAGES)
@@ -0,0 +1,117 @@
+"""In-process LRU caches with a TTL for query embeddings and retrieval results."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Hashable, Optional
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("VIDMELT_QUERY_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_TTL = float(os.getenv("VIDMELT_QUERY_CACHE_TTL", "3600"))
+RESULT_CACHE_SIZE = int(os.getenv("VIDMELT_RESULT_CACHE_SIZE", "512"))
+RESULT_CACHE_TTL = float(os.getenv("VIDMELT_RESULT_CACHE_TTL", "600"))
+
+
+def normalize_query(text: str) -> str:
+    """Fold case, Unicode forms and whitespace so trivially different questions share an entry."""
+
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    size: int = 0
+    capacity: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "hit_rate": self.hit_rate}
+
+
+class LRUCache:
+    """A thread-safe mapping that keeps at most ``capacity`` entries for ``ttl`` seconds.
+
+    Lookups move an entry to the most-recently-used end; inserting past the
+    cap evicts from the other end.  Expired entries are dropped when they are
+    looked up.  ``capacity <= 0`` disables the cache (every lookup misses).
+
+    :meth:`validate` ties the contents to a version token: when the token
+    differs from the one the entries were stored under, everything is
+    dropped at once, so stale results cannot outlive an index change.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        ttl: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._stats = CacheStats(capacity=capacity)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The cached value, or None (counted as a miss)."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                self._stats.expirations += 1
+                entry = None
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def validate(self, version: Hashable) -> None:
+        """Drop every entry if ``version`` differs from the one they were cached under."""
+
+        with self._lock:
+            if version == self._version:
+                return
+            if self._entries:
+                self._stats.invalidations += 1
+                self._entries.clear()
+            self._version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**{**asdict(self._stats), "size": len(self._entries)})
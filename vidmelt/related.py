@@ -0,0 +1,63 @@
+"""Per-video centroid embeddings and their top-N cosine-similarity neighbours."""
+from __future__ import annotations
+
+import os
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_NEIGHBOURS = int(os.getenv("VIDMELT_RELATED_NEIGHBOURS", "10"))
+# Upper bound on one block of the centroid-by-centroid score matrix.
+BLOCK_BYTES = int(os.getenv("VIDMELT_RELATED_BLOCK_BYTES", str(64 << 20)))
+
+
+def centroid(vectors: np.ndarray) -> np.ndarray:
+    """Unit-normalized mean of a video's (unit) chunk vectors."""
+
+    mean = np.asarray(vectors, dtype=np.float32).mean(axis=0)
+    norm = np.linalg.norm(mean)
+    return mean / norm if norm > 0 else mean
+
+
+def block_rows(count: int, *, block_bytes: int = BLOCK_BYTES) -> int:
+    """Rows of the score matrix computed per product so one block stays within ``block_bytes``."""
+
+    return max(1, block_bytes // (4 * max(count, 1)))
+
+
+def top_neighbours(
+    centroids: np.ndarray,
+    k: int,
+    rows: Optional[Sequence[int]] = None,
+    *,
+    block_bytes: int = BLOCK_BYTES,
+) -> Iterator[tuple[int, np.ndarray, np.ndarray]]:
+    """Yield ``(row, neighbour rows, similarities)`` best first for ``rows`` (default: all).
+
+    Scores come from one ``centroids[block] @ centroids.T`` product per
+    block of rows, sized by :func:`block_rows`, so memory stays bounded
+    however many videos there are.  A row is never its own neighbour.
+    """
+
+    centroids = np.asarray(centroids, dtype=np.float32)
+    rows = np.arange(len(centroids)) if rows is None else np.asarray(rows, dtype=np.int64)
+    k = min(k, len(centroids) - 1)
+    step = block_rows(len(centroids), block_bytes=block_bytes)
+    for start in range(0, len(rows), step):
+        block = rows[start : start + step]
+        if k <= 0:
+            for row in block.tolist():
+                yield row, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            continue
+        scores = centroids[block] @ centroids.T
+        scores[np.arange(len(block)), block] = -np.inf
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(scores.shape[1]), (len(block), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for i, row in enumerate(block.tolist()):
+            yield row, top[i], top_scores[i]
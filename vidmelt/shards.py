@@ -0,0 +1,106 @@
+"""Routing of videos to knowledge-base shard files, by name hash or by collection."""
+from __future__ import annotations
+
+import json
+import os
+import re
+import zlib
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Iterable, List, Mapping, Optional, Union
+
+SHARD_COUNT = int(os.getenv("VIDMELT_KB_SHARDS", "1"))
+# JSON object mapping video-name glob patterns to collection names; first match wins.
+COLLECTIONS_PATH = os.getenv("VIDMELT_KB_COLLECTIONS", "")
+SHARD_WORKERS = int(os.getenv("VIDMELT_SHARD_WORKERS", str(min(8, os.cpu_count() or 1))))
+DEFAULT_COLLECTION = "default"
+
+_SHARD_KEY = re.compile(r"^[\w-]+$")
+
+
+def shard_path(db_path: Path, key: str) -> Path:
+    """The database file of shard ``key``, e.g. ``vidmelt_kb.shard-0.sqlite3``."""
+
+    return db_path.with_name(f"{db_path.stem}.shard-{key}{db_path.suffix}")
+
+
+def existing_shards(db_path: Path) -> List[str]:
+    """Keys of the shard files already next to ``db_path``."""
+
+    prefix = f"{db_path.stem}.shard-"
+    keys = []
+    for path in sorted(db_path.parent.glob(f"{prefix}*{db_path.suffix}")):
+        key = path.name[len(prefix) : len(path.name) - len(db_path.suffix)]
+        if _SHARD_KEY.match(key):
+            keys.append(key)
+    return keys
+
+
+class HashRouter:
+    """Spread videos evenly over ``count`` shards by the CRC-32 of their name."""
+
+    def __init__(self, count: int):
+        if count < 1:
+            raise ValueError("a sharded knowledge base needs at least one shard")
+        self.count = count
+
+    @property
+    def keys(self) -> List[str]:
+        return [str(index) for index in range(self.count)]
+
+    def __call__(self, video_name: str) -> str:
+        return str(zlib.crc32(video_name.encode("utf-8")) % self.count)
+
+    def check(self, existing: Iterable[str]) -> None:
+        """Refuse shard files a different shard count left behind: their videos would be unreachable."""
+
+        stray = sorted(set(existing) - set(self.keys))
+        if stray:
+            raise ValueError(
+                f"found shard file(s) {', '.join(stray)} beyond the configured {self.count} shard(s); "
+                "keep VIDMELT_KB_SHARDS at its old value or delete the shard files and re-sync"
+            )
+
+
+class CollectionRouter:
+    """Place each video in the collection of the first glob pattern its name matches."""
+
+    def __init__(self, patterns: Mapping[str, str], default: str = DEFAULT_COLLECTION):
+        for collection in [*patterns.values(), default]:
+            if not _SHARD_KEY.match(collection):
+                raise ValueError(f"collection name {collection!r} must be letters, digits, '_' or '-'")
+        self.patterns = dict(patterns)
+        self.default = default
+
+    @classmethod
+    def from_file(cls, path: Union[Path, str]) -> "CollectionRouter":
+        patterns = json.loads(Path(path).read_text(encoding="utf-8"))
+        if not isinstance(patterns, dict):
+            raise ValueError(f"{path} must hold a JSON object of pattern -> collection")
+        return cls(patterns)
+
+    @property
+    def keys(self) -> List[str]:
+        return list(dict.fromkeys([*self.patterns.values(), self.default]))
+
+    def __call__(self, video_name: str) -> str:
+        for pattern, collection in self.patterns.items():
+            if fnmatchcase(video_name, pattern):
+                return collection
+        return self.default
+
+    def check(self, existing: Iterable[str]) -> None:
+        """Collections dropped from the mapping stay searchable until their videos are re-synced elsewhere."""
+
+
+Router = Union[HashRouter, CollectionRouter]
+
+
+def router_from_env() -> Optional[Router]:
+    """The router configured by ``VIDMELT_KB_COLLECTIONS`` or ``VIDMELT_KB_SHARDS``, or None for one file."""
+
+    if COLLECTIONS_PATH:
+        return CollectionRouter.from_file(COLLECTIONS_PATH)
+    if SHARD_COUNT > 1:
+        return HashRouter(SHARD_COUNT)
+    return None
@@ -0,0 +1,137 @@
+"""Per-thread persistent SQLite connections with WAL and a single serialized writer."""
+from __future__ import annotations
+
+import contextlib
+import os
+import sqlite3
+import threading
+import weakref
+from pathlib import Path
+from typing import Iterator
+
+CACHE_KIB = int(os.getenv("VIDMELT_SQLITE_CACHE_KIB", "16384"))
+MMAP_BYTES = int(os.getenv("VIDMELT_SQLITE_MMAP_BYTES", str(256 << 20)))
+# Prepared statements kept per connection, keyed by SQL text.
+STATEMENT_CACHE = 256
+BUSY_TIMEOUT = 30.0
+
+
+class _PooledConnection(sqlite3.Connection):
+    """A plain connection that can be weakly referenced."""
+
+
+class ConnectionPool:
+    """One long-lived connection per thread, all pointing at ``path``.
+
+    The database is switched to WAL once, so readers never wait for the
+    writer and the writer never waits for readers.  Every connection runs
+    with ``synchronous=NORMAL`` (durable at each WAL checkpoint, never
+    corrupt), a page cache of ``cache_kib`` and ``mmap_size`` bytes mapped,
+    and keeps ``STATEMENT_CACHE`` prepared statements, which only pays off
+    because the connection outlives the call.
+
+    Writes go through :meth:`write`, which serializes writers of this
+    process on one lock before taking SQLite's write lock with
+    ``BEGIN IMMEDIATE``; other processes still queue on ``busy_timeout``.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        cache_kib: int = CACHE_KIB,
+        mmap_bytes: int = MMAP_BYTES,
+        timeout: float = BUSY_TIMEOUT,
+    ):
+        self.path = Path(path)
+        self.cache_kib = cache_kib
+        self.mmap_bytes = mmap_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        # Weak, so a connection closes with its thread once that thread exits.
+        self._all: "weakref.WeakSet[sqlite3.Connection]" = weakref.WeakSet()
+        self._all_lock = threading.Lock()
+        self.connection().execute("PRAGMA journal_mode=WAL")
+
+    def _open(self) -> sqlite3.Connection:
+        # Each connection is only ever used by the thread that opened it;
+        # check_same_thread is off so close() can run from any thread.
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE,
+            factory=_PooledConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        with self._all_lock:
+            self._all.add(conn)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+            self._local.write_depth = 0
+        return conn
+
+    @contextlib.contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Run the block in one immediate write transaction, committed on success.
+
+        Nested calls on the same thread join the outer transaction.
+        """
+
+        with self._write_lock:
+            conn = self.connection()
+            if self._local.write_depth:
+                self._local.write_depth += 1
+                try:
+                    yield conn
+                finally:
+                    self._local.write_depth -= 1
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.write_depth = 1
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._local.write_depth = 0
+
+    @contextlib.contextmanager
+    def snapshot(self) -> Iterator[sqlite3.Connection]:
+        """Run the block's reads in one read transaction, so they all see the same commit.
+
+        Inside a write transaction the block simply joins it.
+        """
+
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.commit()
+
+    def close(self) -> None:
+        """Close every connection; threads reopen theirs on next use."""
+
+        with self._all_lock:
+            connections, self._all = list(self._all), weakref.WeakSet()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -0,0 +1,109 @@
+"""Run work items through a chain of stages connected by bounded queues."""
+from __future__ import annotations
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+@dataclass(frozen=True)
+class Stage(Generic[T]):
+    """A named step; ``fn`` returns False to drop the item from later stages."""
+
+    name: str
+    fn: Callable[[T], bool]
+    workers: int = 1
+
+
+@dataclass
+class StageOutcome(Generic[T]):
+    item: T
+    failed_stage: Optional[str] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.failed_stage is None
+
+
+class StagedExecutor(Generic[T]):
+    """Pipeline items through ``stages``, each with its own worker threads.
+
+    Stages are linked by queues holding at most ``queue_size`` items, so a fast
+    stage can run ahead of a slow one only by that much.  Once the pipeline is
+    full, throughput is set by the slowest stage rather than the sum of all.
+    """
+
+    def __init__(self, stages: Sequence[Stage[T]], *, queue_size: int = 2):
+        if not stages:
+            raise ValueError("at least one stage is required")
+        self.stages = list(stages)
+        self.queue_size = max(1, queue_size)
+
+    def run(self, items: Iterable[T]) -> List[StageOutcome[T]]:
+        queues: List[queue.Queue] = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        outcomes: List[Tuple[int, StageOutcome[T]]] = []
+        outcomes_lock = threading.Lock()
+        threads: List[List[threading.Thread]] = []
+        counts = [max(1, stage.workers) for stage in self.stages]
+
+        def finish(seq: int, outcome: StageOutcome[T]) -> None:
+            with outcomes_lock:
+                outcomes.append((seq, outcome))
+
+        def worker(index: int) -> None:
+            stage = self.stages[index]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(self.stages) else None
+            while True:
+                entry = inbox.get()
+                if entry is _DONE:
+                    return
+                seq, item = entry
+                try:
+                    keep_going = stage.fn(item)
+                except Exception as exc:  # stage functions normally report their own errors
+                    finish(seq, StageOutcome(item, stage.name, exc))
+                    continue
+                if not keep_going:
+                    finish(seq, StageOutcome(item, stage.name))
+                elif outbox is None:
+                    finish(seq, StageOutcome(item))
+                else:
+                    outbox.put((seq, item))
+
+        def close_after(index: int) -> None:
+            for thread in threads[index]:
+                thread.join()
+            if index + 1 < len(self.stages):
+                for _ in range(counts[index + 1]):
+                    queues[index + 1].put(_DONE)
+
+        for index, stage in enumerate(self.stages):
+            stage_threads = [
+                threading.Thread(target=worker, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+                for n in range(counts[index])
+            ]
+            threads.append(stage_threads)
+            for thread in stage_threads:
+                thread.start()
+
+        closers = [threading.Thread(target=close_after, args=(index,), daemon=True) for index in range(len(self.stages))]
+        for closer in closers:
+            closer.start()
+
+        try:
+            for seq, item in enumerate(items):
+                queues[0].put((seq, item))
+        finally:
+            for _ in range(counts[0]):
+                queues[0].put(_DONE)
+
+        for closer in closers:
+            closer.join()
+        return [outcome for _seq, outcome in sorted(outcomes, key=lambda pair: pair[0])]
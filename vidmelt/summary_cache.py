@@ -0,0 +1,105 @@
+"""Persistent cache of generated summaries keyed by transcript content."""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from . import history
+
+DEFAULT_DB_PATH = history.DEFAULT_DB_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summary_cache (
+    transcript_hash TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    model TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    latency REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (transcript_hash, prompt_version, model)
+);
+"""
+
+
+@dataclass
+class CachedSummary:
+    summary: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+def transcript_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """Map (transcript hash, prompt version, model) to the generated Markdown.
+
+    The token usage and latency of the original call are stored with each
+    entry so a hit can report how much spend and time it saved.
+    """
+
+    def __init__(self, db_path: Path | str = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def get(self, text_hash: str, prompt_version: str, model: str) -> Optional[CachedSummary]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT summary, prompt_tokens, completion_tokens, latency FROM summary_cache "
+                "WHERE transcript_hash = ? AND prompt_version = ? AND model = ?",
+                (text_hash, prompt_version, model),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE summary_cache SET hits = hits + 1 "
+                "WHERE transcript_hash = ? AND prompt_version = ? AND model = ?",
+                (text_hash, prompt_version, model),
+            )
+            conn.commit()
+        return CachedSummary(*row)
+
+    def put(
+        self,
+        text_hash: str,
+        prompt_version: str,
+        model: str,
+        entry: CachedSummary,
+    ) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "REPLACE INTO summary_cache (transcript_hash, prompt_version, model, summary, "
+                "prompt_tokens, completion_tokens, latency, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    text_hash,
+                    prompt_version,
+                    model,
+                    entry.summary,
+                    entry.prompt_tokens,
+                    entry.completion_tokens,
+                    entry.latency,
+                    time.time(),
+                ),
+            )
+            conn.commit()
+
+
+GLOBAL_CACHE = SummaryCache(DEFAULT_DB_PATH)
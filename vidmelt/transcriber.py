@@ -0,0 +1,329 @@
+"""Resident in-process Whisper models shared across transcription jobs."""
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from .audio import SAMPLE_RATE
+
+DEFAULT_POOL_SIZE = int(os.getenv("VIDMELT_WHISPER_POOL_SIZE", "2"))
+DEFAULT_LANGUAGE = "en"
+DEFAULT_CHUNK_WORKERS = int(os.getenv("VIDMELT_TRANSCRIBE_WORKERS", "1"))
+DEFAULT_CHUNK_SECONDS = float(os.getenv("VIDMELT_CHUNK_SECONDS", "120"))
+
+ModelLoader = Callable[[str], Any]
+
+
+@dataclass
+class TranscriptionResult:
+    text: str
+    segments: List[dict] = field(default_factory=list)
+    # CPU time spent in chunk worker processes, which the caller's rusage never sees.
+    cpu_seconds: float = 0.0
+
+    def format_log(self) -> str:
+        """Render segments the way ``python -m whisper --verbose`` prints them."""
+
+        lines = [
+            f"[{_format_timestamp(seg.get('start', 0.0))} --> {_format_timestamp(seg.get('end', 0.0))}] "
+            f"{str(seg.get('text', '')).strip()}"
+            for seg in self.segments
+        ]
+        return "\n".join(lines)
+
+
+def _format_timestamp(seconds: float) -> str:
+    milliseconds = int(round(max(seconds, 0.0) * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    prefix = f"{hours:02d}:" if hours else ""
+    return f"{prefix}{minutes:02d}:{secs:02d}.{milliseconds:03d}"
+
+
+def _load_whisper_model(model_name: str):  # pragma: no cover - requires whisper weights
+    import whisper
+
+    return whisper.load_model(model_name)
+
+
+class _PoolEntry:
+    """Replicas of one model; each replica serves a single transcription at a time."""
+
+    def __init__(self, model: Any):
+        self.model = model
+        self._idle: List[Any] = [model]
+        self._count = 1
+        self._cond = threading.Condition()
+
+    def checkout(self, loader: ModelLoader, model_name: str, limit: int) -> Any:
+        with self._cond:
+            while not self._idle and self._count >= limit:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._count += 1
+        try:
+            return loader(model_name)
+        except BaseException:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+
+    def checkin(self, model: Any) -> None:
+        with self._cond:
+            self._idle.append(model)
+            self._cond.notify()
+
+
+class WhisperModelPool:
+    """Keep loaded Whisper models resident, evicting the least recently used.
+
+    Loading weights dominates the cost of short clips, so models are cached by
+    name for the lifetime of the process and reused across jobs.  A single
+    Whisper model is not safe to run from several threads at once, so each
+    transcription checks out its own replica; up to ``replicas`` copies of a
+    model are loaded when several workers transcribe concurrently.
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_POOL_SIZE,
+        loader: Optional[ModelLoader] = None,
+        *,
+        replicas: int = 1,
+    ):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.replicas = max(1, replicas)
+        self._loader = loader or _load_whisper_model
+        self._entries: "OrderedDict[str, _PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: dict[str, threading.Lock] = {}
+
+    def _entry(self, model_name: str) -> _PoolEntry:
+        with self._lock:
+            entry = self._entries.get(model_name)
+            if entry is not None:
+                self._entries.move_to_end(model_name)
+                return entry
+            load_lock = self._loading.setdefault(model_name, threading.Lock())
+
+        # Load outside the pool lock so other models stay usable meanwhile.
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(model_name)
+                if entry is not None:
+                    self._entries.move_to_end(model_name)
+                    return entry
+            model = self._loader(model_name)
+            with self._lock:
+                entry = _PoolEntry(model)
+                self._entries[model_name] = entry
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+                self._loading.pop(model_name, None)
+            return entry
+
+    def get(self, model_name: str):
+        """Return the resident model for ``model_name``, loading it on first use."""
+
+        return self._entry(model_name).model
+
+    def loaded_models(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def transcribe(self, audio, model_name: str, *, language: str = DEFAULT_LANGUAGE) -> TranscriptionResult:
+        """Transcribe ``audio`` (a path or 16 kHz float32 array) with a pooled model."""
+
+        entry = self._entry(model_name)
+        source = str(audio) if isinstance(audio, Path) else audio
+        model = entry.checkout(self._loader, model_name, self.replicas)
+        try:
+            result = model.transcribe(source, language=language, verbose=None)
+        finally:
+            entry.checkin(model)
+        return TranscriptionResult(
+            text=str(result.get("text", "")),
+            segments=list(result.get("segments", [])),
+        )
+
+
+def segments_path(transcript_path: Path) -> Path:
+    """Where the timed segments of ``transcript_path`` are kept, e.g. ``talk.segments.json``."""
+
+    return transcript_path.with_suffix(".segments.json")
+
+
+def write_transcript(result: TranscriptionResult, transcript_path: Path) -> None:
+    """Write a transcript in the same layout as Whisper's ``.txt`` writer.
+
+    The segment timestamps go next to it in :func:`segments_path`, one
+    object per transcript line, so search hits can point into the video.
+    """
+
+    timed = segments_path(transcript_path)
+    if result.segments:
+        lines = [str(seg.get("text", "")).strip() for seg in result.segments]
+        content = "\n".join(lines)
+        segments = [
+            {"start": float(seg.get("start", 0.0)), "end": float(seg.get("end", 0.0)), "text": line}
+            for seg, line in zip(result.segments, lines)
+        ]
+        timed.write_text(json.dumps(segments, ensure_ascii=False), encoding="utf-8")
+    else:
+        content = result.text.strip()
+        timed.unlink(missing_ok=True)
+    transcript_path.write_text(content + "\n", encoding="utf-8")
+
+
+GLOBAL_POOL = WhisperModelPool()
+
+
+# Chunked transcription ----------------------------------------------------------
+def load_wav(audio_path: Path) -> np.ndarray:
+    """Read a 16-bit PCM WAV (as written by the ffmpeg stage) into float32 samples."""
+
+    with wave.open(str(audio_path), "rb") as handle:
+        if handle.getsampwidth() != 2:
+            raise ValueError(f"{audio_path} is not 16-bit PCM audio")
+        frames = handle.readframes(handle.getnframes())
+        channels = handle.getnchannels()
+    samples = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    *,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+    sample_rate: int = SAMPLE_RATE,
+    search_seconds: float = 5.0,
+    frame_ms: int = 30,
+) -> List[Tuple[int, int]]:
+    """Return ``(start, end)`` sample ranges of roughly ``chunk_seconds`` each.
+
+    Each boundary is moved to the quietest frame (lowest RMS energy) within
+    ``search_seconds`` of the nominal cut so that words are not split in half.
+    """
+
+    total = len(audio)
+    chunk = int(chunk_seconds * sample_rate)
+    if chunk <= 0 or total <= chunk:
+        return [(0, total)] if total else []
+
+    frame = max(1, sample_rate * frame_ms // 1000)
+    usable = total - total % frame
+    energy = np.sqrt(np.mean(np.square(audio[:usable].reshape(-1, frame)), axis=1))
+    window = max(1, int(search_seconds * sample_rate) // frame)
+
+    ranges: List[Tuple[int, int]] = []
+    start = 0
+    while total - start > chunk:
+        target = (start + chunk) // frame
+        lo = max(target - window, (start + chunk // 2) // frame + 1)
+        hi = min(target + window, len(energy))
+        if lo >= hi:
+            cut = start + chunk
+        else:
+            window_energy = energy[lo:hi]
+            quiet = np.flatnonzero(window_energy <= window_energy.min() + 1e-6) + lo
+            cut = int(quiet[np.argmin(np.abs(quiet - target))]) * frame
+        ranges.append((start, cut))
+        start = cut
+    ranges.append((start, total))
+    return ranges
+
+
+def _init_chunk_worker(threads: int) -> None:  # pragma: no cover - runs in worker processes
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def _transcribe_segment(
+    model_name: str, samples: np.ndarray, offset: float, language: str
+) -> TranscriptionResult:
+    cpu_start = time.process_time()
+    result = GLOBAL_POOL.transcribe(samples, model_name, language=language)
+    segments = [
+        {**seg, "start": seg.get("start", 0.0) + offset, "end": seg.get("end", 0.0) + offset}
+        for seg in result.segments
+    ]
+    return TranscriptionResult(text=result.text, segments=segments, cpu_seconds=time.process_time() - cpu_start)
+
+
+_EXECUTORS: dict[int, ProcessPoolExecutor] = {}
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _chunk_executor(workers: int) -> ProcessPoolExecutor:  # pragma: no cover - spawns processes
+    """Return a long-lived process pool so each worker keeps its models resident."""
+
+    with _EXECUTOR_LOCK:
+        executor = _EXECUTORS.get(workers)
+        if executor is None:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_chunk_worker,
+                initargs=(threads,),
+            )
+            _EXECUTORS[workers] = executor
+        return executor
+
+
+def transcribe_chunked(
+    audio: np.ndarray,
+    model_name: str,
+    *,
+    workers: int = DEFAULT_CHUNK_WORKERS,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+    language: str = DEFAULT_LANGUAGE,
+    sample_rate: int = SAMPLE_RATE,
+    executor: Optional[Executor] = None,
+) -> TranscriptionResult:
+    """Split ``audio`` at silences and transcribe the pieces in parallel.
+
+    Segment timestamps are shifted back onto the original timeline and the
+    pieces are joined in order, so the result matches a single-run transcript.
+    ``cpu_seconds`` of the result is the workers' CPU time for all pieces.
+    """
+
+    ranges = split_on_silence(audio, chunk_seconds=chunk_seconds, sample_rate=sample_rate)
+    if not ranges:
+        return TranscriptionResult(text="")
+    pool = executor or _chunk_executor(max(1, workers))
+    futures = [
+        pool.submit(_transcribe_segment, model_name, audio[start:end], start / sample_rate, language)
+        for start, end in ranges
+    ]
+    parts = [future.result() for future in futures]
+    return TranscriptionResult(
+        text="".join(part.text for part in parts),
+        segments=[seg for part in parts for seg in part.segments],
+        cpu_seconds=sum(part.cpu_seconds for part in parts),
+    )
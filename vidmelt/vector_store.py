@@ -0,0 +1,190 @@
+"""Append-only vector files shared between processes through ``np.memmap``."""
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+ITEM_SIZE = np.dtype(np.float32).itemsize
+QUANTIZATIONS = ("float32", "float16", "int8")
+INT8_MAX = 127
+# Rows converted to float32 at a time when scoring a quantized file; small
+# enough for the converted block to stay in the CPU cache.
+SCORE_BLOCK_ROWS = 1024
+# Rows quantized per append when catching up with the float32 file.
+QUANTIZE_BLOCK_ROWS = 65536
+
+
+class VectorFile:
+    """A headerless ``(rows, dim)`` matrix stored row after row (float32 unless ``dtype`` says otherwise).
+
+    Rows are only ever appended, so a slot number stays valid for the life of
+    the file; compaction writes a new file instead of rewriting this one.
+    Every reader maps the same pages from the OS page cache, so loading is
+    zero-copy and the memory is shared by all Flask workers and CLI runs.
+    Callers serialize appends (the knowledge base does it inside its SQLite
+    write transaction).
+    """
+
+    def __init__(self, path: Path | str, dim: int, *, dtype=np.float32):
+        if dim <= 0:
+            raise ValueError("vector dimension must be positive")
+        self.path = Path(path)
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._view: np.ndarray = np.zeros((0, dim), dtype=self.dtype)
+        self._lock = threading.Lock()
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    @property
+    def rows(self) -> int:
+        try:
+            return self.path.stat().st_size // self.row_bytes
+        except FileNotFoundError:
+            return 0
+
+    def append(self, vectors: np.ndarray) -> range:
+        """Write ``vectors`` at the end of the file and return their slots."""
+
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"expected vectors of dimension {self.dim}, got shape {vectors.shape}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as handle:
+            size = handle.seek(0, os.SEEK_END)
+            if size % self.row_bytes:
+                # Drop a torn row left by a crashed writer before appending.
+                size -= size % self.row_bytes
+                handle.truncate(size)
+            handle.write(vectors.tobytes())
+            handle.flush()
+            os.fsync(handle.fileno())
+        start = size // self.row_bytes
+        return range(start, start + len(vectors))
+
+    def view(self) -> np.ndarray:
+        """Read-only ``(rows, dim)`` memory map, remapped when the file has grown."""
+
+        rows = self.rows
+        with self._lock:
+            if len(self._view) != rows:
+                if rows == 0:
+                    self._view = np.zeros((0, self.dim), dtype=self.dtype)
+                else:
+                    self._view = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+            return self._view
+
+    def truncate(self, rows: int) -> None:
+        """Drop every row from ``rows`` on (used to realign files written in lockstep)."""
+
+        if self.rows > rows:
+            with open(self.path, "r+b") as handle:
+                handle.truncate(rows * self.row_bytes)
+
+    def read(self, slots: Iterable[int]) -> np.ndarray:
+        return np.asarray(self.view()[np.fromiter(slots, dtype=np.int64)])
+
+    def write_compacted(self, target: Path | str, slots: np.ndarray, *, block_rows: int = 65536) -> "VectorFile":
+        """Copy the rows at ``slots`` (in order) into a new file at ``target``."""
+
+        target = Path(target)
+        source = self.view()
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, "wb") as handle:
+            for start in range(0, len(slots), block_rows):
+                handle.write(np.ascontiguousarray(source[slots[start : start + block_rows]]).tobytes())
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp, target)
+        return VectorFile(target, self.dim, dtype=self.dtype)
+
+    def unlink(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def quantize_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 codes and the float32 scale that maps them back."""
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / INT8_MAX
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -INT8_MAX, INT8_MAX).astype(np.int8)
+    return codes, scales
+
+
+class QuantizedVectors:
+    """A compressed copy of a float32 :class:`VectorFile`, slot for slot.
+
+    ``float16`` halves every row; ``int8`` keeps one signed byte per
+    component plus a float32 scale per row (in ``<path>.scale``), about a
+    quarter of the float32 size.  Scores are computed ``block_rows`` rows at
+    a time, so scanning never materializes a float32 copy of the matrix.
+    """
+
+    def __init__(self, path: Path | str, dim: int, kind: str):
+        if kind not in QUANTIZATIONS[1:]:
+            raise ValueError(f"unknown quantization {kind!r}; expected one of {', '.join(QUANTIZATIONS[1:])}")
+        path = Path(path)
+        self.kind = kind
+        self.dim = dim
+        self.codes = VectorFile(path, dim, dtype=np.float16 if kind == "float16" else np.int8)
+        self.scales: Optional[VectorFile] = VectorFile(path.with_name(path.name + ".scale"), 1) if kind == "int8" else None
+
+    @property
+    def rows(self) -> int:
+        rows = self.codes.rows
+        return min(rows, self.scales.rows) if self.scales is not None else rows
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows * (self.codes.row_bytes + (self.scales.row_bytes if self.scales is not None else 0))
+
+    def append(self, vectors: np.ndarray) -> None:
+        if self.scales is None:
+            self.codes.append(vectors)
+            return
+        codes, scales = quantize_int8(vectors)
+        self.codes.append(codes)
+        self.scales.append(scales.reshape(-1, 1))
+
+    def catch_up(self, source: VectorFile, *, block_rows: int = QUANTIZE_BLOCK_ROWS) -> int:
+        """Quantize the rows of ``source`` not copied yet; return how many were added.
+
+        Callers serialize this with appends to ``source``, like any append.
+        """
+
+        start = self.rows
+        # A crash between the codes and scales appends leaves one of them ahead.
+        self.codes.truncate(start)
+        if self.scales is not None:
+            self.scales.truncate(start)
+        view = source.view()
+        for offset in range(start, len(view), block_rows):
+            self.append(view[offset : offset + block_rows])
+        return max(0, len(view) - start)
+
+    def scores(self, query: np.ndarray, rows: int, *, block_rows: int = SCORE_BLOCK_ROWS) -> np.ndarray:
+        """Approximate dot products of ``query`` with the first ``rows`` rows."""
+
+        codes = self.codes.view()
+        scales = self.scales.view()[:, 0] if self.scales is not None else None
+        query = np.asarray(query, dtype=np.float32)
+        rows = min(rows, self.rows)
+        scores = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, block_rows):
+            end = min(rows, start + block_rows)
+            scores[start:end] = codes[start:end].astype(np.float32) @ query
+            if scales is not None:
+                scores[start:end] *= scales[start:end]
+        return scores
+
+    def unlink(self) -> None:
+        self.codes.unlink()
+        if self.scales is not None:
+            self.scales.unlink()